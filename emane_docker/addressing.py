@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+import ipaddress
+
+
+def int_to_ipv4(address):
+    """
+    Converts an integer IPv4 address to its dotted-decimal representation.
+
+    :param address: The IPv4 address as an integer.
+    :return: The IPv4 address as a string.
+    """
+    return '%d.%d.%d.%d' % (address >> 24, (address >> 16) & 0xff, (address >> 8) & 0xff,
+                            address & 0xff)
+
+
+class AddressAllocator:
+    """
+    Allocates IPv4 addresses to links and NEMs using integer arithmetic. Each link gets its own
+    /30 or /31 subnet from the link pool, which is selected by the link id. Each NEM gets its
+    platform address from the NEM pool, which is selected by the NEM id.
+
+    If every node name of a topology is a number from 1 to 255, the links are addressed by the
+    names of their nodes instead: the link between nodes a < b gets the /30 subnet <pool>.a.b.0,
+    where a has .1 and b has .2, e.g. 1.3.7.1 and 1.3.7.2 in the default pool. This requires a
+    link pool of /8 or larger.
+
+    :param link_pool: The pool link subnets are allocated from.
+    :param link_prefix_length: The prefix length of each link subnet, 30 or 31.
+    :param nem_pool: The pool NEM platform addresses are allocated from.
+    :param numeric_names: Whether the links of topologies with numeric node names are addressed by
+        the names. By default they are if the link pool is large enough.
+    """
+    DEFAULT_LINK_POOL = '1.0.0.0/8'
+    DEFAULT_LINK_PREFIX_LENGTH = 30
+    DEFAULT_NEM_POOL = '10.100.0.0/16'
+    NUMERIC_LINK_PREFIX_LENGTH = 30
+
+    def __init__(self, link_pool=DEFAULT_LINK_POOL, link_prefix_length=DEFAULT_LINK_PREFIX_LENGTH,
+                 nem_pool=DEFAULT_NEM_POOL, numeric_names=None):
+        if link_prefix_length not in (30, 31):
+            raise ValueError('Link prefix length must be 30 or 31, not %s' % link_prefix_length)
+        link_network = ipaddress.IPv4Network(link_pool)
+        if link_network.prefixlen > link_prefix_length:
+            raise ValueError('Link pool %s is smaller than a single link subnet' % link_pool)
+        if numeric_names and link_network.prefixlen > 8:
+            raise ValueError('Addressing links by numeric node names requires a /8 link pool, '
+                             'not %s' % link_pool)
+        if numeric_names is None:
+            numeric_names = link_network.prefixlen <= 8
+        self.numeric_names = numeric_names
+        self.link_prefix_length = link_prefix_length
+        self.link_base = int(link_network.network_address)
+        self.link_block_size = 1 << (32 - link_prefix_length)
+        # /30 subnets skip the network address, /31 subnets use both addresses (RFC 3021).
+        self.link_host_offset = 1 if link_prefix_length == 30 else 0
+        self.max_links = link_network.num_addresses // self.link_block_size
+
+        nem_network = ipaddress.IPv4Network(nem_pool)
+        self.nem_prefix_length = nem_network.prefixlen
+        self.nem_netmask = str(nem_network.netmask)
+        self.nem_base = int(nem_network.network_address)
+        # The network and the broadcast addresses are not assigned to NEMs.
+        self.max_nems = nem_network.num_addresses - 2
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates an allocator using the `addressing` block of the configuration.
+
+        :param config: EMANE-Docker configuration.
+        :return: The address allocator.
+        """
+        addressing = config.get('addressing', None) or {}
+        return cls(link_pool=addressing.get('link_pool', cls.DEFAULT_LINK_POOL),
+                   link_prefix_length=addressing.get('link_prefix_length',
+                                                     cls.DEFAULT_LINK_PREFIX_LENGTH),
+                   nem_pool=addressing.get('nem_pool', cls.DEFAULT_NEM_POOL),
+                   numeric_names=addressing.get('numeric_names', None))
+
+    def uses_numeric_names(self, names):
+        """
+        Returns whether the links of a topology are addressed by the names of their nodes.
+
+        :param names: The node names of the topology.
+        :return: True if numeric names are enabled and every name is a number from 1 to 255.
+        """
+        if not self.numeric_names:
+            return False
+        names = list(names)
+        return bool(names) and all(name.isdigit() and 1 <= int(name) <= 255 for name in names)
+
+    def numeric_link_address_ints(self, name1, name2):
+        """
+        Returns the addresses of both ends of a link between two numerically named nodes.
+
+        :param name1: Name of the first node, a number from 1 to 255.
+        :param name2: Name of the second node.
+        :return: A tuple of the first and the second node addresses.
+        """
+        low, high = sorted((int(name1), int(name2)))
+        address = self.link_base + (low << 16) + (high << 8) + 1
+        if int(name1) == low:
+            return address, address + 1
+        return address + 1, address
+
+    def link_address_ints(self, link_id):
+        """
+        Returns the addresses of both ends of a link as integers.
+
+        :param link_id: The link id, starting from 0.
+        :return: A tuple of the first and the second node addresses.
+        """
+        if not 0 <= link_id < self.max_links:
+            raise ValueError('Link id %d is out of the link pool (%d links)' % (
+                link_id, self.max_links))
+        address = self.link_base + link_id * self.link_block_size + self.link_host_offset
+        return address, address + 1
+
+    def link_addresses(self, link_id):
+        """
+        Returns the addresses of both ends of a link.
+
+        :param link_id: The link id, starting from 0.
+        :return: A tuple of the first and the second node addresses.
+        """
+        address1, address2 = self.link_address_ints(link_id)
+        return int_to_ipv4(address1), int_to_ipv4(address2)
+
+    def nem_address_int(self, nem_id):
+        """
+        Returns the platform address of a NEM as an integer.
+
+        :param nem_id: The NEM id, starting from 1.
+        :return: The NEM address.
+        """
+        if not 1 <= nem_id <= self.max_nems:
+            raise ValueError('NEM id %d is out of the NEM pool (%d NEMs)' % (
+                nem_id, self.max_nems))
+        return self.nem_base + nem_id
+
+    def nem_address(self, nem_id):
+        """
+        Returns the platform address of a NEM.
+
+        :param nem_id: The NEM id, starting from 1.
+        :return: The NEM address.
+        """
+        return int_to_ipv4(self.nem_address_int(nem_id))
+
+    def nem_id(self, address):
+        """
+        Returns the id of the NEM that owns the given platform address.
+
+        :param address: The NEM address.
+        :return: The NEM id, or None if the address is not in the NEM pool.
+        """
+        nem_id = int(ipaddress.IPv4Address(address)) - self.nem_base
+        if not 1 <= nem_id <= self.max_nems:
+            return None
+        return nem_id
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+
+import argparse
+from collections import namedtuple
+from contextlib import ExitStack
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+from time import perf_counter, sleep
+import tracemalloc
+
+import yaml
+
+import docker
+
+from emane_docker.config_bundle import pack_files, unpack_file
+from emane_docker.log import LOG
+from emane_docker.log import setup as log_setup
+from emane_docker.topology import EmaneTopology
+from emane_docker.util import load_yaml
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [10, 50, 100, 500, 1000, 5000]
+
+FakeExecResult = namedtuple('FakeExecResult', ['exit_code', 'output'])
+
+
+class FakeDockerClient:
+    """
+    An in-process replacement of the Docker client. Every API call sleeps for the configured
+    latency and fails with the configured probability.
+
+    :param latency: Latency of each Docker API call, in seconds.
+    :param failure_rate: Probability of a Docker API call to fail.
+    :param seed: Seed of the failure injection.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.api_calls = 0
+        self.failures = 0
+        self.containers = FakeContainerCollection(self)
+
+    def api_call(self, name):
+        """
+        Simulates a Docker API call, raises docker.errors.APIError for injected failures.
+
+        :param name: Name of the API call, used in the failure message.
+        """
+        with self.lock:
+            self.api_calls += 1
+            failed = self.random.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+        if self.latency:
+            sleep(self.latency)
+        if failed:
+            raise docker.errors.APIError('Injected failure in %s' % name)
+
+
+class FakeContainerCollection:
+    def __init__(self, client):
+        self.client = client
+        self.containers = {}
+
+    def run(self, image, name=None, network=None, labels=None, **kwargs):
+        self.client.api_call('containers.run')
+        container = FakeContainer(client=self.client, name=name, image=image, network=network,
+                                  index=len(self.containers), labels=labels)
+        self.containers[name] = container
+        return container
+
+    def create(self, image, name=None, network=None, labels=None, **kwargs):
+        self.client.api_call('containers.create')
+        container = FakeContainer(client=self.client, name=name, image=image, network=network,
+                                  index=len(self.containers), labels=labels)
+        container.status = 'created'
+        self.containers[name] = container
+        return container
+
+    def get(self, name):
+        self.client.api_call('containers.get')
+        if name not in self.containers:
+            raise docker.errors.NotFound('No such container: %s' % name)
+        return self.containers[name]
+
+    def list(self, **kwargs):
+        self.client.api_call('containers.list')
+        return list(self.containers.values())
+
+
+class FakeContainer:
+    def __init__(self, client, name, image, network, index, labels=None):
+        self.client = client
+        self.name = name
+        self.id = name
+        self.image = image
+        self.status = 'running'
+        self.exec_count = 0
+        self.archives = []
+        self.attrs = {'Config': {'Image': image, 'Labels': labels or {}},
+                      'NetworkSettings': {'Networks': {network: {
+                          'IPAddress': '10.99.%d.%d' % (index // 254, index % 254 + 1)}}}}
+
+    def exec_run(self, cmd, detach=False, **kwargs):
+        self.client.api_call('exec_run')
+        self.exec_count += 1
+        return FakeExecResult(exit_code=None if detach else 0, output=b'')
+
+    def start(self):
+        self.client.api_call('start')
+        self.status = 'running'
+
+    def put_archive(self, path, data):
+        self.client.api_call('put_archive')
+        self.archives.append((path, data))
+        return True
+
+    def get_archive(self, path):
+        self.client.api_call('get_archive')
+        directory, name = os.path.split(path)
+        for archive_path, data in reversed(self.archives):
+            if archive_path != directory:
+                continue
+            try:
+                contents = unpack_file([data], name)
+            except KeyError:
+                continue
+            return [pack_files({name: contents})], {'name': name, 'size': len(contents)}
+        raise docker.errors.NotFound('No such file: %s' % path)
+
+    def remove(self, force=False):
+        self.client.api_call('remove')
+        self.client.containers.containers.pop(self.name, None)
+        self.status = 'removed'
+
+
+class FakeRedis:
+    """
+    An in-process replacement of the Redis client.
+    """
+
+    def __init__(self, host='localhost', port=6379, db=0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.store = {}
+        self.messages = []
+
+    def set(self, key, value):
+        self.store[key] = value
+        return True
+
+    def get(self, key):
+        return self.store.get(key, None)
+
+    def publish(self, channel, message):
+        self.messages.append((channel, message))
+        return 1
+
+
+class BenchmarkTopology(EmaneTopology):
+    """
+    EmaneTopology that does not touch the host, EMANE interfaces and the event service are not
+    created.
+    """
+
+    def create_emane_interface(self):
+        LOG.debug('Skipping docker interface (%s) creation.', self.emane_interface)
+        return 0
+
+    def remove_emane_interface(self):
+        LOG.debug('Skipping docker interface (%s) removal.', self.emane_interface)
+
+    def start_emane_eventservice(self):
+        LOG.debug('Skipping EMANE Event Service.')
+        return 0
+
+    def stop_emane_eventservice(self):
+        LOG.debug('Skipping EMANE Event Service.')
+
+
+def generate_topology(num_nodes, degree=4, num_domains=2, seed=None):
+    """
+    Generates a connected topology, a ring with random chords, in the topology file format.
+
+    :param num_nodes: Number of nodes.
+    :param degree: Average node degree.
+    :param num_domains: Number of domains the nodes are split into.
+    :param seed: Seed of the random chords.
+    :return: The topology dictionary.
+    """
+    rand = random.Random(seed)
+    names = ['node-%d' % (i + 1) for i in range(num_nodes)]
+    neighbors = [set() for _ in range(num_nodes)]
+    for i in range(num_nodes):
+        j = (i + 1) % num_nodes
+        if i != j:
+            neighbors[i].add(j)
+            neighbors[j].add(i)
+    for _ in range(max(0, num_nodes * (degree - 2) // 2)):
+        i, j = rand.randrange(num_nodes), rand.randrange(num_nodes)
+        if i != j:
+            neighbors[i].add(j)
+            neighbors[j].add(i)
+
+    domain_size = -(-num_nodes // num_domains)
+    nodes = {}
+    for i, name in enumerate(names):
+        nodes.setdefault('domain-%d' % (i // domain_size + 1), []).append({
+            'name': name,
+            'is_border': i % domain_size == 0,
+            'neighbors': [names[j] for j in sorted(neighbors[i])]})
+    return {'nodes': nodes}
+
+
+def measure(phase, method, trace_memory):
+    """
+    Runs the given method and measures its wall time and peak memory.
+
+    :param phase: Name of the phase.
+    :param method: The method to run.
+    :param trace_memory: If set, the peak memory is traced using tracemalloc.
+    :return: The phase measurements and the value returned by the method.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    error = None
+    result = None
+    start_time = perf_counter()
+    try:
+        result = method()
+    except Exception as exc:
+        LOG.error('Benchmark phase %s failed: %s', phase, exc)
+        error = str(exc)
+    wall_time = perf_counter() - start_time
+    peak_memory = None
+    if trace_memory:
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {'phase': phase, 'wall_time': wall_time, 'peak_memory': peak_memory,
+            'error': error}, result
+
+
+def run_benchmark(num_nodes, config, latency=0.0, failure_rate=0.0, degree=4, seed=None,
+                  trace_memory=True):
+    """
+    Runs all orchestration phases for a generated topology of the given size against a fake
+    Docker client. The start phase is EmaneTopology.start without the CLI, it generates the
+    configurations again and starts the containers and their helper programs. It must be called
+    from a working directory containing the templates.
+
+    :param num_nodes: Number of nodes.
+    :param config: EMANE-Docker configuration.
+    :param latency: Latency of each Docker API call, in seconds.
+    :param failure_rate: Probability of a Docker API call to fail.
+    :param degree: Average node degree.
+    :param seed: Seed of the topology generation and failure injection.
+    :param trace_memory: If set, the peak memory of each phase is measured.
+    :return: List of measurements, one per phase.
+    """
+    topology_file = os.path.abspath('topology-%d.yaml' % num_nodes)
+    with open(topology_file, 'w') as f:
+        yaml.safe_dump(generate_topology(num_nodes, degree=degree, seed=seed), f)
+
+    config = dict(config, topology_file=topology_file, no_cli=True, redis_wait_time=0)
+    config['experiment'] = dict(config.get('experiment', {}), enabled=False)
+    docker_client = FakeDockerClient(latency=latency, failure_rate=failure_rate, seed=seed)
+
+    results = []
+    result, emane_topology = measure('load_topology', lambda: BenchmarkTopology(
+        config=config, docker_client=docker_client, redis_class=FakeRedis), trace_memory)
+    results.append(result)
+    phases = [
+        ('generate_configs', emane_topology.generate_configs),
+        ('start', emane_topology.start),
+        ('connect_redis_clients', emane_topology.connect_redis_clients),
+        ('stop', emane_topology.stop)
+    ]
+    for phase, method in phases:
+        api_calls, failures = docker_client.api_calls, docker_client.failures
+        result, status = measure(phase, method, trace_memory)
+        if result['error'] is None and status not in (None, 0):
+            result['error'] = 'exit status %s' % status
+        result['docker_api_calls'] = docker_client.api_calls - api_calls
+        result['docker_failures'] = docker_client.failures - failures
+        results.append(result)
+
+    for result in results:
+        result.update({'benchmark': 'orchestration', 'nodes': len(emane_topology.nodes),
+                       'links': len(emane_topology.links), 'latency': latency,
+                       'failure_rate': failure_rate})
+    os.remove(topology_file)
+    return results
+
+
+def main():
+    """
+    Runs the orchestration benchmark and writes the results as JSON lines.
+
+    :returns: 0 after a successful execution.
+    """
+    parser = argparse.ArgumentParser(description='EMANE-Docker orchestration benchmark')
+    parser.add_argument('-c', '--config-file', dest='config_file',
+                        default=os.path.join(REPOSITORY_DIRECTORY,
+                                             'emane_docker/config.default.yaml'),
+                        help='path for configuration file')
+    parser.add_argument('--sizes', dest='sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='topology sizes (number of nodes) to benchmark')
+    parser.add_argument('--degree', dest='degree', type=int, default=4,
+                        help='average node degree of the generated topologies')
+    parser.add_argument('--latency', dest='latency', type=float, default=0.0,
+                        help='latency of each Docker API call, in seconds')
+    parser.add_argument('--failure-rate', dest='failure_rate', type=float, default=0.0,
+                        help='probability of a Docker API call to fail')
+    parser.add_argument('--seed', dest='seed', type=int, default=0,
+                        help='seed of the topology generation and failure injection')
+    parser.add_argument('--no-memory', action='store_true', dest='no_memory', default=False,
+                        help='do not trace the peak memory, tracing slows down the phases')
+    parser.add_argument('-o', '--output', dest='output', default=None,
+                        help='output path for the JSON lines results, defaults to stdout')
+    parser.add_argument('--debug', action='store_true', dest='debug', default=False,
+                        help='set log level to debug')
+    opts = parser.parse_args()
+
+    log_setup(debug=opts.debug)
+    with open(opts.config_file, 'r') as f:
+        config = load_yaml(f)
+
+    with ExitStack() as stack:
+        output = stack.enter_context(open(opts.output, 'w')) if opts.output else sys.stdout
+        cwd = os.getcwd()
+        work_directory = tempfile.mkdtemp(prefix='emane-docker-benchmark-')
+        try:
+            shutil.copytree(os.path.join(REPOSITORY_DIRECTORY, 'templates'),
+                            os.path.join(work_directory, 'templates'))
+            os.chdir(work_directory)
+            for num_nodes in opts.sizes:
+                LOG.info('Benchmarking a topology with %d nodes', num_nodes)
+                for result in run_benchmark(num_nodes, config=config, latency=opts.latency,
+                                            failure_rate=opts.failure_rate, degree=opts.degree,
+                                            seed=opts.seed, trace_memory=not opts.no_memory):
+                    output.write(json.dumps(result, sort_keys=True) + '\n')
+                    output.flush()
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(work_directory)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
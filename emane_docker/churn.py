@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+from threading import Event
+from time import monotonic
+
+from emane_docker.constant import Constant
+from emane_docker.eel import pathloss_line
+from emane_docker.log import LOG, SampledLogger
+from emane_docker.rng import RandomStreams
+from emane_docker.timing_wheel import TimingWheel
+
+
+class LinkChurnEngine:
+    """
+    Brings the links of the topology up and down independently. Each link stays in its state for
+    a Gaussian distributed duration, sampled from its own random stream, then switches to the
+    other state. Transitions are scheduled on a timing wheel, so each transition costs O(1)
+    regardless of the number of links.
+
+    :param links: The links of the topology.
+    :param mean: Mean duration of a link state, in seconds.
+    :param variance: Variance of the duration of a link state.
+    :param duration: Duration of the experiment, in seconds.
+    :param publisher: Event publisher, required only to run the engine live.
+    :param random_streams: Random streams of the experiment, each link samples from its own
+        stream.
+    :param resolution: Resolution of the transition times, in seconds. Durations shorter than the
+        resolution are rounded up to it.
+    """
+
+    def __init__(self, links, mean, variance, duration, publisher=None, random_streams=None,
+                 resolution=Constant.CHURN_RESOLUTION):
+        if mean <= 0 or variance < 0:
+            raise ValueError('Link state durations must have a positive mean and a non-negative '
+                             'variance (mean: %s, variance: %s)' % (mean, variance))
+        self.links = links
+        self.mean = float(mean)
+        self.deviation = float(variance) ** 0.5
+        self.duration = duration
+        self.publisher = publisher
+        self.random_streams = random_streams if random_streams is not None else RandomStreams()
+        self.resolution = resolution
+        self.stopped = Event()
+
+    def _state_duration(self, rng):
+        return max(rng.normal(self.mean, self.deviation), self.resolution)
+
+    def transitions(self):
+        """
+        Samples the link transitions until the end of the experiment, in time order. The status of
+        each link is updated as its transitions are generated.
+
+        :return: Generator of (time, link) tuples, the new state is in link.status.
+        """
+        wheel = TimingWheel(self.resolution)
+        generators = {}
+        for link in self.links:
+            rng = generators[link.id] = self.random_streams.generator('churn', link.id)
+            wheel.schedule(self._state_duration(rng), link)
+        for event_time, link in wheel.expire(self.duration):
+            if event_time > self.duration:
+                continue
+            link.status = link.DOWN if link.status == link.UP else link.UP
+            wheel.schedule(event_time + self._state_duration(generators[link.id]), link)
+            yield event_time, link
+
+    @staticmethod
+    def pathloss(link):
+        if link.status == link.UP:
+            return Constant.PATHLOSS_CONNECTED
+        return Constant.PATHLOSS_DISCONNECTED
+
+    def export_eel(self, offset=0.0):
+        """
+        Samples the link transitions ahead of time as EEL lines, to be replayed by the EMANE event
+        service. The link statuses are restored after the export.
+
+        :param offset: Offset added to each event time, in seconds.
+        :return: Generator of (time, EEL line) tuples.
+        """
+        statuses = [link.status for link in self.links]
+        try:
+            for event_time, link in self.transitions():
+                event_time += offset
+                pathloss = self.pathloss(link)
+                yield event_time, pathloss_line(event_time, link.node1.nem_id,
+                                                [(link.node2.nem_id, pathloss)])
+                yield event_time, pathloss_line(event_time, link.node2.nem_id,
+                                                [(link.node1.nem_id, pathloss)])
+        finally:
+            for link, status in zip(self.links, statuses):
+                link.status = status
+
+    def start(self):
+        """
+        Runs the churn engine, publishing the transitions that are due together.
+        """
+        LOG.info('Link churn is started with %d links (mean: %.2f s, deviation: %.2f s).',
+                 len(self.links), self.mean, self.deviation)
+        transition_log = SampledLogger(LOG, max_per_second=Constant.EVENT_LOG_RATE)
+        start_time = monotonic()
+        updates = {}
+        num_transitions = 0
+        for event_time, link in self.transitions():
+            delay = start_time + event_time - monotonic()
+            if delay > 0:
+                if updates:
+                    self.publisher.publish_pathloss(updates)
+                    updates = {}
+                self.stopped.wait(delay)
+            if self.stopped.is_set():
+                updates = {}
+                break
+            pathloss = self.pathloss(link)
+            updates.setdefault(link.node1.nem_id, []).append((link.node2.nem_id, pathloss))
+            updates.setdefault(link.node2.nem_id, []).append((link.node1.nem_id, pathloss))
+            num_transitions += 1
+            transition_log.debug('Link %d (%s - %s) is %s at %.3f', link.id, link.node1.name,
+                                 link.node2.name, 'up' if link.status == link.UP else 'down',
+                                 event_time)
+        if updates:
+            self.publisher.publish_pathloss(updates)
+        LOG.info('Link churn is finished after %d transitions.', num_transitions)
+
+    def stop(self):
+        """
+        Stops the churn engine, start returns before the next transition.
+        """
+        self.stopped.set()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import io
+import json
+import os
+import tarfile
+from time import time
+
+
+def pack_directory(path):
+    """
+    Packs the files of a directory tree into an uncompressed tar archive, with paths relative to
+    the directory, e.g. to be extracted into a container with put_archive.
+
+    :param path: The directory.
+    :return: The archive, as bytes.
+    """
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w') as tar:
+        for root, directories, files in os.walk(path):
+            directories.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                tar.add(file_path, arcname=os.path.relpath(file_path, path))
+    return buffer.getvalue()
+
+
+def pack_files(files):
+    """
+    Packs files given by their contents into an uncompressed tar archive.
+
+    :param files: Dictionary from a path in the archive to the contents, as bytes.
+    :return: The archive, as bytes.
+    """
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w') as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = time()
+            tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def unpack_file(chunks, name):
+    """
+    Extracts a file from a tar archive streamed by get_archive.
+
+    :param chunks: Iterable of the archive chunks.
+    :param name: Name of the file in the archive.
+    :return: The contents of the file, as bytes.
+    """
+    with tarfile.open(fileobj=io.BytesIO(b''.join(chunks)), mode='r') as tar:
+        return tar.extractfile(name).read()
+
+
+def index_file(bundle_file):
+    return bundle_file + '.index'
+
+
+class ConfigBundleWriter:
+    """
+    Writes the configurations of all nodes into a single tar archive, one member per node. Each
+    member is itself the tar archive of the node configurations, so that it can be streamed into
+    the container as is. The offset and the size of each member are written to an index next to
+    the bundle, so that a member is read with a single seek.
+
+    :param bundle_file: Path to the bundle.
+    """
+
+    def __init__(self, bundle_file):
+        self.bundle_file = bundle_file
+        self.tar = tarfile.open(bundle_file, mode='w')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, name, data):
+        """
+        Adds the configurations of a node.
+
+        :param name: Name of the node.
+        :param data: Tar archive of the node configurations, as bytes.
+        """
+        info = tarfile.TarInfo('%s.tar' % name)
+        info.size = len(data)
+        info.mtime = time()
+        self.tar.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        self.tar.close()
+        with open(index_file(self.bundle_file), 'w') as f:
+            json.dump(scan_bundle(self.bundle_file), f)
+
+
+def scan_bundle(bundle_file):
+    """
+    Reads the member headers of a bundle.
+
+    :param bundle_file: Path to the bundle.
+    :return: Dictionary from a node name to the offset and the size of its member.
+    """
+    with tarfile.open(bundle_file, mode='r') as tar:
+        return {os.path.splitext(member.name)[0]: (member.offset_data, member.size)
+                for member in tar.getmembers() if member.isfile()}
+
+
+class ConfigBundle:
+    """
+    Reads the node configurations from a bundle written by ConfigBundleWriter. If the index is
+    missing, the member headers of the bundle are scanned.
+
+    :param bundle_file: Path to the bundle.
+    """
+
+    def __init__(self, bundle_file):
+        self.bundle_file = bundle_file
+        try:
+            with open(index_file(bundle_file)) as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = scan_bundle(bundle_file)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def read(self, name):
+        """
+        Reads the configurations of a node.
+
+        :param name: Name of the node.
+        :return: Tar archive of the node configurations, as bytes.
+        """
+        offset, size = self.index[name]
+        with open(self.bundle_file, 'rb') as f:
+            f.seek(offset)
+            return f.read(size)
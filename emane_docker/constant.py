@@ -22,8 +22,138 @@ class Constant:
 
     # Paths
     CP_CONFIG_DIRECTORY = "container_helpers/configs"
+    EVENT_SERVICE_DIRECTORY = "container_helpers/eventservice"
+    EVENT_SERVICE_PIDFILE = "/var/run/emaneeventservice.pid"
+    NAMESPACE_DIRECTORY = "container_helpers/namespaces"
+    MONITORING_DIRECTORY = "container_helpers/monitoring"
+    TOPOLOGY_CACHE_DIRECTORY = "container_helpers/cache"
+    # Incremented when the format of the topology cache changes.
+    TOPOLOGY_CACHE_VERSION = 2
+    # Topologies with more nodes are drawn without labels and with rasterized nodes and edges.
+    DRAW_LARGE_TOPOLOGY = 200
     TEMPLATE_DIRECTORY = "templates"
 
+    # EMANE Event Service
+    EVENT_SERVICE_GROUP = "224.1.2.8"
+    EVENT_SERVICE_PORT = 45703
+    EVENT_MODE_LIVE = "live"
+    EVENT_MODE_EEL = "eel"
+    SUPPORTED_EVENT_MODES = [EVENT_MODE_LIVE, EVENT_MODE_EEL]
+    # Time between restarting the event service and the first exported event, in seconds.
+    EEL_LEAD_TIME = 1.0
+    # Maximum number of per-event debug logs per second during live experiments.
+    EVENT_LOG_RATE = 10.0
+    # Pathloss between the NEMs of connected and disconnected nodes, in dB.
+    PATHLOSS_CONNECTED = 0
+    PATHLOSS_DISCONNECTED = 200
+    # Resolution of the link churn transition times, in seconds.
+    CHURN_RESOLUTION = 0.001
+    # Prints the routing table of a node, polled by the convergence probe.
+    ROUTE_TABLE_COMMAND = "ip -4 route show"
+    # Maximum number of nodes polled at once, e.g. for their routing tables or measurements.
+    NODE_POLL_THREADS = 32
+    # Prints the number of routes installed by Zebra, followed by `<rss in KB> <daemon>` lines of
+    # the routing daemons, polled by the route scale measurement.
+    ROUTE_SCALE_STATUS_COMMAND = ("ip -4 route show proto zebra | wc -l; ps -o rss=,comm= "
+                                  "-C zebra,ospfd,bgpd,ripd,isisd,olsrd,olsrd2_static")
+
+    # Docker
+    DOCKER_SUBNET = "10.99.0.100/24"
+    TELEGRAF_PORT_BASE = 20000
+    MAX_PORT = 65535
+    MAX_INTERFACE_NAME_LENGTH = 15
+    CONTAINER_DIGEST_LABEL = "emane-docker.digest"
+    NETWORK_DRIVER_BRIDGE = "bridge"
+    NETWORK_DRIVER_MACVLAN = "macvlan"
+    NETWORK_DRIVER_IPVLAN = "ipvlan"
+    SUPPORTED_NETWORK_DRIVERS = [NETWORK_DRIVER_BRIDGE, NETWORK_DRIVER_MACVLAN,
+                                 NETWORK_DRIVER_IPVLAN]
+    # Multicast group of the OTA benchmark, next to the EMANE OTA and event service groups.
+    OTA_BENCHMARK_GROUP = "224.1.2.9:45704"
+    # Time the OTA benchmark receivers are started before and stopped after the senders.
+    OTA_BENCHMARK_GUARD_TIME = 1.0
+    OTA_BENCHMARK_RECEIVER_FILE = "/tmp/ota-benchmark-receiver.json"
+    OTA_BENCHMARK_SENDER_FILE = "/tmp/ota-benchmark-sender.json"
+    # Stops the experiment processes of a warm container, clears the MGEN output and restarts
+    # zebra. EMANE must exit before it is started again, since it owns the emane0 interface, the
+    # daemons that do not exit within WARM_RESET_TIMEOUT seconds are killed.
+    WARM_RESET_TIMEOUT = 10
+    WARM_RESET_COMMAND = (
+        "pkill -x mgen; pkill -x iperf3; rm -f /etc/quagga/mgen.out; "
+        "pkill -x emane; pkill -x olsrd; pkill -x olsrd2_static; pkill -x ospfd; "
+        "pkill -x bgpd; pkill -f /fpm/main.py; pkill -x zebra; "
+        "timeout %d sh -c 'while pgrep -x emane > /dev/null || pgrep -x zebra > /dev/null; "
+        "do sleep 0.1; done' || { pkill -9 -x emane; pkill -9 -x zebra; sleep 0.5; }; "
+        "zebra -d -f /etc/quagga/zebra.conf --fpm_format protobuf" % WARM_RESET_TIMEOUT)
+
+    # Configuration delivery, the node configurations are either bind-mounted from the host or
+    # streamed into the containers from a single bundle.
+    CONFIG_DELIVERY_BIND = "bind"
+    CONFIG_DELIVERY_BUNDLE = "bundle"
+    SUPPORTED_CONFIG_DELIVERIES = [CONFIG_DELIVERY_BIND, CONFIG_DELIVERY_BUNDLE]
+    CONFIG_BUNDLE_FILE = "configs.tar"
+    # Directory of the node configurations in the containers.
+    CONTAINER_CONFIG_DIRECTORY = "/etc/quagga"
+
+    # Helper programs of the nodes, started by a single script per node.
+    EMANE_START_COMMAND = ("emane /etc/quagga/platform.xml -r -d -l 3 -f /var/log/emane.log "
+                           "--pidfile /var/run/emane.pid --uuidfile /var/run/emane.uuid")
+    FPM_START_COMMAND = ("if command -v python3 > /dev/null; then python3 /fpm/main.py; "
+                         "else python /fpm/main.py; fi")
+    # Prefix of the step status lines printed by the helper script.
+    HELPER_STATUS_PREFIX = "@@helper-step"
+    # Log file of the helper step outputs in the containers.
+    HELPER_LOG_FILE = "/var/log/emane-docker-helpers.log"
+
+    # MGEN is launched in the background, after printing the launch time in nanoseconds. The
+    # schedule starts at the given wall clock time (HH:MM:SS GMT).
+    MGEN_LAUNCH_COMMAND = ("date +%%s%%N; mgen input /etc/quagga/mgen.in start %sGMT "
+                           "output /etc/quagga/mgen.out > /dev/null 2>&1 &")
+    # Time between launching MGEN and the start of the flows, in seconds.
+    MGEN_START_LEAD_TIME = 2.0
+    # Maximum number of nodes MGEN is launched at at once.
+    MGEN_LAUNCH_THREADS = 64
+    # Live results: maximum bytes read from an MGEN output at each poll, number of kept samples
+    # of the totals and maximum number of outputs read at once.
+    LIVE_RESULTS_MAX_READ = 4 * 1024 * 1024
+    LIVE_RESULTS_HISTORY = 3600
+    LIVE_RESULTS_THREADS = 64
+
+    # Traffic workloads, periodic MGEN flows or saturating iperf3 transfers.
+    WORKLOAD_MGEN = "mgen"
+    WORKLOAD_IPERF3 = "iperf3"
+    # Port of the first iperf3 server of a node, a server node runs one server per client.
+    IPERF_PORT_BASE = 5201
+    # Time between starting the iperf3 servers and the clients, in seconds.
+    IPERF_SERVER_WAIT_TIME = 1.0
+    # Maximum number of iperf3 exec calls at once, the clients are started detached so all
+    # transfers run concurrently.
+    IPERF_THREADS = 256
+    # Result file of an iperf3 client in its container, by server name and port, and the time the
+    # results are read after the end of the transfers, in seconds.
+    IPERF_RESULT_FILE = "/tmp/iperf-%s-%d.json"
+    IPERF_RESULT_WAIT_TIME = 2.0
+
+    # Traffic matrix modes and the traffic roles of the nodes.
+    TRAFFIC_MATRIX_UNIFORM = "uniform"
+    TRAFFIC_MATRIX_GRAVITY = "gravity"
+    TRAFFIC_MATRIX_HOTSPOT = "hotspot"
+    TRAFFIC_MATRIX_FILE = "file"
+    TRAFFIC_MATRIX_MODES = [TRAFFIC_MATRIX_UNIFORM, TRAFFIC_MATRIX_GRAVITY, TRAFFIC_MATRIX_HOTSPOT,
+                            TRAFFIC_MATRIX_FILE]
+    TRAFFIC_ROLE_CLIENT = "client"
+    TRAFFIC_ROLE_SERVER = "server"
+    TRAFFIC_ROLE_BOTH = "both"
+    TRAFFIC_ROLES = [TRAFFIC_ROLE_CLIENT, TRAFFIC_ROLE_SERVER, TRAFFIC_ROLE_BOTH]
+
+    # Monitoring
+    MONITORING_PER_NODE = "per_node"
+    MONITORING_AGGREGATOR = "aggregator"
+    SUPPORTED_MONITORING_MODES = [MONITORING_PER_NODE, MONITORING_AGGREGATOR]
+    TELEGRAF_AGGREGATOR_IMAGE = "telegraf:1.10"
+    # UDP port the aggregator receives the node metrics at, inside the Docker network.
+    TELEGRAF_AGGREGATOR_PORT = 8094
+
     # Misc.
 
     REDIS_WAIT_TIME = 5.0
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+
+
+from threading import Event, Thread
+from time import sleep
+from multiprocessing.pool import ThreadPool
+
+from emane_docker.churn import LinkChurnEngine
+from emane_docker.constant import Constant
+from emane_docker.convergence import ConvergenceProbe, ProbedPublisher
+from emane_docker.event_generator import EventGenerator, EventPublisher
+from emane_docker.iperf_workload import IperfWorkload
+from emane_docker.live_results import LiveCollector
+from emane_docker.log import LOG
+from emane_docker.mobility import MobilityEngine
+from emane_docker.ota_benchmark import OtaBenchmark
+from emane_docker.route_oracle import RouteOracle, parse_routes
+from emane_docker.traffic_generator import TrafficGenerator
+from emane_docker.util import mkdir_p
+
+
+class ExperimentController:
+    """
+    Runs the experiments on a deployed EMANE topology: the link updates, mobility, churn and
+    traffic, the live results and the route and OTA measurements, and serves the CLI.
+
+    :param topology: The deployed EMANE topology.
+    """
+
+    def __init__(self, topology):
+        self.topology = topology
+        self.config = topology.config
+        self.event_generator = None
+        self.traffic_generator = None
+        self.mobility_engine = None
+        self.churn_engine = None
+        self.convergence_probe = None
+        self.live_collector = None
+        # Set when the live results abort the running experiment.
+        self.experiment_aborted = Event()
+        self.route_oracle = None
+
+    def node_addresses(self):
+        """
+        Returns the owner of each address of the topology, the NEM addresses and both ends of the
+        links.
+
+        :return: Dictionary from an integer IPv4 address to a node index.
+        """
+        addresses = {self.topology.address_allocator.nem_address_int(node.nem_id): node.index
+                     for node in self.topology.nodes.values()}
+        for link in self.topology.links:
+            addresses[link.node1_ipv4_int] = link.node1.index
+            addresses[link.node2_ipv4_int] = link.node2.index
+        return addresses
+
+    def verify_routes(self, command=Constant.ROUTE_TABLE_COMMAND):
+        """
+        Collects the routing tables of all nodes in parallel and compares them with the routes
+        expected for the current link states. The route oracle is created at the first call and
+        updated incrementally afterwards.
+
+        :param command: Command printing the routing table of a node.
+        :return: Dictionary of the total numbers of correct, missing, wrong and unexpected routes,
+            and the names of the nodes with incorrect routes.
+        """
+        if self.route_oracle is None:
+            self.route_oracle = RouteOracle(self.topology.nodes, self.topology.links)
+        else:
+            self.route_oracle.update(self.topology.links)
+        node_addresses = self.node_addresses()
+
+        def collect(node):
+            result = self.topology.exec_run(node, command)
+            if result.exit_code != 0:
+                LOG.warning('Routing table of %s cannot be read: %s', node.name, result.output)
+                return node.index, None
+            return node.index, parse_routes(result.output.decode(errors='replace'),
+                                            node_addresses)
+
+        nodes = self.topology.nodes.values()
+        threadpool = ThreadPool(min(len(nodes), Constant.NODE_POLL_THREADS) or 1)
+        fibs = {index: routes for index, routes in threadpool.map(collect, nodes)
+                if routes is not None}
+        threadpool.close()
+        threadpool.join()
+        result = self.route_oracle.compare_all(fibs)
+        LOG.info('Routes of %d nodes: %d correct, %d missing, %d wrong, %d unexpected.',
+                 len(fibs), result['correct'], result['missing'], result['wrong'],
+                 result['unexpected'])
+        if result['incorrect_nodes']:
+            LOG.info('Nodes with incorrect routes: %s', ', '.join(result['incorrect_nodes']))
+        return result
+
+    def measure_route_installation(self):
+        """
+        Measures the FIB install rate of the route scale static routes and the memory of the
+        routing daemons, and writes the results to route_scale.json in the configuration
+        directory.
+
+        :return: Measurement results of each node.
+        """
+        route_scale = self.topology.route_scale
+        LOG.info('Measuring the installation of %d routes per node...', route_scale.routes)
+        results = route_scale.measure_installation(self.topology.nodes, self.topology.exec_run)
+        route_scale.write_report(results, '%s/route_scale.json' % self.topology.config_directory)
+        return results
+
+    def run_ota_benchmark(self):
+        """
+        Measures the multicast throughput of the Docker network of the nodes, and writes the
+        results to ota_benchmark.json in the configuration directory.
+
+        :return: Summary of the benchmark, or None if it cannot run.
+        """
+        try:
+            benchmark = OtaBenchmark.from_config(self.config, self.topology.nodes,
+                                                 self.topology.exec_run)
+            LOG.info('Running the OTA benchmark on the %s network for %.1f seconds...',
+                     self.topology.emane_network.driver, benchmark.duration)
+            summary = benchmark.run()
+        except ValueError as exc:
+            LOG.error('OTA benchmark cannot run: %s', exc)
+            return None
+        summary['driver'] = self.topology.emane_network.driver
+        summary['mtu'] = self.topology.emane_network.mtu
+        mkdir_p(self.topology.config_directory)
+        benchmark.write_report(summary, '%s/ota_benchmark.json' % self.topology.config_directory)
+        return summary
+
+    def start_live_collector(self):
+        """
+        Starts collecting the MGEN results of the running experiment, if live_results is enabled.
+        The outputs are read from the bind-mounted configuration directories, or through exec if
+        the configurations are delivered as a bundle.
+        """
+        if not isinstance(self.traffic_generator, TrafficGenerator) or \
+                not self.traffic_generator.flows:
+            return
+        destinations = {flow[1] for flow in self.traffic_generator.flows.values()}
+        receivers = [node for node in self.topology.nodes.values() if node.nem_ipv4 in destinations]
+        exec_run = None
+        if self.topology.config_delivery == Constant.CONFIG_DELIVERY_BUNDLE:
+            exec_run = self.topology.exec_run
+        self.experiment_aborted.clear()
+        self.live_collector = LiveCollector.from_config(
+            self.config, receivers, flows=self.traffic_generator.flows,
+            schedule_start=self.traffic_generator.schedule_start, exec_run=exec_run,
+            config_directory=self.topology.config_directory, on_abort=self.abort_experiment)
+        if self.live_collector is not None:
+            self.live_collector.start()
+
+    def stop_live_collector(self):
+        """
+        Stops collecting the live results and writes them to live_results.json in the
+        configuration directory. It is safe to call more than once.
+        """
+        live_collector, self.live_collector = self.live_collector, None
+        if live_collector is None:
+            return
+        live_collector.stop()
+        live_collector.write_report('%s/live_results.json' % self.topology.config_directory)
+
+    def abort_experiment(self):
+        """
+        Aborts the running experiment: the link updates, mobility and churn are stopped and MGEN is
+        stopped on all nodes.
+        """
+        for engine in (self.event_generator, self.mobility_engine, self.churn_engine):
+            if engine is not None:
+                engine.stop()
+        self.topology.run_threadpool(
+            method=lambda node: self.topology.exec_run(node, ['pkill', '-x', 'mgen']),
+            params=[node for node in self.topology.nodes.values()
+                    if node.name in self.topology.containers])
+        self.experiment_aborted.set()
+
+    def create_event_publisher(self):
+        """
+        Creates an event publisher to the event service of the topology. If the convergence probe
+        is running, the published link updates are timestamped by the probe.
+
+        :return: The event publisher.
+        """
+        publisher = EventPublisher(device=self.topology.emane_network.event_device)
+        if self.convergence_probe is not None:
+            return ProbedPublisher(publisher, self.convergence_probe)
+        return publisher
+
+    def create_event_generator(self):
+        self.event_generator = EventGenerator(nodes=self.topology.nodes,
+                                              link_update=self.config['experiment']['link_update'],
+                                              duration=self.config['experiment']['duration'],
+                                              publisher=self.create_event_publisher(),
+                                              random_streams=self.topology.random_streams,
+                                              log_rate=self.config['experiment'].get(
+                                                  'event_log_rate', Constant.EVENT_LOG_RATE))
+        return self.event_generator
+
+    def start_event_generator(self):
+        self.create_event_generator()
+        self.event_generator.start(record_file=self.config['experiment'].get('record_events',
+                                                                             None))
+
+    def start_eel_experiment(self, wait=False):
+        """
+        Runs the experiment with the EMANE event service replaying the link updates. The whole
+        schedule, link updates and mobility, is sampled ahead of time and written to the scenario
+        file, then the event service is restarted with the new scenario.
+
+        :param wait: If set, blocks until the end of the experiment.
+        :return: 0 on success, -1 if the schedule cannot be sampled ahead of time.
+        """
+        experiment = self.config['experiment']
+        lead_time = experiment.get('eel_lead_time', Constant.EEL_LEAD_TIME)
+        self.create_event_generator()
+        if self.event_generator.distribution.num_simulations == float('inf'):
+            LOG.error('Link updates are not limited, they cannot be exported to an EEL file.')
+            return -1
+        streams = [self.event_generator.export_eel(offset=lead_time)]
+        try:
+            if self.create_mobility_engine() is not None:
+                streams.append(self.mobility_engine.export_eel(offset=lead_time))
+        except (OSError, ValueError) as exc:
+            LOG.error('Mobility engine cannot be started: %s', exc)
+            return -1
+        try:
+            if self.create_churn_engine() is not None:
+                streams.append(self.churn_engine.export_eel(offset=lead_time))
+        except (TypeError, ValueError) as exc:
+            LOG.error('Link churn cannot be started: %s', exc)
+            return -1
+
+        num_lines = self.topology.generate_emane_scenario_eel(*streams)
+        LOG.info('%d events are exported to %s', num_lines, self.topology.scenario_file)
+        self.topology.stop_emane_eventservice()
+        self.topology.start_emane_eventservice()
+        self.start_traffic_generator()
+        self.start_live_collector()
+        num_simulations = self.event_generator.distribution.num_simulations
+        end_time = lead_time + experiment['duration'] * num_simulations
+        if wait:
+            self.finish_eel_experiment(end_time)
+        else:
+            # The CLI is not blocked, the results are collected at the end of the replay.
+            Thread(target=self.finish_eel_experiment, args=(end_time,), daemon=True).start()
+        return 0
+
+    def finish_eel_experiment(self, end_time):
+        """
+        Waits for the end of the EEL replay, then stops the live collector and collects the
+        outputs. The replay is not interrupted, but an aborted experiment is not waited for.
+
+        :param end_time: Time from the start of the replay to its end, in seconds.
+        """
+        self.experiment_aborted.wait(end_time)
+        self.stop_live_collector()
+        self.topology.collect_outputs()
+
+    def create_mobility_engine(self, publisher=None):
+        """
+        Creates the mobility engine if the mobility pattern is random_waypoint or a trace file.
+
+        :param publisher: Event publisher, required only to run the engine live.
+        :return: The mobility engine, or None if there is no mobility.
+        """
+        mobility_pattern = self.config.get('mobility_pattern', 'none')
+        if mobility_pattern in (None, 'none', 'random'):
+            LOG.debug('No mobility engine is configured (mobility_pattern: %s).', mobility_pattern)
+            return None
+        rng = self.topology.random_streams.generator('mobility')
+        self.mobility_engine = MobilityEngine(nodes=self.topology.nodes,
+                                              mobility_pattern=mobility_pattern,
+                                              mobility_config=self.config.get('mobility', None),
+                                              duration=self.config['experiment']['duration'],
+                                              publisher=publisher, rng=rng)
+        return self.mobility_engine
+
+    def start_mobility_engine(self):
+        """
+        Starts the mobility engine in the background.
+
+        :return: The thread running the mobility engine, or None if there is no mobility.
+        """
+        try:
+            if self.create_mobility_engine(
+                    publisher=self.create_event_publisher()) is None:
+                return None
+        except (OSError, ValueError) as exc:
+            LOG.error('Mobility engine cannot be started: %s', exc)
+            return None
+        thread = Thread(target=self.mobility_engine.start, daemon=True)
+        thread.start()
+        return thread
+
+    def create_churn_engine(self, publisher=None):
+        """
+        Creates the link churn engine if the mobility pattern is random, each link goes up and down
+        with the durations configured in mobility_random_parameters.
+
+        :param publisher: Event publisher, required only to run the engine live.
+        :return: The churn engine, or None if the mobility pattern is not random.
+        """
+        if self.config.get('mobility_pattern', 'none') != 'random':
+            return None
+        parameters = self.config.get('mobility_random_parameters', None) or {}
+        self.churn_engine = LinkChurnEngine(links=self.topology.links,
+                                            mean=parameters.get('mean', 3.0),
+                                            variance=parameters.get('variance', 1.0),
+                                            duration=self.config['experiment']['duration'],
+                                            publisher=publisher,
+                                            random_streams=self.topology.random_streams)
+        return self.churn_engine
+
+    def start_churn_engine(self):
+        """
+        Starts the link churn engine in the background.
+
+        :return: The thread running the churn engine, or None if there is no churn.
+        """
+        try:
+            if self.create_churn_engine(
+                    publisher=self.create_event_publisher()) is None:
+                return None
+        except (TypeError, ValueError) as exc:
+            LOG.error('Link churn cannot be started: %s', exc)
+            return None
+        thread = Thread(target=self.churn_engine.start, daemon=True)
+        thread.start()
+        return thread
+
+    def start_traffic_generator(self):
+        """
+        Starts the traffic of the experiment, MGEN flows or the iperf3 workload.
+
+        :return: The thread running the iperf3 workload, or None for MGEN.
+        """
+        experiment = self.config['experiment']
+        if experiment['traffic'].get('workload', Constant.WORKLOAD_MGEN) == \
+                Constant.WORKLOAD_IPERF3:
+            return self.start_iperf_workload()
+        # Start MGEN traffic generator
+        upload = self.topology.config_delivery == Constant.CONFIG_DELIVERY_BUNDLE
+        config_directory = self.topology.config_directory
+        try:
+            self.traffic_generator = TrafficGenerator(nodes=self.topology.nodes,
+                                                      containers=self.topology.containers,
+                                                      traffic_config=experiment['traffic'],
+                                                      duration=experiment['duration'],
+                                                      generate_configurations=False,
+                                                      random_streams=self.topology.random_streams,
+                                                      config_directory=config_directory,
+                                                      upload=upload,
+                                                      start_lead_time=experiment['traffic'].get(
+                                                          'start_lead_time',
+                                                          Constant.MGEN_START_LEAD_TIME))
+            self.traffic_generator.start()
+        except ValueError as exc:
+            LOG.error('Traffic generator cannot be started: %s', exc)
+        return None
+
+    def start_iperf_workload(self):
+        """
+        Starts the iperf3 workload in the background.
+
+        :return: The thread running the workload, or None if it cannot be started.
+        """
+        try:
+            self.traffic_generator = IperfWorkload.from_config(
+                self.config, self.topology.nodes, self.topology.exec_run,
+                random_streams=self.topology.random_streams,
+                config_directory=self.topology.config_directory)
+            self.traffic_generator.pairs()
+        except ValueError as exc:
+            LOG.error('iperf3 workload cannot be started: %s', exc)
+            return None
+        thread = Thread(target=self.traffic_generator.start, daemon=True)
+        thread.start()
+        return thread
+
+    def run_experiment(self, wait=False):
+        if 'experiment' in self.config and self.config['experiment'].get('enabled', False):
+            if wait:
+                sleep_time = 1.0 * len(self.topology.nodes)
+                LOG.info('Waiting for %.1f seconds before running the experiment', sleep_time)
+                sleep(sleep_time)
+            event_mode = self.config['experiment'].get('event_mode', Constant.EVENT_MODE_LIVE)
+            if event_mode not in Constant.SUPPORTED_EVENT_MODES:
+                LOG.error('Unsupported event mode %s, expected one of %s.', event_mode,
+                          Constant.SUPPORTED_EVENT_MODES)
+                return -1
+            LOG.info('Experiment is started.')
+            if event_mode == Constant.EVENT_MODE_EEL:
+                convergence = self.config['experiment'].get('convergence', None) or {}
+                if convergence.get('enabled', False):
+                    LOG.warning('Convergence is measured only in live mode, the link updates of '
+                                'the EEL file are not timestamped.')
+                return self.start_eel_experiment(wait=wait)
+            self.convergence_probe = ConvergenceProbe.from_config(self.config, self.topology.nodes,
+                                                                  self.topology.exec_run)
+            if self.convergence_probe is not None:
+                self.convergence_probe.start()
+            mobility_thread = self.start_mobility_engine()
+            churn_thread = self.start_churn_engine()
+            traffic_thread = self.start_traffic_generator()
+            self.start_live_collector()
+            self.start_event_generator()
+            if mobility_thread is not None:
+                mobility_thread.join()
+            if churn_thread is not None:
+                churn_thread.join()
+            if traffic_thread is not None:
+                traffic_thread.join()
+            self.stop_live_collector()
+            if self.convergence_probe is not None:
+                self.convergence_probe.stop()
+                self.convergence_probe.write_report(
+                    '%s/convergence.json' % self.topology.config_directory)
+                self.convergence_probe = None
+            self.topology.collect_outputs()
+        else:
+            LOG.debug('No experiments will be run, check the configuration file. '
+                      'Either experiment is not configured or disabled.')
+        return 0
+
+    def start_cli(self):
+        """
+        Starts EMANE-Docker CLI.
+
+        """
+        if self.topology.connect_redis_clients() != 0:
+            return -1
+        while True:
+            command = input('emane-docker> ')
+            if command == 'quit':
+                break
+            if command == 'start-experiment':
+                LOG.info('Experiment will be initialized now... '
+                         'CLI will not be accessible meanwhile.')
+                self.run_experiment(wait=False)
+            elif command == 'start-event-generator':
+                self.start_event_generator()
+            elif command == 'start-traffic-generator':
+                self.start_traffic_generator()
+            elif command == 'start-mobility':
+                self.start_mobility_engine()
+            elif command == 'start-churn':
+                self.start_churn_engine()
+            elif command == 'verify-routes':
+                self.verify_routes()
+            elif command == 'ota-benchmark':
+                self.run_ota_benchmark()
+            elif command == 'live-results':
+                print(self.live_collector.format_summary() if self.live_collector is not None
+                      else 'Live results are not being collected, see experiment.live_results '
+                      'and live_results.json of the last experiment.')
+            elif command.startswith('apply-topology '):
+                self.topology.apply_topology(command.split(maxsplit=1)[1].strip())
+            elif command in ('help', '?'):
+                print('Available commands are:\n%s' % '\n'.join(
+                    ['help', 'quit', 'start-experiment', 'start-event-generator',
+                     'start-traffic-generator', 'start-mobility', 'start-churn',
+                     'apply-topology <topology file>', 'verify-routes', 'ota-benchmark',
+                     'live-results']))
+            else:
+                print('%s is not a valid command. Type `help` to see available commands.' % command)
+
+        return self.topology.release()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+import json
+from multiprocessing.pool import ThreadPool
+from threading import Lock, Thread
+from time import monotonic, sleep
+
+import numpy as np
+
+from emane_docker.constant import Constant
+from emane_docker.log import LOG
+from emane_docker.metrics import REGISTRY
+
+CONVERGENCE_SECONDS = REGISTRY.histogram(
+    'emane_docker_convergence_seconds',
+    'Time from a link update until the routing tables of all nodes are stable',
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0))
+
+
+class ConvergenceProbe:
+    """
+    Measures the routing convergence time after link updates. The routing tables of all nodes are
+    polled in parallel, and each link update is timestamped when it is published. An update is
+    converged when no routing table changes for stable_time seconds, its convergence time is the
+    time from the update until the poll that observed the last change. Updates published before
+    the previous one converged are marked as overlapped, their convergence times include the
+    changes caused by the later updates.
+
+    :param nodes: The nodes of the topology.
+    :param exec_run: Function running a command in the container of a node, e.g.
+        EmaneTopology.exec_run.
+    :param control_plane: Name of the control plane the measurements are reported for.
+    :param poll_interval: Time between the starts of two polls, in seconds.
+    :param stable_time: Time without routing table changes after which an update is converged.
+    :param timeout: Updates that do not converge within this time are reported as timed out.
+    :param command: Command printing the routing table of a node.
+    """
+
+    def __init__(self, nodes, exec_run, control_plane, poll_interval=0.5, stable_time=3.0,
+                 timeout=60.0, command=Constant.ROUTE_TABLE_COMMAND):
+        self.nodes = sorted(nodes.values(), key=lambda node: node.index)
+        self.exec_run = exec_run
+        self.control_plane = control_plane
+        self.poll_interval = poll_interval
+        self.stable_time = stable_time
+        self.timeout = timeout
+        self.command = command
+        self.lock = Lock()
+        self.tables = None
+        self.pending = []
+        self.results = []
+        self.running = False
+        self.thread = None
+        self.threadpool = None
+
+    @classmethod
+    def from_config(cls, config, nodes, exec_run):
+        """
+        Creates the probe using the convergence block of the experiment configuration.
+
+        :param config: EMANE-Docker configuration.
+        :param nodes: The nodes of the topology.
+        :param exec_run: Function running a command in the container of a node.
+        :return: The probe, or None if it is not enabled.
+        """
+        convergence = (config.get('experiment', None) or {}).get('convergence', None) or {}
+        if not convergence.get('enabled', False):
+            return None
+        return cls(nodes=nodes, exec_run=exec_run,
+                   control_plane='+'.join(config.get('control_planes', None) or []),
+                   poll_interval=convergence.get('poll_interval', 0.5),
+                   stable_time=convergence.get('stable_time', 3.0),
+                   timeout=convergence.get('timeout', 60.0),
+                   command=convergence.get('command', Constant.ROUTE_TABLE_COMMAND))
+
+    def routing_table(self, node):
+        """
+        Returns the routing table of a node as a set of routes, so that the order of the routes
+        does not matter.
+
+        :param node: The node.
+        :return: Frozen set of route lines, or None if the command fails.
+        """
+        try:
+            result = self.exec_run(node, self.command)
+        except Exception as exc:
+            LOG.debug('Routing table of %s cannot be read: %s', node.name, exc)
+            return None
+        if result.exit_code != 0:
+            return None
+        lines = result.output.decode(errors='replace').splitlines()
+        return frozenset(line.strip() for line in lines if line.strip())
+
+    def snapshot(self):
+        return dict(zip((node.name for node in self.nodes),
+                        self.threadpool.map(self.routing_table, self.nodes)))
+
+    def record_event(self, description, event_time=None):
+        """
+        Timestamps a link update.
+
+        :param description: Description of the update, kept in the report.
+        :param event_time: Monotonic time of the update, defaults to now.
+        """
+        event_time = monotonic() if event_time is None else event_time
+        with self.lock:
+            for event in self.pending:
+                event['overlapped'] = True
+            self.pending.append({'time': event_time, 'description': description,
+                                 'last_change': None, 'changed_nodes': set(),
+                                 'overlapped': False})
+
+    def observe(self, tables, poll_time):
+        """
+        Compares the routing tables with the previous poll and finishes the updates that are
+        converged or timed out.
+
+        :param tables: Dictionary from a node name to its routing table.
+        :param poll_time: Monotonic time the poll finished at.
+        """
+        changed = set() if self.tables is None else {
+            name for name, table in tables.items() if table != self.tables.get(name, None)}
+        self.tables = tables
+        with self.lock:
+            for event in self.pending:
+                if changed and poll_time > event['time']:
+                    event['last_change'] = poll_time
+                    event['changed_nodes'] |= changed
+            pending = []
+            for event in self.pending:
+                last_time = event['time'] if event['last_change'] is None else event['last_change']
+                if poll_time - last_time >= self.stable_time:
+                    self.finish(event, timed_out=False)
+                elif poll_time - event['time'] >= self.timeout:
+                    self.finish(event, timed_out=True)
+                else:
+                    pending.append(event)
+            self.pending = pending
+
+    def finish(self, event, timed_out):
+        convergence_time = None
+        if not timed_out:
+            convergence_time = 0.0 if event['last_change'] is None else (
+                event['last_change'] - event['time'])
+            CONVERGENCE_SECONDS.observe(convergence_time, control_plane=self.control_plane)
+        self.results.append({'description': event['description'],
+                             'convergence_time': convergence_time,
+                             'changed_nodes': len(event['changed_nodes']),
+                             'overlapped': event['overlapped'], 'timed_out': timed_out})
+
+    def run(self):
+        next_poll = monotonic()
+        while self.running:
+            tables = self.snapshot()
+            self.observe(tables, monotonic())
+            next_poll += self.poll_interval
+            delay = next_poll - monotonic()
+            if delay > 0:
+                sleep(delay)
+            else:
+                next_poll = monotonic()
+
+    def start(self):
+        """
+        Takes the initial routing tables and starts polling in the background.
+        """
+        self.threadpool = ThreadPool(min(len(self.nodes), Constant.NODE_POLL_THREADS) or 1)
+        self.observe(self.snapshot(), monotonic())
+        self.running = True
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+        LOG.info('Convergence probe is started for %s on %d nodes (poll interval: %.2f s).',
+                 self.control_plane, len(self.nodes), self.poll_interval)
+
+    def stop(self, wait=True):
+        """
+        Stops polling. If wait is set, the pending updates are polled until they converge or
+        time out, otherwise they are reported as timed out.
+
+        :param wait: Wait for the pending updates.
+        """
+        if wait:
+            deadline = monotonic() + self.timeout
+            while self.pending and monotonic() < deadline:
+                sleep(self.poll_interval)
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+        with self.lock:
+            for event in self.pending:
+                self.finish(event, timed_out=True)
+            self.pending = []
+        if self.threadpool is not None:
+            self.threadpool.close()
+            self.threadpool.join()
+
+    def summary(self):
+        """
+        Summarizes the convergence times of the converged updates.
+
+        :return: Dictionary of the number of updates and the convergence time statistics.
+        """
+        times = np.array([result['convergence_time'] for result in self.results
+                          if result['convergence_time'] is not None])
+        summary = {'updates': len(self.results), 'converged': len(times),
+                   'timed_out': sum(result['timed_out'] for result in self.results),
+                   'overlapped': sum(result['overlapped'] for result in self.results)}
+        if len(times):
+            summary.update({'mean': float(times.mean()), 'max': float(times.max())})
+            summary.update({'p%d' % q: float(np.percentile(times, q)) for q in (50, 90, 99)})
+        return summary
+
+    def write_report(self, report_file):
+        """
+        Writes the summary and the convergence time of each update to a JSON file.
+
+        :param report_file: Path to the report file.
+        """
+        summary = self.summary()
+        with open(report_file, 'w') as f:
+            json.dump({self.control_plane: {'summary': summary, 'updates': self.results}}, f,
+                      indent=2)
+        LOG.info('%s converged after %d of %d link updates (median: %s s), see %s',
+                 self.control_plane, summary['converged'], summary['updates'],
+                 '%.3f' % summary['p50'] if 'p50' in summary else '-', report_file)
+
+
+class ProbedPublisher:
+    """
+    Publishes events through another publisher and timestamps each pathloss update in the
+    convergence probe.
+
+    :param publisher: The event publisher.
+    :param probe: The convergence probe.
+    """
+
+    def __init__(self, publisher, probe):
+        self.publisher = publisher
+        self.probe = probe
+
+    def publish_bi_pathloss(self, nem1, nem2, db1, db2):
+        self.publisher.publish_bi_pathloss(nem1, nem2, db1, db2)
+        self.probe.record_event('nem-%d nem-%d %g/%g dB' % (nem1, nem2, db1, db2))
+
+    def publish_pathloss(self, updates):
+        self.publisher.publish_pathloss(updates)
+        num_updates = sum(len(entries) for entries in updates.values())
+        self.probe.record_event('%d pathloss updates' % num_updates)
+
+    def publish_locations(self, locations):
+        self.publisher.publish_locations(locations)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+from emane_docker.constant import Constant
+from emane_docker.log import LOG
+
+
+def write_zebra_config(config_path, node, route_scale):
+    """
+    Generates the Zebra (Quagga) configuration of a node, with the static routes of the route
+    scale experiments.
+
+    :param config_path: Configuration path of the node.
+    :param node: The node.
+    :param route_scale: Route scale of the experiment.
+    """
+    with open('%s/zebra.conf' % config_path, 'a') as f:
+        f.write('hostname Router\npassword zebra\nenable password zebra\n')
+        route_scale.write_static_routes(f, node.index)
+
+
+def write_cp_config(config_path, node, control_plane, nem_prefix_length):
+    """
+    Generates control plane configurations. User can override the default values by specifying
+    it at EMANE-Docker configuration file. See the config.default.yaml for details.
+
+    :param config_path: Configuration path
+    :param node: The node
+    :param control_plane: The CP plane (OLSR, OLSRv2, OSPF, BGP, IS-IS and RIP)
+    :param nem_prefix_length: Prefix length of the NEM addresses
+    """
+    if control_plane == Constant.OLSR_CP:
+        with open('%s/olsrd.conf' % Constant.TEMPLATE_DIRECTORY, 'r') as f:
+            olsrd_conf_template = f.read()
+
+        with open('%s/olsrd.conf' % config_path, 'a') as f:
+            f.write(olsrd_conf_template)
+            f.write('\nInterface "emane0" {}\n')
+    elif control_plane == Constant.OLSRv2_CP:
+        with open('%s/olsrd2.conf' % config_path, 'a') as f:
+            org = '%s/%d' % (node.nem_ipv4, nem_prefix_length)
+            f.write('[interface=emane0]\n\thello_interval 0.5\n\thello_validity 2.5\n\t'
+                    'ifaddr_filter default_accept\n\tbindto default_reject\n\tbindto %s' % org)
+            f.write('[olsrv2]\n\toriginator %s\n\tnhdp_routable true\n\t' % org)
+            f.write('tc_interval 1.0\n\ttc_validity 10.0\n')
+    elif control_plane == Constant.OSPF_CP:
+        with open('%s/ospfd.conf' % Constant.TEMPLATE_DIRECTORY) as f:
+            ospfd_conf_template = f.read()
+
+        with open('%s/ospfd.conf' % config_path, 'a') as f:
+            f.write(ospfd_conf_template)
+            networks = ''
+            for interface_id, link in enumerate(node.links):
+                interface_ip = link.node1_ipv4 if link.node1 == node else link.node2_ipv4
+                mask = link.mask1 if link.node1 == node else link.mask2
+                f.write('interface i%d\n' % interface_id)
+                f.write('\tip ospf dead-interval minimal hello-multiplier 10\n')
+                f.write('\tip ospf retransmit-interval 1\n')
+                networks += '\tnetwork %s/%d area 0\n' % (interface_ip, mask)
+            f.write('router ospf\n')
+            f.write('\ttimers throttle lsa all 0\n\ttimers lsa arrival 0\n')
+            f.write('\tredistribute static\n\tredistribute kernel\n')
+            f.write(networks + '\n')
+    elif control_plane == Constant.BGP_CP:
+        with open('%s/bgpd.conf' % Constant.TEMPLATE_DIRECTORY) as f:
+            bgpd_conf_template = f.read()
+
+        with open('%s/bgpd.conf' % config_path, 'a') as f:
+            f.write(bgpd_conf_template)
+            f.write('router bgp %s\n' % node.as_id)
+            f.write('\tneighbor provider_ip update-source %s\n' % node.as_id)
+            f.write('\tredistribute static\n\tredistribute kernel\n')
+            networks = ''
+            neighbors = ''
+            for link in node.links:
+                if link.node1 == node:
+                    interface_ip = link.node1_ipv4
+                    neighbor_ip = link.node2_ipv4
+                    neighbor_as = link.node2.as_id
+                    mask = link.mask1
+                else:
+                    interface_ip = link.node2_ipv4
+                    neighbor_ip = link.node1_ipv4
+                    neighbor_as = link.node1.as_id
+                    mask = link.mask2
+                networks += '\tnetwork %s/%d\n' % (interface_ip, mask)
+                neighbors += '\tneighbor %s remote-as %s\n' % (neighbor_ip, neighbor_as)
+                neighbors += '\tneighbor %s advertisement-interval 0\n' % neighbor_ip
+                neighbors += '\tneighbor %s peer-group upstream\n' % neighbor_ip
+            f.write('%s\n%s' % (networks, neighbors))
+    elif control_plane == Constant.ISIS_CP:
+        with open('%s/isisd.conf' % Constant.TEMPLATE_DIRECTORY) as f:
+            isisd_conf_template = f.read()
+
+        with open('%s/isisd.conf' % config_path, 'a') as f:
+            f.write(isisd_conf_template)
+            for interface_id in range(len(node.links)):
+                f.write('Interface i%d\n' % interface_id)
+                f.write('\tip isis hello-interval 1\n')
+            f.write('router isis IS\n')
+            f.write('isis net 47.0001.1720.1700.0%03d.00' % (node.index + 2))
+    elif control_plane == Constant.RIP_CP:
+        with open('%s/ripd.conf' % Constant.TEMPLATE_DIRECTORY) as f:
+            ripd_conf_template = f.read()
+
+        with open('%s/ripd.conf' % config_path, 'a') as f:
+            f.write(ripd_conf_template)
+            networks = ''
+            for link in node.links:
+                interface_ip = link.node1_ipv4 if link.node1 == node else link.node2_ipv4
+                mask = link.mask1 if link.node1 == node else link.mask2
+                networks += '\tnetwork %s/%d\n' % (interface_ip, mask)
+            f.write('router rip\n')
+            f.write(networks)
+    else:
+        LOG.error('Unknown control plane type %s', control_plane)
@@ -24,7 +24,17 @@ def parse_distribution(dist_conf):
 
 
 class DistributionParser:
-    def __init__(self, distribution):
+    """
+    Parses a distribution configuration and samples from it. Each simulation uses the next
+    parameter of the distribution.
+
+    :param distribution: The distribution configuration, see config.default.yaml for details.
+    :param rng: Random number generator, a new unseeded one is used if it is not given.
+    """
+
+    def __init__(self, distribution, rng=None):
+        self.distribution = distribution
+        self.rng = rng if rng is not None else np.random.default_rng()
         self.simulation_id = -1
         # parse different distribution types
         if 'exponential' in distribution:
@@ -59,8 +69,21 @@ class DistributionParser:
     def rewind(self):
         self.simulation_id = -1
 
+    def for_simulation(self, simulation_id, rng):
+        """
+        Returns a copy of the parser positioned at the given simulation and sampling from the
+        given generator, so that simulations can be sampled independently.
+
+        :param simulation_id: The simulation id.
+        :param rng: Random number generator of the copy.
+        :return: The new parser.
+        """
+        parser = DistributionParser(distribution=self.distribution, rng=rng)
+        parser.simulation_id = simulation_id
+        return parser
+
     def _get_next_exponential(self):
-        return np.random.exponential(self.betas[self.simulation_id], 1)[0]
+        return self.rng.exponential(self.betas[self.simulation_id], 1)[0]
 
     def _get_next_single(self):
-        return np.random.choice(self.elements)
+        return self.rng.choice(self.elements)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+import heapq
+
+from emane_docker.log import LOG
+
+
+def pathloss_line(event_time, nem, entries):
+    """
+    Formats a pathloss event in the EEL format.
+
+    :param event_time: Time of the event, in seconds.
+    :param nem: The receiving NEM.
+    :param entries: List of (transmitting NEM, pathloss) tuples.
+    :return: The EEL line.
+    """
+    return '%.6f nem:%d pathloss %s\n' % (event_time, nem, ' '.join(
+        'nem:%d,%g' % (transmitter_nem, pathloss) for transmitter_nem, pathloss in entries))
+
+
+def location_line(event_time, nem, latitude, longitude, altitude):
+    """
+    Formats a location event in the EEL format.
+
+    :param event_time: Time of the event, in seconds.
+    :param nem: The NEM.
+    :param latitude: Latitude of the NEM.
+    :param longitude: Longitude of the NEM.
+    :param altitude: Altitude of the NEM, in meters.
+    :return: The EEL line.
+    """
+    return '%.6f nem:%d location gps %.7f,%.7f,%.2f\n' % (
+        event_time, nem, latitude, longitude, altitude)
+
+
+def link_update_lines(schedule, offset=0.0):
+    """
+    Converts a link update schedule to EEL lines. Each update is written as a pathloss event to
+    both NEMs.
+
+    :param schedule: Iterable of (time, NEM 1, NEM 2, pathloss) tuples, sorted by time.
+    :param offset: Offset added to each event time, in seconds.
+    :return: Generator of (time, EEL line) tuples.
+    """
+    for event_time, nem1, nem2, pathloss in schedule:
+        event_time += offset
+        yield event_time, pathloss_line(event_time, nem1, [(nem2, pathloss)])
+        yield event_time, pathloss_line(event_time, nem2, [(nem1, pathloss)])
+
+
+def write_eel(eel_file, *streams):
+    """
+    Writes EEL lines to a file. The streams are merged by time.
+
+    :param eel_file: Path to the EEL file.
+    :param streams: Iterables of (time, EEL line) tuples, each sorted by time.
+    :return: Number of written lines.
+    """
+    num_lines = 0
+    with open(eel_file, 'w') as f:
+        for _, line in heapq.merge(*streams, key=lambda item: item[0]):
+            f.write(line)
+            num_lines += 1
+    LOG.debug('%d events are written to %s', num_lines, eel_file)
+    return num_lines
+
+
+def read_record(record_file):
+    """
+    Reads the link updates recorded by the event generator during a live run.
+
+    :param record_file: Path to the record file, one `<time> <NEM 1> <NEM 2> <pathloss>` per line.
+    :return: Generator of (time, NEM 1, NEM 2, pathloss) tuples.
+    """
+    with open(record_file, 'r') as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) != 4 or fields[0].startswith('#'):
+                continue
+            yield float(fields[0]), int(fields[1]), int(fields[2]), float(fields[3])
+
+
+def convert_record(record_file, eel_file):
+    """
+    Converts the link updates recorded during a live run to an EEL file, so that the run can be
+    replayed exactly by the EMANE event service.
+
+    :param record_file: Path to the record file.
+    :param eel_file: Path to the EEL file.
+    :return: Number of written lines.
+    """
+    schedule = sorted(read_record(record_file))
+    return write_eel(eel_file, link_update_lines(schedule))
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+import ipaddress
+import subprocess
+
+import docker
+from docker.types import IPAMConfig, IPAMPool
+
+from emane_docker.constant import Constant
+from emane_docker.log import LOG
+
+
+class EmaneNetwork:
+    """
+    The Docker network of the nodes, which carries the EMANE OTA and event multicast traffic. The
+    network is created through the Docker API. For the bridge driver the host bridge can be tuned:
+    its MTU, its transmit queue length and IGMP snooping, which drops multicast on bridges without
+    a querier. The macvlan and ipvlan drivers attach the nodes to a host interface (parent), they
+    have no host bridge and their MTU is the MTU of the parent.
+
+    :param docker_client: Docker client.
+    :param name: Name of the Docker network.
+    :param bridge: Name of the host bridge, for the bridge driver.
+    :param subnet: Subnet of the network.
+    :param driver: Network driver, one of Constant.SUPPORTED_NETWORK_DRIVERS.
+    :param mtu: MTU of the network, the Docker default if not set.
+    :param txqueuelen: Transmit queue length of the host bridge, unchanged if not set.
+    :param multicast_snooping: If set, enables or disables IGMP snooping on the host bridge,
+        unchanged if not set.
+    :param parent: Host interface of the macvlan and ipvlan networks.
+    :param event_device: Host interface the event service publishes on, defaults to the bridge.
+        It is required for macvlan and ipvlan, since the host cannot reach its macvlan and ipvlan
+        children through the parent, e.g. a macvlan interface of the host on the parent.
+    """
+
+    def __init__(self, docker_client, name, bridge, subnet, driver=Constant.NETWORK_DRIVER_BRIDGE,
+                 mtu=None, txqueuelen=None, multicast_snooping=None, parent=None,
+                 event_device=None):
+        if driver not in Constant.SUPPORTED_NETWORK_DRIVERS:
+            raise ValueError('Network driver %s is not supported, supported drivers are %s' % (
+                driver, Constant.SUPPORTED_NETWORK_DRIVERS))
+        if driver != Constant.NETWORK_DRIVER_BRIDGE and not parent:
+            raise ValueError('The %s network driver requires a parent interface' % driver)
+        if driver != Constant.NETWORK_DRIVER_BRIDGE and not event_device:
+            raise ValueError('The %s network driver requires an event device, a host %s interface '
+                             'on %s' % (driver, driver, parent))
+        self.docker_client = docker_client
+        self.name = name
+        self.bridge = bridge
+        self.subnet = subnet
+        self.driver = driver
+        self.mtu = mtu
+        self.txqueuelen = txqueuelen
+        self.multicast_snooping = multicast_snooping
+        self.parent = parent
+        self.event_device = event_device or bridge
+
+    @classmethod
+    def from_config(cls, config, docker_client, name, bridge, subnet):
+        """
+        Creates the network using the `network` block of the configuration.
+
+        :param config: EMANE-Docker configuration.
+        :param docker_client: Docker client.
+        :param name: Name of the Docker network.
+        :param bridge: Name of the host bridge.
+        :param subnet: Subnet of the network.
+        :return: The network.
+        """
+        network = config.get('network', None) or {}
+        return cls(docker_client=docker_client, name=name, bridge=bridge, subnet=subnet,
+                   driver=network.get('driver', Constant.NETWORK_DRIVER_BRIDGE),
+                   mtu=network.get('mtu', None), txqueuelen=network.get('txqueuelen', None),
+                   multicast_snooping=network.get('multicast_snooping', None),
+                   parent=network.get('parent', None),
+                   event_device=network.get('event_device', None))
+
+    def options(self):
+        """
+        Returns the driver options of the network.
+
+        :return: Dictionary of the driver options.
+        """
+        if self.driver == Constant.NETWORK_DRIVER_BRIDGE:
+            options = {'com.docker.network.bridge.name': self.bridge}
+            if self.mtu:
+                options['com.docker.network.driver.mtu'] = str(self.mtu)
+            return options
+        return {'parent': self.parent}
+
+    def matches(self, attrs):
+        """
+        Checks whether an existing network has the configured driver, subnet and options.
+
+        :param attrs: Attributes of the network, as returned by the Docker API.
+        :return: True if the network can be reused.
+        """
+        pools = (attrs.get('IPAM', None) or {}).get('Config', None) or []
+        subnets = [ipaddress.ip_network(pool['Subnet'], strict=False) for pool in pools]
+        if subnets != [ipaddress.ip_network(self.subnet, strict=False)]:
+            return False
+        return attrs.get('Driver', None) == self.driver and (
+            attrs.get('Options', None) or {}) == self.options()
+
+    def create(self):
+        """
+        Creates the network and tunes the host bridge. An existing network with the same name is
+        reused if it has the configured driver, subnet and options, otherwise it is removed and
+        created again. A network with other settings cannot be removed while containers use it.
+
+        :return: 0 on success, -1 if the network cannot be created.
+        """
+        try:
+            existing = self.docker_client.networks.get(self.name)
+        except docker.errors.NotFound:
+            existing = None
+        except docker.errors.APIError as exc:
+            LOG.error('Docker network %s cannot be inspected: %s', self.name, exc)
+            return -1
+        if existing is not None and self.matches(existing.attrs):
+            LOG.debug('Docker network %s already exists.', self.name)
+        else:
+            if existing is not None:
+                if existing.attrs.get('Containers', None):
+                    LOG.error('Docker network %s exists with other settings and is in use, stop '
+                              'its containers first (--stop).', self.name)
+                    return -1
+                LOG.info('Docker network %s exists with other settings, it is created again.',
+                         self.name)
+            ipam = IPAMConfig(pool_configs=[IPAMPool(subnet=self.subnet)])
+            try:
+                if existing is not None:
+                    existing.remove()
+                self.docker_client.networks.create(self.name, driver=self.driver, ipam=ipam,
+                                                   options=self.options(), check_duplicate=True)
+            except docker.errors.APIError as exc:
+                LOG.error('Docker network %s cannot be created: %s', self.name, exc)
+                return -1
+            LOG.debug('Docker network %s (%s) is created.', self.name, self.driver)
+        if self.driver == Constant.NETWORK_DRIVER_BRIDGE:
+            self.tune_bridge()
+        return 0
+
+    def tune_bridge(self):
+        """
+        Sets the transmit queue length and the IGMP snooping of the host bridge, if they are
+        configured.
+        """
+        if self.txqueuelen is not None:
+            run_host_command(['ip', 'link', 'set', 'dev', self.bridge, 'txqueuelen',
+                              str(self.txqueuelen)])
+        if self.multicast_snooping is not None:
+            snooping_file = '/sys/class/net/%s/bridge/multicast_snooping' % self.bridge
+            try:
+                with open(snooping_file, 'w') as f:
+                    f.write('1' if self.multicast_snooping else '0')
+            except OSError as exc:
+                LOG.warning('IGMP snooping of %s cannot be set: %s', self.bridge, exc)
+
+    def remove(self):
+        """
+        Removes the network.
+        """
+        try:
+            self.docker_client.networks.get(self.name).remove()
+        except docker.errors.NotFound:
+            LOG.debug('Docker network %s does not exist.', self.name)
+        except docker.errors.APIError as exc:
+            LOG.error('Docker network %s cannot be removed: %s', self.name, exc)
+        else:
+            LOG.debug('Docker network %s is removed.', self.name)
+
+
+def run_host_command(args):
+    """
+    Runs a command on the host, logging its output if it fails.
+
+    :param args: The command, as a list of arguments.
+    :return: The exit status, -1 if the command cannot be run.
+    """
+    try:
+        result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                check=False)
+    except OSError as exc:
+        LOG.error('%s cannot be run: %s', args[0], exc)
+        return -1
+    if result.returncode != 0:
+        LOG.error('%s failed with exit status %d: %s', ' '.join(args), result.returncode,
+                  result.stdout.decode(errors='replace').strip())
+    return result.returncode
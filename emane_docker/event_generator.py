@@ -1,15 +1,80 @@
 #!/usr/bin/env python
 
 
-from time import sleep
+from contextlib import ExitStack
+from itertools import count
+from multiprocessing.pool import ThreadPool
+from threading import Event
+from time import monotonic
 
-import numpy as np
 from emane.events import EventService
 from emane.events import PathlossEvent
 from emane.events import LocationEvent
 
+from emane_docker.constant import Constant
 from emane_docker.distribution import DistributionParser
-from emane_docker.log import LOG
+from emane_docker.eel import link_update_lines
+from emane_docker.log import LOG, SampledLogger
+from emane_docker.metrics import REGISTRY
+from emane_docker.rng import RandomStreams
+
+EVENTS_PUBLISHED = REGISTRY.counter('emane_docker_events_published_total',
+                                    'Number of events published to the EMANE event service')
+EVENT_PUBLISH_SECONDS = REGISTRY.histogram('emane_docker_event_publish_seconds',
+                                           'Time to publish an event')
+EVENT_LAG_SECONDS = REGISTRY.histogram('emane_docker_event_lag_seconds',
+                                       'Delay of live link updates behind their schedule')
+
+
+class EventPublisher:
+    """
+    Publishes EMANE events to the event service.
+
+    :param group: Multicast group of the event service.
+    :param port: Port of the event service.
+    :param device: Device the event service is reachable from.
+    """
+
+    def __init__(self, group='224.1.2.8', port=45703, device='emanenode0'):
+        self.event_service = EventService((group, port, device))
+
+    def publish_bi_pathloss(self, nem1, nem2, db1, db2):
+        with EVENT_PUBLISH_SECONDS.time(type='pathloss'):
+            event = PathlossEvent()
+            event.append(nem1, forward=db1)
+            event.append(nem2, forward=db2)
+            self.event_service.publish(nem1, event)
+            self.event_service.publish(nem2, event)
+        EVENTS_PUBLISHED.inc(2, type='pathloss')
+
+    def publish_pathloss(self, updates):
+        """
+        Publishes pathloss updates, a single event is published to each receiving NEM.
+
+        :param updates: Dictionary from a receiving NEM to a list of (transmitting NEM, pathloss)
+            tuples.
+        """
+        for nem, entries in updates.items():
+            with EVENT_PUBLISH_SECONDS.time(type='pathloss'):
+                event = PathlossEvent()
+                for transmitter_nem, pathloss in entries:
+                    event.append(int(transmitter_nem), forward=float(pathloss))
+                self.event_service.publish(int(nem), event)
+        EVENTS_PUBLISHED.inc(len(updates), type='pathloss')
+
+    def publish_locations(self, locations):
+        """
+        Publishes the locations of NEMs as a single event to all NEMs.
+
+        :param locations: List of (NEM, latitude, longitude, altitude) tuples.
+        """
+        with EVENT_PUBLISH_SECONDS.time(type='location'):
+            event = LocationEvent()
+            for nem, latitude, longitude, altitude in locations:
+                event.append(int(nem), latitude=float(latitude), longitude=float(longitude),
+                             altitude=float(altitude))
+            self.event_service.publish(0, event)
+        EVENTS_PUBLISHED.inc(type='location')
 
 
 class EventGenerator:
@@ -19,61 +84,133 @@ class EventGenerator:
     :param nodes: The list of nodes.
     :param link_update: Link update configuration.
     :param duration: Duration of the experiment.
+    :param publisher: Event publisher, a new one is created if it is not given.
+    :param random_streams: Random streams of the experiment, each simulation samples from its
+        own stream.
+    :param log_rate: Maximum number of per-event debug logs per second.
     """
 
-    def __init__(self, nodes, link_update, duration):
+    def __init__(self, nodes, link_update, duration, publisher=None, random_streams=None,
+                 log_rate=Constant.EVENT_LOG_RATE):
         self.nodes = nodes
+        self.nem_ids = [node.nem_id for node in self.nodes.values()]
         self.duration = duration
         self.distribution = DistributionParser(distribution=link_update)
-        self.event_service = EventService(('224.1.2.8', 45703, 'emanenode0'))
+        self.publisher = publisher if publisher is not None else EventPublisher()
+        self.random_streams = random_streams if random_streams is not None else RandomStreams()
+        self.log_rate = log_rate
+        self.stopped = Event()
 
     def _create_bi_pathloss(self, nem1, nem2, db1, db2):
-        event = PathlossEvent()
-        event.append(nem1, forward=db1)
-        event.append(nem2, forward=db2)
-        self.event_service.publish(nem1, event)
-        self.event_service.publish(nem2, event)
+        self.publisher.publish_bi_pathloss(nem1, nem2, db1, db2)
 
     def _create_pathloss(self, nem1, nem2, db):
         self._create_bi_pathloss(nem1, nem2, db, db)
 
     def _create_location(self, latitude, longitude, altitude):
-        event = LocationEvent()
-        event.append(1, latitude=latitude, longitude=longitude, altitude=altitude)
-        self.event_service.publish(0, event)
+        self.publisher.publish_locations([(1, latitude, longitude, altitude)])
 
-    def _pick_random_nem(self):
-        return self.nodes[np.random.choice(list(self.nodes.keys()))].index + 1
+    def _pick_random_nem(self, rng):
+        return self.nem_ids[rng.integers(len(self.nem_ids))]
 
-    def _pick_random_db(self, is_binary):
+    def _pick_random_db(self, is_binary, rng):
         if is_binary:
-            if np.random.random() < 0.5:
+            if rng.random() < 0.5:
                 return 0
             return 200
 
-        return np.random.random() * 100
-
-    def start(self):
-        i = 0
-        while self.distribution.start_next_simulation():
-            LOG.info('Starting a new simulation')
-            current_time = 0
-            print('sim number %d' % i)
-            while True:
-                next_event_time = self.distribution.get_next()
-                sleep(next_event_time)
-                print(current_time, next_event_time, current_time + next_event_time)
-                current_time += next_event_time
-                if current_time > self.duration:
+        return rng.random() * 100
+
+    def generate_simulation(self, simulation_id):
+        """
+        Samples the link updates of a single simulation from its own random stream.
+
+        :param simulation_id: The simulation id.
+        :return: The length of the simulation and the list of (time, NEM 1, NEM 2, pathloss)
+            tuples, relative to the start of the simulation.
+        """
+        rng = self.random_streams.generator('events', simulation_id)
+        distribution = self.distribution.for_simulation(simulation_id, rng)
+        events = []
+        current_time = 0
+        while True:
+            next_event_time = distribution.get_next()
+            current_time += next_event_time
+            if current_time > self.duration:
+                break
+            nem2 = nem1 = self._pick_random_nem(rng)
+            while nem1 == nem2:
+                nem2 = self._pick_random_nem(rng)
+            db = self._pick_random_db(is_binary=True, rng=rng)
+            events.append((current_time, nem1, nem2, db))
+        # The simulation ends after the interval that exceeds the duration.
+        return current_time, events
+
+    def generate_schedule(self):
+        """
+        Samples the link updates of all simulations ahead of time. Simulations run back to back,
+        so the event times are relative to the start of the first simulation. Finite simulations
+        are sampled in parallel, the result does not depend on the order they are sampled in.
+
+        :return: Generator of (time, NEM 1, NEM 2, pathloss) tuples, sorted by time.
+        """
+        if self.distribution.num_simulations == float('inf'):
+            simulations = map(self.generate_simulation, count())
+        else:
+            threadpool = ThreadPool()
+            simulations = threadpool.map(self.generate_simulation,
+                                         range(self.distribution.num_simulations))
+            threadpool.close()
+            threadpool.join()
+
+        simulation_offset = 0.0
+        for i, (simulation_length, events) in enumerate(simulations):
+            LOG.info('Starting simulation %d', i)
+            for event_time, nem1, nem2, db in events:
+                yield simulation_offset + event_time, nem1, nem2, db
+            simulation_offset += simulation_length
+
+    def start(self, record_file=None):
+        """
+        Publishes the link updates live.
+
+        :param record_file: If specified, the publish time of each link update is recorded to
+            that file, which can be converted to an EEL file for an exact replay.
+        """
+        # Per-event logs are sampled, so that debug logging does not slow down the link updates.
+        event_log = SampledLogger(LOG, max_per_second=self.log_rate)
+        with ExitStack() as stack:
+            record = stack.enter_context(open(record_file, 'w')) if record_file else None
+            start_time = monotonic()
+            for event_time, nem1, nem2, db in self.generate_schedule():
+                delay = start_time + event_time - monotonic()
+                if delay > 0:
+                    self.stopped.wait(delay)
+                if self.stopped.is_set():
+                    LOG.info('Link updates are stopped.')
                     break
-                nem2 = nem1 = self._pick_random_nem()
-                while nem1 == nem2:
-                    nem2 = self._pick_random_nem()
-                db = self._pick_random_db(is_binary=True)
-                LOG.debug('New pathloss update at %f: nem-%s nem-%s %d', current_time, nem1, nem2,
-                          db)
+                EVENT_LAG_SECONDS.observe(max(0.0, -delay))
+                event_log.debug('New pathloss update at %f (%.6f s late): nem-%s nem-%s %d',
+                                event_time, max(0.0, -delay), nem1, nem2, db)
                 self._create_pathloss(nem1, nem2, db)
-            i += 1
+                if record is not None:
+                    record.write('%.6f %d %d %g\n' % (monotonic() - start_time, nem1, nem2, db))
+
+    def stop(self):
+        """
+        Stops publishing the link updates, start returns before the next update.
+        """
+        self.stopped.set()
+
+    def export_eel(self, offset=0.0):
+        """
+        Samples the link updates ahead of time as EEL lines, to be replayed by the EMANE event
+        service.
+
+        :param offset: Offset added to each event time, in seconds.
+        :return: Generator of (time, EEL line) tuples.
+        """
+        return link_update_lines(self.generate_schedule(), offset=offset)
 
 
 if __name__ == "__main__":
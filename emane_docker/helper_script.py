@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import shlex
+
+from emane_docker.constant import Constant
+
+# Runs a step and reports its exit status and its start and end times, in nanoseconds.
+_RUN_STEP = ('run_step() { start=$(date +%%s%%N); sh -c "$2" >> %s 2>&1; status=$?; '
+             'echo "%s $1 $status $start $(date +%%s%%N)"; }')
+
+
+class HelperStep:
+    """
+    A step of the helper startup sequence of a node.
+
+    :param name: Name of the step, reported with its exit status. It must not contain spaces.
+    :param command: Shell command of the step.
+    :param background: If set, the command is started in the background and the step reports
+        only whether it could be started.
+    """
+    __slots__ = ('name', 'command', 'background')
+
+    def __init__(self, name, command, background=False):
+        self.name = name
+        self.command = command
+        self.background = background
+
+    def __repr__(self):
+        return 'HelperStep(%r, %r, background=%r)' % (self.name, self.command, self.background)
+
+
+def helper_script(steps, log_file=Constant.HELPER_LOG_FILE):
+    """
+    Generates a shell script running the steps in order. The output of the steps is appended to
+    the log file, and a status line is printed for each step, see parse_helper_output.
+
+    :param steps: List of HelperStep.
+    :param log_file: Log file of the step outputs in the container.
+    :return: The script, as a string.
+    """
+    lines = [_RUN_STEP % (shlex.quote(log_file), Constant.HELPER_STATUS_PREFIX)]
+    for step in steps:
+        command = step.command
+        if step.background:
+            command = 'nohup sh -c %s > /dev/null 2>&1 &' % shlex.quote(command)
+        lines.append('run_step %s %s' % (shlex.quote(step.name), shlex.quote(command)))
+    return '\n'.join(lines) + '\n'
+
+
+def parse_helper_output(output):
+    """
+    Parses the status lines printed by a helper script, other lines are ignored.
+
+    :param output: Output of the script, as a string.
+    :return: List of (step name, exit status, duration in seconds) tuples, the duration is None if
+        the container cannot report nanosecond times.
+    """
+    results = []
+    for line in output.splitlines():
+        fields = line.split()
+        if len(fields) != 5 or fields[0] != Constant.HELPER_STATUS_PREFIX:
+            continue
+        _, name, status, start, end = fields
+        try:
+            duration = (int(end) - int(start)) / 1e9
+        except ValueError:
+            duration = None
+        results.append((name, int(status) if status.isdigit() else -1, duration))
+    return results
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+import json
+from multiprocessing.pool import ThreadPool
+import shlex
+from time import sleep
+
+from emane_docker.constant import Constant
+from emane_docker.log import LOG
+from emane_docker.rng import RandomStreams
+from emane_docker.traffic_matrix import TrafficMatrix
+from emane_docker.util import mkdir_p
+
+
+def parse_iperf_result(output):
+    """
+    Parses the JSON output of an iperf3 client.
+
+    :param output: Output of `iperf3 --json`, as a string.
+    :return: Dictionary of the interval throughputs, the average throughput and, for UDP, the
+        loss and the jitter, or None if the test failed.
+    """
+    try:
+        result = json.loads(output)
+    except ValueError:
+        return None
+    if 'error' in result or 'end' not in result:
+        return None
+    intervals = [(interval['sum']['start'], interval['sum']['end'],
+                  interval['sum']['bits_per_second'])
+                 for interval in result.get('intervals', [])]
+    end = result['end']
+    parsed = {'intervals': intervals}
+    if 'sum_received' in end:
+        parsed['bits_per_second'] = end['sum_received']['bits_per_second']
+        parsed['sent_bits_per_second'] = end['sum_sent']['bits_per_second']
+        parsed['retransmits'] = end['sum_sent'].get('retransmits', 0)
+    else:
+        parsed['bits_per_second'] = end['sum']['bits_per_second']
+        parsed['lost_percent'] = end['sum']['lost_percent']
+        parsed['jitter_ms'] = end['sum']['jitter_ms']
+    return parsed
+
+
+class IperfWorkload:
+    """
+    Saturating workload of iperf3 transfers. As with MGEN, the traffic matrix gives the client
+    and server roles and each client runs a transfer to a server sampled from its demand row, the
+    rate scales of the matrix are not used. A server runs a one-off iperf3 server on its own port
+    for each client. The clients are started detached, so all transfers run concurrently, and
+    write their interval results as JSON to a file in the container, which is collected after
+    the transfers.
+
+    :param nodes: The nodes of the topology.
+    :param exec_run: Function running a command in the container of a node, e.g.
+        EmaneTopology.exec_run.
+    :param duration: Duration of each transfer, in seconds.
+    :param protocol: tcp or udp.
+    :param bitrate: Target bitrate of the UDP transfers, e.g. 10M, unlimited (0) if not set.
+    :param parallel: Number of parallel streams of each transfer.
+    :param interval: Interval of the reported throughputs, in seconds.
+    :param random_streams: Random streams of the experiment.
+    :param config_directory: The results are written to the iperf directory in it.
+    :param matrix: Traffic matrix of the transfers, a uniform matrix by default.
+    """
+
+    def __init__(self, nodes, exec_run, duration, protocol='tcp', bitrate=None, parallel=1,
+                 interval=1.0, random_streams=None, config_directory=Constant.CP_CONFIG_DIRECTORY,
+                 matrix=None):
+        if protocol not in ('tcp', 'udp'):
+            raise ValueError('iperf3 protocol %s is not supported, use tcp or udp' % protocol)
+        self.nodes = nodes
+        self.exec_run = exec_run
+        self.duration = duration
+        self.protocol = protocol
+        self.bitrate = bitrate
+        self.parallel = parallel
+        self.interval = interval
+        self.random_streams = random_streams if random_streams is not None else RandomStreams()
+        self.config_directory = config_directory
+        self.matrix = matrix if matrix is not None else TrafficMatrix(nodes)
+        self.results = None
+
+    @classmethod
+    def from_config(cls, config, nodes, exec_run, random_streams=None,
+                    config_directory=Constant.CP_CONFIG_DIRECTORY):
+        """
+        Creates the workload using the traffic block of the experiment configuration.
+
+        :param config: EMANE-Docker configuration.
+        :param nodes: The nodes of the topology.
+        :param exec_run: Function running a command in the container of a node.
+        :param random_streams: Random streams of the experiment.
+        :param config_directory: The results are written to the iperf directory in it.
+        :return: The workload.
+        """
+        experiment = config['experiment']
+        traffic = experiment.get('traffic', None) or {}
+        iperf = traffic.get('iperf3', None) or {}
+        return cls(nodes=nodes, exec_run=exec_run, duration=experiment['duration'],
+                   protocol=iperf.get('protocol', traffic.get('type', 'tcp')),
+                   bitrate=iperf.get('bitrate', None), parallel=iperf.get('parallel', 1),
+                   interval=iperf.get('interval', 1.0), random_streams=random_streams,
+                   config_directory=config_directory,
+                   matrix=TrafficMatrix.from_config(traffic, nodes))
+
+    def pairs(self):
+        """
+        Generates the client and server pairs, one per client of the traffic matrix.
+
+        :return: List of (client, server, port) tuples.
+        :raise ValueError: If a client has no server to send to.
+        """
+        clients = [node for node, client in zip(self.matrix.nodes, self.matrix.clients)
+                   if client]
+        if not clients:
+            raise ValueError('The iperf3 workload requires at least one client')
+        destinations, _ = self.matrix.assign([self.matrix.positions[node.name] for node in clients],
+                                             self.random_streams.generator('iperf', 'matrix'))
+        ports = {}
+        pairs = []
+        for client, destination in zip(clients, destinations):
+            server = self.matrix.nodes[destination]
+            port = ports[server.name] = ports.get(server.name, Constant.IPERF_PORT_BASE - 1) + 1
+            pairs.append((client, server, port))
+        return pairs
+
+    def client_command(self, server, port):
+        command = ['iperf3', '--client', server.nem_ipv4, '--port', str(port), '--json',
+                   '--time', str(self.duration), '--interval', str(self.interval),
+                   '--parallel', str(self.parallel)]
+        if self.protocol == 'udp':
+            command += ['--udp', '--bitrate', str(self.bitrate or 0)]
+        return command
+
+    def start_pair(self, pair):
+        client, server, port = pair
+        command = ' '.join(shlex.quote(arg) for arg in self.client_command(server, port))
+        result_file = Constant.IPERF_RESULT_FILE % (server.name, port)
+        # The result of a previous run is removed, warm containers keep their files.
+        try:
+            self.exec_run(client, ['sh', '-c', 'rm -f %s; %s > %s 2>&1' % (
+                result_file, command, result_file)], detach=True)
+        except Exception as exc:
+            LOG.warning('iperf3 transfer %s -> %s cannot run: %s', client.name, server.name, exc)
+            return False
+        return True
+
+    def collect_pair(self, pair):
+        client, server, port = pair
+        result_file = Constant.IPERF_RESULT_FILE % (server.name, port)
+        try:
+            result = self.exec_run(client, ['cat', result_file])
+            output = result.output.decode(errors='replace')
+        except Exception as exc:
+            LOG.warning('iperf3 result of %s -> %s cannot be read: %s', client.name, server.name,
+                        exc)
+            return None
+        with open('%s/iperf/%s-%s-%d.json' % (self.config_directory, client.name, server.name,
+                                              port), 'w') as f:
+            f.write(output)
+        parsed = parse_iperf_result(output)
+        if parsed is None:
+            LOG.warning('iperf3 transfer %s -> %s failed, see %s/iperf.', client.name,
+                        server.name, self.config_directory)
+        return parsed
+
+    def start(self):
+        """
+        Runs the transfers of all pairs concurrently and writes the results to iperf.json in the
+        configuration directory.
+
+        :return: List of the pair results.
+        """
+        pairs = self.pairs()
+        mkdir_p('%s/iperf' % self.config_directory)
+        threadpool = ThreadPool(min(len(pairs), Constant.IPERF_THREADS) or 1)
+        threadpool.map(lambda pair: self.exec_run(pair[1], [
+            'iperf3', '--server', '--one-off', '--daemon', '--port', str(pair[2])]), pairs)
+        sleep(Constant.IPERF_SERVER_WAIT_TIME)
+        started = threadpool.map(self.start_pair, pairs)
+        LOG.info('iperf3 workload is started with %d %s transfers.', sum(started), self.protocol)
+        sleep(self.duration + Constant.IPERF_RESULT_WAIT_TIME)
+        results = threadpool.map(lambda item: self.collect_pair(item[0]) if item[1] else None,
+                                 zip(pairs, started))
+        threadpool.close()
+        threadpool.join()
+        self.results = [{'client': client.nem_id, 'server': server.nem_id, 'port': port,
+                         'protocol': self.protocol, 'result': result}
+                        for (client, server, port), result in zip(pairs, results)]
+        with open('%s/iperf.json' % self.config_directory, 'w') as f:
+            json.dump(self.results, f, indent=2)
+        completed = [result for result in results if result is not None]
+        LOG.info('iperf3 workload is finished: %d of %d transfers completed, %.2f Mbps in total.',
+                 len(completed), len(pairs),
+                 sum(result['bits_per_second'] for result in completed) / 1e6)
+        return self.results
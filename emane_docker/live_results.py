@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+
+import json
+import shlex
+from collections import deque
+from math import ceil
+from multiprocessing.pool import ThreadPool
+from threading import Event, Lock, Thread
+from time import time
+
+from emane_docker.constant import Constant
+from emane_docker.log import LOG
+from emane_docker.metrics import REGISTRY
+
+LIVE_THROUGHPUT = REGISTRY.gauge('emane_docker_live_throughput_bps',
+                                 'Received throughput of all MGEN flows over the rolling window')
+LIVE_LOSS = REGISTRY.gauge('emane_docker_live_loss',
+                           'Loss of all MGEN flows over the rolling window')
+LIVE_FLOW_THROUGHPUT = REGISTRY.gauge('emane_docker_live_flow_throughput_bps',
+                                      'Received throughput of an MGEN flow over the rolling window')
+LIVE_FLOW_LOSS = REGISTRY.gauge('emane_docker_live_flow_loss',
+                                'Loss of an MGEN flow over the rolling window')
+LIVE_RECEIVED_PACKETS = REGISTRY.counter('emane_docker_live_received_packets_total',
+                                         'MGEN packets received during the experiment')
+
+
+def parse_recv_line(line):
+    """
+    Parses a RECV line of an MGEN output, e.g.
+    `12:00:01.250 RECV proto>UDP flow>3 seq>41 src>10.100.0.1/5001 ... size>600`.
+
+    :param line: The line, as a string.
+    :return: (flow id, sequence number, size) tuple, or None if it is not a RECV line.
+    """
+    fields = line.split()
+    if len(fields) < 2 or fields[1] != 'RECV':
+        return None
+    values = dict(field.split('>', 1) for field in fields[2:] if '>' in field)
+    try:
+        return int(values['flow']), int(values['seq']), int(values['size'])
+    except (KeyError, ValueError):
+        return None
+
+
+class FlowStats:
+    """
+    Received packets of a flow, with samples of the counts at the last polls.
+
+    :param window_samples: Number of samples kept, the rolling window in polls.
+    """
+    __slots__ = ('packets', 'bytes', 'max_seq', 'samples')
+
+    def __init__(self, window_samples):
+        self.packets = 0
+        self.bytes = 0
+        self.max_seq = -1
+        self.samples = deque(maxlen=window_samples)
+
+
+class LiveCollector:
+    """
+    Collects the MGEN results while the experiment runs. The outputs of the receiving nodes are
+    followed concurrently, from the shared configuration directory or, if the configurations are
+    not bind-mounted, through exec in the containers. Only the new bytes are read at each poll and
+    each flow keeps a fixed number of samples, so the memory does not grow with the duration.
+
+    The throughput and the loss of each flow are computed over a rolling window. The expected
+    packets of a flow are given by its schedule, so flows that receive nothing are reported lost;
+    without a schedule they are estimated from the sequence numbers. The results are exported as
+    metrics and logged periodically. If the loss of all flows stays above abort_loss for
+    abort_after seconds, the experiment is aborted through on_abort.
+
+    :param nodes: The receiving nodes.
+    :param flows: Schedule of the flows: flow id to (source, destination address, packet rate,
+        start time, stop time), see TrafficGenerator.flows, or None.
+    :param schedule_start: Wall clock time the schedule starts at, in seconds since the epoch.
+    :param exec_run: Function running a command in the container of a node, e.g.
+        EmaneTopology.exec_run. If not set, the outputs are read from config_directory.
+    :param config_directory: Directory of the node configurations, with the outputs of the nodes.
+    :param output_file: Name of the MGEN output file of a node.
+    :param poll_interval: Time between two polls, in seconds.
+    :param window: Length of the rolling window, in seconds.
+    :param log_interval: Time between two logged summaries, in seconds, 0 disables the logs.
+    :param abort_loss: Loss above which the experiment is aborted, the abort is disabled if not
+        set.
+    :param abort_after: Time the loss must stay above abort_loss, in seconds.
+    :param on_abort: Function called without arguments when the experiment is aborted.
+    """
+
+    def __init__(self, nodes, flows=None, schedule_start=None, exec_run=None,
+                 config_directory=Constant.CP_CONFIG_DIRECTORY, output_file='mgen.out',
+                 poll_interval=1.0, window=10.0, log_interval=10.0, abort_loss=None,
+                 abort_after=30.0, on_abort=None):
+        self.nodes = sorted(nodes, key=lambda node: node.nem_id)
+        self.flows = flows
+        self.schedule_start = schedule_start
+        self.exec_run = exec_run
+        self.config_directory = config_directory
+        self.output_file = output_file
+        self.poll_interval = float(poll_interval)
+        self.window = float(window)
+        self.window_samples = max(int(ceil(self.window / self.poll_interval)), 1) + 1
+        self.log_interval = float(log_interval)
+        self.abort_loss = abort_loss
+        self.abort_after = float(abort_after)
+        self.on_abort = on_abort
+        self.lock = Lock()
+        self.offsets = {}
+        self.partial_lines = {}
+        self.stats = {}
+        self.history = deque(maxlen=Constant.LIVE_RESULTS_HISTORY)
+        self.received_packets = 0
+        self.last_summary = None
+        self.last_poll = None
+        self.loss_since = None
+        self.aborted = None
+        self.stopped = Event()
+        self.thread = None
+        self.threadpool = None
+
+    @classmethod
+    def from_config(cls, config, nodes, flows=None, schedule_start=None, exec_run=None,
+                    config_directory=Constant.CP_CONFIG_DIRECTORY, on_abort=None):
+        """
+        Creates the collector using the live_results block of the experiment configuration.
+
+        :param config: EMANE-Docker configuration.
+        :param nodes: The receiving nodes.
+        :param flows: Schedule of the flows, see TrafficGenerator.flows.
+        :param schedule_start: Wall clock time the schedule starts at.
+        :param exec_run: Function running a command in the container of a node, None to read the
+            outputs from the configuration directory.
+        :param config_directory: Directory of the node configurations.
+        :param on_abort: Function called when the experiment is aborted.
+        :return: The collector, or None if it is not enabled.
+        """
+        live_results = (config.get('experiment', None) or {}).get('live_results', None) or {}
+        if not live_results.get('enabled', False):
+            return None
+        return cls(nodes=nodes, flows=flows, schedule_start=schedule_start, exec_run=exec_run,
+                   config_directory=config_directory,
+                   poll_interval=live_results.get('poll_interval', 1.0),
+                   window=live_results.get('window', 10.0),
+                   log_interval=live_results.get('log_interval', 10.0),
+                   abort_loss=live_results.get('abort_loss', None),
+                   abort_after=live_results.get('abort_after', 30.0), on_abort=on_abort)
+
+    def read_output(self, node):
+        """
+        Reads the lines appended to the output of a node since the last read. At most
+        Constant.LIVE_RESULTS_MAX_READ bytes are read at once, the rest is read at the next poll.
+
+        :param node: The node.
+        :return: List of the new complete lines.
+        """
+        offset = self.offsets.get(node.name, 0)
+        if self.exec_run is None:
+            try:
+                with open('%s/%s/%s' % (self.config_directory, node.name, self.output_file),
+                          'rb') as f:
+                    f.seek(0, 2)
+                    if f.tell() < offset:
+                        # The output is truncated, MGEN is restarted.
+                        offset = 0
+                        self.partial_lines[node.name] = b''
+                    f.seek(offset)
+                    data = f.read(Constant.LIVE_RESULTS_MAX_READ)
+            except OSError:
+                return []
+        else:
+            output_file = shlex.quote('%s/%s' % (Constant.CONTAINER_CONFIG_DIRECTORY,
+                                                 self.output_file))
+            # The size is printed first, the output is read from the start if it is truncated.
+            command = ('size=$(stat -c %%s %s) || exit 1; echo "$size"; '
+                       '[ "$size" -lt %d ] && start=1 || start=%d; '
+                       'tail -c +$start %s | head -c %d' % (
+                           output_file, offset, offset + 1, output_file,
+                           Constant.LIVE_RESULTS_MAX_READ))
+            try:
+                result = self.exec_run(node, ['sh', '-c', command])
+            except Exception as exc:
+                LOG.debug('MGEN output of %s cannot be read: %s', node.name, exc)
+                return []
+            if result.exit_code != 0:
+                return []
+            size, _, data = (result.output or b'').partition(b'\n')
+            try:
+                if int(size) < offset:
+                    # The output is truncated, MGEN is restarted.
+                    offset = 0
+                    self.partial_lines[node.name] = b''
+            except ValueError:
+                return []
+        self.offsets[node.name] = offset + len(data)
+        lines = (self.partial_lines.get(node.name, b'') + data).split(b'\n')
+        self.partial_lines[node.name] = lines.pop()
+        return [line.decode(errors='replace') for line in lines]
+
+    def observe(self, lines, now):
+        """
+        Counts the received packets and takes a sample of every flow.
+
+        :param lines: New lines of the outputs.
+        :param now: Wall clock time of the poll, in seconds since the epoch.
+        """
+        with self.lock:
+            received = 0
+            for line in lines:
+                parsed = parse_recv_line(line)
+                if parsed is None:
+                    continue
+                flow_id, seq, size = parsed
+                stats = self.stats.get(flow_id, None)
+                if stats is None:
+                    if self.flows is not None and flow_id not in self.flows:
+                        continue
+                    stats = self.stats[flow_id] = FlowStats(self.window_samples)
+                    # The packets of a new flow are counted from the previous poll.
+                    stats.samples.append((self.last_poll or now, 0, 0, -1))
+                stats.packets += 1
+                stats.bytes += size
+                stats.max_seq = max(stats.max_seq, seq)
+                received += 1
+            if received:
+                self.received_packets += received
+                LIVE_RECEIVED_PACKETS.inc(received)
+            if self.flows is not None:
+                # Scheduled flows are followed from their start, so that silent flows count.
+                for flow_id, (_, _, _, start_time, stop_time) in self.flows.items():
+                    if flow_id in self.stats:
+                        continue
+                    if self.schedule_start + start_time <= now <= self.schedule_start + stop_time:
+                        self.stats[flow_id] = FlowStats(self.window_samples)
+            for stats in self.stats.values():
+                stats.samples.append((now, stats.packets, stats.bytes, stats.max_seq))
+            self.last_poll = now
+
+    def expected_packets(self, flow_id, stats, start, end):
+        """
+        Returns the packets a flow is expected to receive in a time interval.
+
+        :param flow_id: The flow id.
+        :param stats: Statistics of the flow.
+        :param start: Start of the interval, wall clock time.
+        :param end: End of the interval, wall clock time.
+        :return: The expected packets.
+        """
+        if self.flows is None:
+            first_seq = stats.samples[0][3]
+            return stats.max_seq - first_seq if first_seq >= 0 else stats.max_seq + 1
+        _, _, rate, start_time, stop_time = self.flows[flow_id]
+        overlap = min(end, self.schedule_start + stop_time) - max(
+            start, self.schedule_start + start_time)
+        return rate * max(overlap, 0.0)
+
+    def summarize(self, now):
+        """
+        Computes the throughput and the loss of each flow over the rolling window, and drops the
+        flows that finished before the window.
+
+        :param now: Wall clock time of the last poll.
+        :return: Dictionary of the totals and the flows, worst first.
+        """
+        flows = []
+        total_received = total_expected = total_throughput = 0.0
+        with self.lock:
+            for flow_id in sorted(self.stats):
+                stats = self.stats[flow_id]
+                start, packets, size, _ = stats.samples[0]
+                if self.flows is not None:
+                    finished = self.schedule_start + self.flows[flow_id][4] < start
+                else:
+                    # Flows without a schedule are dropped after a window without packets.
+                    full_window = len(stats.samples) == stats.samples.maxlen
+                    finished = full_window and packets == stats.packets
+                if finished:
+                    del self.stats[flow_id]
+                    LIVE_FLOW_THROUGHPUT.remove(flow=flow_id)
+                    LIVE_FLOW_LOSS.remove(flow=flow_id)
+                    continue
+                if now <= start:
+                    continue
+                received = stats.packets - packets
+                expected = self.expected_packets(flow_id, stats, start, now)
+                throughput = (stats.bytes - size) * 8 / (now - start)
+                loss = None
+                if expected >= 1:
+                    loss = min(max(1.0 - received / expected, 0.0), 1.0)
+                    total_received += min(received, expected)
+                    total_expected += expected
+                total_throughput += throughput
+                LIVE_FLOW_THROUGHPUT.set(throughput, flow=flow_id)
+                if loss is not None:
+                    LIVE_FLOW_LOSS.set(loss, flow=flow_id)
+                flow = {'flow': flow_id, 'throughput_bps': throughput, 'loss': loss,
+                        'received_packets': stats.packets}
+                if self.flows is not None:
+                    flow.update({'source': self.flows[flow_id][0],
+                                 'destination': self.flows[flow_id][1]})
+                flows.append(flow)
+        loss = 1.0 - total_received / total_expected if total_expected else None
+        LIVE_THROUGHPUT.set(total_throughput)
+        if loss is not None:
+            LIVE_LOSS.set(loss)
+        flows.sort(key=lambda flow: -1.0 if flow['loss'] is None else flow['loss'], reverse=True)
+        return {'time': now, 'window': self.window, 'active_flows': len(flows),
+                'throughput_bps': total_throughput, 'loss': loss,
+                'received_packets': self.received_packets, 'flows': flows}
+
+    def check_abort(self, summary):
+        """
+        Aborts the experiment if the loss stayed above abort_loss for abort_after seconds.
+
+        :param summary: The last summary.
+        :return: True if the experiment is aborted.
+        """
+        if self.abort_loss is None or self.aborted is not None:
+            return False
+        if summary['loss'] is None or summary['loss'] <= self.abort_loss:
+            self.loss_since = None
+            return False
+        if self.loss_since is None:
+            self.loss_since = summary['time']
+        if summary['time'] - self.loss_since < self.abort_after:
+            return False
+        self.aborted = {'time': summary['time'], 'loss': summary['loss'],
+                        'abort_loss': self.abort_loss, 'abort_after': self.abort_after}
+        LOG.error('Loss of the flows is %.1f%% for %.0f s, above the abort threshold of %.1f%%, '
+                  'the experiment is aborted.', 100 * summary['loss'],
+                  summary['time'] - self.loss_since, 100 * self.abort_loss)
+        if self.on_abort is not None:
+            self.on_abort()
+        return True
+
+    def poll(self):
+        """
+        Reads the new output of all nodes and updates the results.
+
+        :return: The summary of the poll.
+        """
+        lines = [line for node_lines in self.threadpool.map(self.read_output, self.nodes)
+                 for line in node_lines]
+        now = time()
+        self.observe(lines, now)
+        summary = self.summarize(now)
+        self.history.append((now, summary['throughput_bps'], summary['loss']))
+        self.last_summary = summary
+        return summary
+
+    def run(self):
+        next_poll = next_log = time()
+        while not self.stopped.is_set():
+            summary = self.poll()
+            if self.log_interval and summary['time'] >= next_log:
+                LOG.info('Live results: %s', self.format_summary(summary, max_flows=0))
+                next_log = summary['time'] + self.log_interval
+            if self.check_abort(summary):
+                break
+            next_poll += self.poll_interval
+            delay = next_poll - time()
+            if delay > 0:
+                self.stopped.wait(delay)
+            else:
+                next_poll = time()
+
+    def start(self):
+        """
+        Starts following the outputs in the background.
+        """
+        self.threadpool = ThreadPool(min(len(self.nodes), Constant.LIVE_RESULTS_THREADS) or 1)
+        self.stopped.clear()
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+        LOG.info('Live results are collected from %d nodes (window: %.1f s).', len(self.nodes),
+                 self.window)
+
+    def stop(self):
+        """
+        Stops following the outputs, the last lines are read first.
+        """
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.threadpool is not None:
+            if self.aborted is None:
+                self.poll()
+            self.threadpool.close()
+            self.threadpool.join()
+            self.threadpool = None
+
+    def format_summary(self, summary=None, max_flows=5):
+        """
+        Formats a summary for the CLI.
+
+        :param summary: The summary, defaults to the last one.
+        :param max_flows: Number of the worst flows listed.
+        :return: The formatted summary.
+        """
+        summary = summary or self.last_summary
+        if summary is None:
+            return 'no results yet'
+        text = '%d active flows, %.1f kbps, loss %s over %.0f s, %d packets received' % (
+            summary['active_flows'], summary['throughput_bps'] / 1e3,
+            '-' if summary['loss'] is None else '%.1f%%' % (100 * summary['loss']),
+            summary['window'], summary['received_packets'])
+        for flow in summary['flows'][:max_flows]:
+            text += '\n\tflow %d %s-> %s: %.1f kbps, loss %s' % (
+                flow['flow'], '%s ' % flow['source'] if 'source' in flow else '',
+                flow.get('destination', '?'), flow['throughput_bps'] / 1e3,
+                '-' if flow['loss'] is None else '%.1f%%' % (100 * flow['loss']))
+        return text
+
+    def write_report(self, report_file):
+        """
+        Writes the last summary, the history of the totals and the abort status to a JSON file.
+
+        :param report_file: Path to the report file.
+        """
+        with open(report_file, 'w') as f:
+            json.dump({'summary': self.last_summary, 'aborted': self.aborted,
+                       'history': [{'time': now, 'throughput_bps': throughput, 'loss': loss}
+                                   for now, throughput, loss in self.history]}, f, indent=2)
+        LOG.info('Live results: %s, see %s', self.format_summary(max_flows=0), report_file)
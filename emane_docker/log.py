@@ -1,6 +1,174 @@
 #!/usr/bin/env python3
 
+import atexit
+import copy
+import json
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import os
+import queue
+from threading import Lock
+from time import monotonic
+
+# Maximum number of records waiting for the writer thread. When the queue is full, newer records
+# below WARNING are dropped instead of blocking the caller.
+QUEUE_SIZE = 100000
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Puts the records to a bounded queue, which is drained by a background writer thread. The
+    caller does not wait for the terminal or the disk: if the queue is full, records below
+    WARNING are dropped, warnings and errors wait for a free slot.
+
+    :param log_queue: The queue.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The queue does not leave the process, so the exception info is kept for the handlers
+        # instead of being folded into the message.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        if record.levelno >= logging.WARNING:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as JSON lines, with the time, level and the formatted message.
+    """
+
+    def format(self, record):
+        entry = {'time': record.created, 'level': record.levelname, 'message': record.getMessage()}
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class SampledLogger:
+    """
+    Rate-limits the records of a hot loop. At most max_per_second records are logged per second,
+    the number of suppressed records is appended to the next logged record. The level is checked
+    first, so disabled records cost a single comparison.
+
+    :param logger: The logger.
+    :param max_per_second: Maximum number of records per second.
+    """
+
+    def __init__(self, logger, max_per_second=10.0):
+        self.logger = logger
+        self.interval = 1.0 / max_per_second
+        self.next_time = 0.0
+        self.suppressed = 0
+        self.lock = Lock()
+
+    def log(self, level, msg, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        now = monotonic()
+        with self.lock:
+            if now < self.next_time:
+                self.suppressed += 1
+                return
+            self.next_time = now + self.interval
+            suppressed, self.suppressed = self.suppressed, 0
+        if suppressed:
+            msg += ' (%d similar messages suppressed)'
+            args += (suppressed,)
+        self.logger.log(level, msg, *args)
+
+    def debug(self, msg, *args):
+        self.log(logging.DEBUG, msg, *args)
+
+    def info(self, msg, *args):
+        self.log(logging.INFO, msg, *args)
+
+
+class LogWriter:
+    """
+    Owns the handlers and the writer thread of the logger. The records are put to the queue of a
+    DroppingQueueHandler, attached to the logger once, and written to the handlers by a
+    QueueListener.
+    """
+
+    def __init__(self):
+        self.handlers = []
+        self.listener = None
+        self.queue_handler = None
+
+    def restart(self):
+        """
+        Restarts the writer thread with the current handlers.
+        """
+        if self.listener is not None:
+            self.listener.stop()
+        if self.queue_handler is None:
+            self.queue_handler = DroppingQueueHandler(queue.Queue(QUEUE_SIZE))
+            LOG.addHandler(self.queue_handler)
+        self.listener = QueueListener(self.queue_handler.queue, *self.handlers,
+                                      respect_handler_level=True)
+        self.listener.start()
+
+    def shutdown(self):
+        """
+        Writes the queued records and stops the writer thread.
+        """
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        if self.queue_handler is not None and self.queue_handler.dropped:
+            for handler in self.handlers:
+                handler.handle(logging.makeLogRecord({
+                    'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': '%d log records were dropped, the log queue was full.' % (
+                        self.queue_handler.dropped)}))
+
+    def flush(self):
+        """
+        Blocks until the writer thread writes all queued records.
+        """
+        if self.listener is not None:
+            self.queue_handler.queue.join()
+
+    def reinit_after_fork(self):
+        """
+        The writer thread does not exist in forked processes (e.g. sweep points), each process
+        starts its own writer with a new queue.
+        """
+        if self.queue_handler is not None:
+            self.queue_handler.queue = queue.Queue(QUEUE_SIZE)
+            self.listener = None
+            self.restart()
+
+
+WRITER = LogWriter()
+
+
+def shutdown():
+    """
+    Writes the queued records and stops the writer thread. It is called at exit.
+    """
+    WRITER.shutdown()
+
+
+def flush():
+    """
+    Blocks until the writer thread writes all queued records.
+    """
+    WRITER.flush()
 
 
 def setup(debug=False):
@@ -12,9 +180,8 @@ def setup(debug=False):
     formatter_str = '%(asctime)s %(levelname)s %(message)s'
     handler = logging.StreamHandler()
     handler.setFormatter(logging.Formatter(formatter_str))
-
-    logger = logging.getLogger(__name__)
-    logger.addHandler(handler)
+    WRITER.handlers.append(handler)
+    WRITER.restart()
 
     log_level = logging.DEBUG if debug else logging.INFO
     logger = logging.getLogger(__name__)
@@ -34,10 +201,24 @@ def add_file_logger(logfile, no_stdout=False):
         file_formatter_str = '%(asctime)s %(levelname)s %(message)s'
         file_handler = logging.FileHandler(logfile, mode='w')
         file_handler.setFormatter(logging.Formatter(file_formatter_str))
-        logger = logging.getLogger(__name__)
-        if no_stdout:
-            logger.removeHandler(logger.handlers[-1])
-        logger.addHandler(file_handler)
+        if no_stdout and WRITER.handlers:
+            WRITER.handlers.pop()
+        WRITER.handlers.append(file_handler)
+        WRITER.restart()
+
+
+def add_json_logger(logfile):
+    """
+    Adds a JSON lines sink to the logger, each record is written as a JSON object per line.
+
+    :param logfile: Full path of the JSON lines file.
+    """
+    json_handler = logging.FileHandler(logfile, mode='w')
+    json_handler.setFormatter(JsonFormatter())
+    WRITER.handlers.append(json_handler)
+    WRITER.restart()
 
 
 LOG = logging.getLogger(__name__)
+atexit.register(shutdown)
+os.register_at_fork(after_in_child=WRITER.reinit_after_fork)
@@ -7,14 +7,18 @@ import sys
 from colorama import init
 from termcolor import cprint
 from pyfiglet import figlet_format
-import yaml
 
+from emane_docker.constant import Constant
+from emane_docker.eel import convert_record
 from emane_docker.log import LOG
 from emane_docker.log import setup as log_setup
-from emane_docker.log import add_file_logger
-from emane_docker.result_report import Report
+from emane_docker.log import add_file_logger, add_json_logger
+from emane_docker.metrics import REGISTRY
+from emane_docker.result_report import IperfReport, Report
+from emane_docker.sweep import SweepRunner
 from emane_docker.topology import EmaneTopology
-from emane_docker.topology_drawer import draw
+from emane_docker.topology_drawer import LAYOUTS, draw
+from emane_docker.util import load_yaml
 
 
 def main():
@@ -51,10 +55,32 @@ def main():
                         help='do not output logs')
     parser.add_argument('--debug', action='store_true', dest='debug', default=False,
                         help='set log level to debug')
+    parser.add_argument('--json-log', action='store', dest='json_log', default=None,
+                        help='also write the logs to this file as JSON lines')
+    parser.add_argument('--apply-topology', action='store', dest='apply_topology', default=None,
+                        help='apply the link changes of this topology file to the running topology '
+                             '(given by --topology-file) without restarting the containers')
+    parser.add_argument('--compile-configs', action='store_true', dest='compile_configs',
+                        default=False,
+                        help='only compile the node configurations into a bundle, see '
+                             'config_delivery in configuration file')
     parser.add_argument('--draw-topology', action='store_true', dest='draw_topology', default=False,
                         help='draw current topology file')
     parser.add_argument('--figure-path', action='store', dest='figure_path', default=None,
                         help='output path for figure, if --draw-topology is specified')
+    parser.add_argument('--layout', action='store', dest='layout', default='auto', choices=LAYOUTS,
+                        help='layout of the topology figure, if --draw-topology is specified')
+    parser.add_argument('--convert-record', action='store', dest='convert_record', default=None,
+                        help='convert link updates recorded during a live run to an EEL file')
+    parser.add_argument('--eel-file', action='store', dest='eel_file', default='scenario.eel',
+                        help='output path for the EEL file, if --convert-record is specified')
+    parser.add_argument('--draw-results', action='store_true', dest='draw_results', default=False,
+                        help='draw the results of the last experiment')
+    parser.add_argument('--sweep', action='store_true', dest='sweep', default=False,
+                        help='run an experiment for each point of the sweep parameters')
+    parser.add_argument('--namespace', action='store', dest='namespace', default=None,
+                        help='namespace of the experiment, overrides the namespace in '
+                             'configuration file')
 
     opts, _ = parser.parse_known_args()
 
@@ -70,11 +96,18 @@ def main():
             LOG.debug('Cannot use cprint, this might affect logging.')
             LOG.debug(exc.__traceback__)
             print('EMANE-Docker')
+    if opts.json_log:
+        add_json_logger(opts.json_log)
+
+    if opts.convert_record:
+        num_lines = convert_record(record_file=opts.convert_record, eel_file=opts.eel_file)
+        LOG.info('%d events are written to %s', num_lines, opts.eel_file)
+        return 0
 
     # Read configuration
     config = None
     with open(opts.config_file, 'r') as f:
-        config = yaml.load(f)
+        config = load_yaml(f)
     if not config:
         LOG.error('Incorrect config file at %s', opts.config_file)
         return -1
@@ -82,19 +115,47 @@ def main():
     if opts.topology_file is not None:
         config['topology_file'] = opts.topology_file
 
+    if opts.namespace is not None:
+        config['namespace'] = opts.namespace
+
+    if opts.compile_configs:
+        config['config_delivery'] = Constant.CONFIG_DELIVERY_BUNDLE
+
     if 'no_cli' not in config:
         config['no_cli'] = opts.no_cli
 
+    if opts.sweep:
+        return SweepRunner(config=config).run()
+
     emane_topology = EmaneTopology(config=config)
     if opts.start:
-        emane_topology.start()
+        metrics = config.get('metrics', None) or {}
+        if metrics.get('port', None) is not None:
+            REGISTRY.start_server(port=metrics['port'], host=metrics.get('host', '127.0.0.1'))
+        try:
+            emane_topology.start()
+        finally:
+            # The metrics are dumped even if the experiment is stopped with Ctrl-C.
+            if metrics.get('dump_file', None):
+                REGISTRY.dump(metrics['dump_file'])
+            REGISTRY.stop_server()
     elif opts.stop:
         emane_topology.stop()
+    elif opts.compile_configs:
+        return emane_topology.generate_configs()
+    elif opts.apply_topology:
+        return emane_topology.apply_topology(opts.apply_topology)
     elif opts.draw_topology:
         LOG.info('Saving the topology file at %s', opts.figure_path)
-        draw(nodes=emane_topology.nodes, out_file=opts.figure_path)
+        draw(nodes=emane_topology.nodes, out_file=opts.figure_path, layout=opts.layout)
     elif opts.draw_results:
-        report = Report(num_nodes=4)
+        traffic = (config.get('experiment', None) or {}).get('traffic', None) or {}
+        if traffic.get('workload', Constant.WORKLOAD_MGEN) == Constant.WORKLOAD_IPERF3:
+            report = IperfReport(config_directory=emane_topology.config_directory)
+        else:
+            report = Report(num_nodes=len(emane_topology.nodes),
+                            address_allocator=emane_topology.address_allocator,
+                            config_directory=emane_topology.config_directory)
         report.draw_figures()
 
     return 0
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+
+from bisect import bisect_left
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+from threading import Lock, Thread
+from time import perf_counter
+
+from emane_docker.log import LOG
+
+# Latency buckets in seconds, from 100 microseconds to 1 minute.
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=None):
+    labels = list(key) + ([extra] if extra is not None else [])
+    if not labels:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (name, value) for name, value in labels)
+
+
+def _format_value(value):
+    return '+Inf' if value == float('inf') else repr(float(value))
+
+
+class Counter:
+    """
+    A monotonically increasing counter, with a separate value for each set of labels.
+
+    :param name: Name of the metric.
+    :param description: Description of the metric.
+    """
+    type = 'counter'
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.lock = Lock()
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.values.get(_label_key(labels), 0)
+
+    def reset(self):
+        with self.lock:
+            self.values = {}
+
+    def to_prometheus(self):
+        with self.lock:
+            return ['%s%s %s' % (self.name, _format_labels(key), _format_value(value))
+                    for key, value in sorted(self.values.items())]
+
+    def to_dict(self):
+        with self.lock:
+            return [{'labels': dict(key), 'value': value}
+                    for key, value in sorted(self.values.items())]
+
+
+class Gauge:
+    """
+    A value that can go up and down, with a separate value for each set of labels.
+
+    :param name: Name of the metric.
+    :param description: Description of the metric.
+    """
+    type = 'gauge'
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.lock = Lock()
+        self.values = {}
+
+    def set(self, value, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def remove(self, **labels):
+        with self.lock:
+            self.values.pop(_label_key(labels), None)
+
+    def value(self, **labels):
+        return self.values.get(_label_key(labels), None)
+
+    def reset(self):
+        with self.lock:
+            self.values = {}
+
+    def to_prometheus(self):
+        with self.lock:
+            return ['%s%s %s' % (self.name, _format_labels(key), _format_value(value))
+                    for key, value in sorted(self.values.items())]
+
+    def to_dict(self):
+        with self.lock:
+            return [{'labels': dict(key), 'value': value}
+                    for key, value in sorted(self.values.items())]
+
+
+class HistogramSeries:
+    __slots__ = ('bucket_counts', 'count', 'sum', 'min', 'max')
+
+    def __init__(self, num_buckets):
+        self.bucket_counts = [0] * num_buckets
+        self.count = 0
+        self.sum = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+
+class Histogram:
+    """
+    Counts the observed values in cumulative buckets, with a separate series for each set of
+    labels.
+
+    :param name: Name of the metric.
+    :param description: Description of the metric.
+    :param buckets: Upper bounds of the buckets, in increasing order.
+    """
+    type = 'histogram'
+
+    def __init__(self, name, description, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self.lock = Lock()
+        self.series = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key, None)
+            if series is None:
+                series = self.series[key] = HistogramSeries(len(self.buckets))
+            series.bucket_counts[index] += 1
+            series.count += 1
+            series.sum += value
+            series.min = min(series.min, value)
+            series.max = max(series.max, value)
+
+    def time(self, **labels):
+        """
+        Returns a timer observing its duration in this histogram.
+
+        :param labels: Labels of the observation.
+        :return: The timer.
+        """
+        return Timer(self, **labels)
+
+    def count(self, **labels):
+        series = self.series.get(_label_key(labels), None)
+        return series.count if series is not None else 0
+
+    def reset(self):
+        with self.lock:
+            self.series = {}
+
+    def to_prometheus(self):
+        lines = []
+        with self.lock:
+            for key, series in sorted(self.series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, series.bucket_counts):
+                    cumulative += bucket_count
+                    lines.append('%s_bucket%s %d' % (self.name, _format_labels(
+                        key, ('le', _format_value(bound))), cumulative))
+                lines.append('%s_sum%s %s' % (self.name, _format_labels(key),
+                                              _format_value(series.sum)))
+                lines.append('%s_count%s %d' % (self.name, _format_labels(key), series.count))
+        return lines
+
+    def to_dict(self):
+        with self.lock:
+            return [{'labels': dict(key), 'count': series.count, 'sum': series.sum,
+                     'min': series.min if series.count else None,
+                     'max': series.max if series.count else None,
+                     'buckets': {_format_value(bound): bucket_count for bound, bucket_count in
+                                 zip(self.buckets, series.bucket_counts)}}
+                    for key, series in sorted(self.series.items())]
+
+
+class Timer:
+    """
+    Measures the wall time of a block or a function and observes it in a histogram. It can be
+    used as a context manager or as a decorator.
+
+    :param histogram: The histogram.
+    :param labels: Labels of the observation.
+    """
+
+    def __init__(self, histogram, **labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.start_time = None
+
+    def __enter__(self):
+        self.start_time = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(perf_counter() - self.start_time, **self.labels)
+        return False
+
+    def __call__(self, method):
+        @wraps(method)
+        def timed(*args, **kwargs):
+            with Timer(self.histogram, **self.labels):
+                return method(*args, **kwargs)
+        return timed
+
+
+class Registry:
+    """
+    Keeps the metrics of the controller, exports them at a Prometheus endpoint and dumps them as
+    JSON.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.metrics = {}
+        self.server = None
+
+    def _get_or_create(self, metric_class, name, description, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name, None)
+            if metric is None:
+                metric = self.metrics[name] = metric_class(name, description, **kwargs)
+            elif not isinstance(metric, metric_class):
+                raise ValueError('Metric %s is already registered as a %s' % (name, metric.type))
+            return metric
+
+    def counter(self, name, description):
+        """
+        Returns the counter with the given name, it is created if it does not exist.
+
+        :param name: Name of the metric.
+        :param description: Description of the metric.
+        :return: The counter.
+        """
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name, description):
+        """
+        Returns the gauge with the given name, it is created if it does not exist.
+
+        :param name: Name of the metric.
+        :param description: Description of the metric.
+        :return: The gauge.
+        """
+        return self._get_or_create(Gauge, name, description)
+
+    def histogram(self, name, description, buckets=DEFAULT_BUCKETS):
+        """
+        Returns the histogram with the given name, it is created if it does not exist.
+
+        :param name: Name of the metric.
+        :param description: Description of the metric.
+        :param buckets: Upper bounds of the buckets, in increasing order.
+        :return: The histogram.
+        """
+        return self._get_or_create(Histogram, name, description, buckets=buckets)
+
+    def reset(self):
+        """
+        Resets the values of all metrics, the metrics stay registered.
+        """
+        for metric in list(self.metrics.values()):
+            metric.reset()
+
+    def to_prometheus(self):
+        """
+        Formats all metrics in the Prometheus text exposition format.
+
+        :return: The metrics.
+        """
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append('# HELP %s %s' % (name, metric.description))
+            lines.append('# TYPE %s %s' % (name, metric.type))
+            lines.extend(metric.to_prometheus())
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self):
+        return {name: {'type': metric.type, 'description': metric.description,
+                       'samples': metric.to_dict()}
+                for name, metric in sorted(self.metrics.items())}
+
+    def dump(self, dump_file):
+        """
+        Dumps all metrics to a JSON file.
+
+        :param dump_file: Path to the JSON file.
+        """
+        with open(dump_file, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+        LOG.info('Controller metrics are dumped to %s', dump_file)
+
+    def start_server(self, port, host='127.0.0.1'):
+        """
+        Serves the metrics at http://<host>:<port>/metrics in the background.
+
+        :param port: Port of the endpoint, 0 selects a free port.
+        :param host: Address the endpoint listens at.
+        :return: The port of the endpoint.
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                LOG.debug('Metrics endpoint: ' + format, *args)
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        port = self.server.server_address[1]
+        LOG.info('Controller metrics are served at http://%s:%d/metrics', host, port)
+        return port
+
+    def stop_server(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+REGISTRY = Registry()
+# Shared by the modules running commands in the containers.
+EXEC_SECONDS = REGISTRY.histogram('emane_docker_exec_seconds',
+                                  'Latency of the exec calls to the containers')
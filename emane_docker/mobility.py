@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+
+from threading import Event
+from time import monotonic
+
+import numpy as np
+
+from emane_docker.constant import Constant
+from emane_docker.eel import location_line, pathloss_line
+from emane_docker.log import LOG, SampledLogger
+
+EARTH_RADIUS = 6371000.0
+SPEED_OF_LIGHT = 299792458.0
+# Pathloss used between a NEM and itself and as the upper bound of the models, in dB.
+MAX_PATHLOSS = 200.0
+
+
+def free_space_pathloss(distances, frequency, **_):
+    """
+    Computes the free-space pathloss.
+
+    :param distances: Distances between the NEMs, in meters.
+    :param frequency: Carrier frequency, in Hz.
+    :return: Pathloss values, in dB.
+    """
+    distances = np.maximum(distances, 1.0)
+    return 20.0 * np.log10(distances) + 20.0 * np.log10(frequency) - 147.55
+
+
+def two_ray_pathloss(distances, frequency, antenna_height=1.5, **_):
+    """
+    Computes the two-ray ground reflection pathloss. Free-space pathloss is used below the
+    crossover distance.
+
+    :param distances: Distances between the NEMs, in meters.
+    :param frequency: Carrier frequency, in Hz.
+    :param antenna_height: Height of the antennas, in meters.
+    :return: Pathloss values, in dB.
+    """
+    wavelength = SPEED_OF_LIGHT / frequency
+    crossover = 4.0 * np.pi * antenna_height * antenna_height / wavelength
+    two_ray = 40.0 * np.log10(np.maximum(distances, 1.0)) - 40.0 * np.log10(antenna_height)
+    return np.where(distances < crossover, free_space_pathloss(distances, frequency), two_ray)
+
+
+PATHLOSS_MODELS = {
+    'freespace': free_space_pathloss,
+    'tworay': two_ray_pathloss
+}
+
+
+class LocalFrame:
+    """
+    Converts GPS coordinates to local east/north/up coordinates, in meters, around a reference
+    point and back. An equirectangular projection is used, which is accurate for emulation areas
+    of a few tens of kilometers.
+
+    :param latitude: Latitude of the reference point.
+    :param longitude: Longitude of the reference point.
+    :param altitude: Altitude of the reference point.
+    """
+
+    def __init__(self, latitude=0.0, longitude=0.0, altitude=0.0):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude = altitude
+        self.meters_per_degree = np.pi * EARTH_RADIUS / 180.0
+        self.cos_latitude = np.cos(np.radians(latitude))
+
+    def to_local(self, gps):
+        gps = np.asarray(gps, dtype=float)
+        local = np.empty_like(gps)
+        local[..., 0] = (gps[..., 1] - self.longitude) * self.meters_per_degree * self.cos_latitude
+        local[..., 1] = (gps[..., 0] - self.latitude) * self.meters_per_degree
+        local[..., 2] = gps[..., 2] - self.altitude
+        return local
+
+    def to_gps(self, local):
+        local = np.asarray(local, dtype=float)
+        gps = np.empty_like(local)
+        gps[..., 0] = self.latitude + local[..., 1] / self.meters_per_degree
+        gps[..., 1] = self.longitude + local[..., 0] / (self.meters_per_degree * self.cos_latitude)
+        gps[..., 2] = self.altitude + local[..., 2]
+        return gps
+
+
+class TraceMobility:
+    """
+    Plays back a position trace. The trace uses the EEL location format, one keyframe per line:
+    `<time> nem:<id> location gps <latitude>,<longitude>,<altitude>`. Positions between keyframes
+    are linearly interpolated.
+
+    :param trace_file: Path to the trace file.
+    :param nem_ids: Ids of the NEMs, in the order of the returned positions.
+    :param frame: Local frame the positions are returned in.
+    """
+
+    def __init__(self, trace_file, nem_ids, frame):
+        keyframes = {int(nem_id): [] for nem_id in nem_ids}
+        with open(trace_file, 'r') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 5 or fields[0].startswith('#') or fields[2] != 'location':
+                    continue
+                nem_id = int(fields[1].split(':')[1])
+                if nem_id not in keyframes:
+                    continue
+                keyframes[nem_id].append(
+                    [float(fields[0])] + [float(value) for value in fields[4].split(',')])
+
+        self.times = []
+        self.trace_positions = []
+        for nem_id in map(int, nem_ids):
+            if not keyframes[nem_id]:
+                LOG.warning('NEM %d is not in the trace %s, it stays at the reference point.',
+                            nem_id, trace_file)
+                keyframes[nem_id].append([0.0, frame.latitude, frame.longitude, frame.altitude])
+            trace = np.array(sorted(keyframes[nem_id]))
+            self.times.append(trace[:, 0])
+            self.trace_positions.append(frame.to_local(trace[:, 1:4]))
+        self.duration = max(times[-1] for times in self.times)
+
+    def positions(self, current_time):
+        """
+        Returns the positions of all NEMs at the given time.
+
+        :param current_time: Time since the beginning of the trace, in seconds.
+        :return: N x 3 array of local positions.
+        """
+        positions = np.empty((len(self.times), 3))
+        for i, (times, trace) in enumerate(zip(self.times, self.trace_positions)):
+            for axis in range(3):
+                positions[i, axis] = np.interp(current_time, times, trace[:, axis])
+        return positions
+
+
+class RandomWaypointMobility:
+    """
+    Generates random-waypoint movement for all NEMs. Each NEM moves to a uniformly random
+    waypoint in the area with a uniformly random speed, pauses and picks the next waypoint.
+
+    :param num_nems: Number of NEMs.
+    :param area: Width and height of the area, in meters.
+    :param speed: Minimum and maximum speed, in meters per second.
+    :param pause: Pause time at each waypoint, in seconds.
+    :param rng: Random number generator.
+    """
+
+    def __init__(self, num_nems, area=(1000.0, 1000.0), speed=(1.0, 10.0), pause=0.0, rng=None):
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.area = np.array([area[0], area[1], 0.0])
+        self.speed_range = speed
+        self.pause = pause
+        self.current_time = 0.0
+        self.position = self._random_waypoints(num_nems)
+        self.target = self._random_waypoints(num_nems)
+        self.speed = self.rng.uniform(speed[0], speed[1], num_nems)
+        self.pause_left = np.zeros(num_nems)
+        self.duration = float('inf')
+
+    def _random_waypoints(self, count):
+        return self.rng.random((count, 3)) * self.area
+
+    def positions(self, current_time):
+        """
+        Advances the NEMs to the given time, which must not be earlier than the previous call.
+
+        :param current_time: Time since the beginning of the movement, in seconds.
+        :return: N x 3 array of local positions.
+        """
+        remaining = np.full(len(self.position), max(current_time - self.current_time, 0.0))
+        self.current_time = max(current_time, self.current_time)
+        while True:
+            pausing = (self.pause_left > 0) & (remaining > 0)
+            paused_time = np.minimum(self.pause_left, remaining) * pausing
+            self.pause_left -= paused_time
+            remaining -= paused_time
+
+            moving = (self.pause_left <= 0) & (remaining > 0)
+            if not moving.any():
+                break
+            direction = self.target - self.position
+            distance = np.linalg.norm(direction, axis=1)
+            travel = self.speed * remaining
+            arrived = moving & (travel >= distance)
+            passing = moving & ~arrived
+            scale = travel[passing] / np.maximum(distance[passing], 1e-9)
+            self.position[passing] += direction[passing] * scale[:, np.newaxis]
+            remaining[passing] = 0.0
+
+            if arrived.any():
+                count = int(arrived.sum())
+                self.position[arrived] = self.target[arrived]
+                remaining[arrived] -= distance[arrived] / self.speed[arrived]
+                self.pause_left[arrived] = self.pause
+                self.target[arrived] = self._random_waypoints(count)
+                self.speed[arrived] = self.rng.uniform(self.speed_range[0], self.speed_range[1],
+                                                       count)
+        return self.position.copy()
+
+
+class MobilityEngine:
+    """
+    Moves the NEMs and updates the pathloss between them. At each tick, the pairwise distances and
+    pathloss values of all NEMs are computed at once, and only the locations and pathloss values
+    that changed more than the configured thresholds are published.
+
+    :param nodes: The nodes of the topology.
+    :param mobility_pattern: Either random_waypoint or the path to a trace file.
+    :param mobility_config: The mobility configuration, see config.default.yaml for details.
+    :param duration: Duration of the experiment, in seconds.
+    :param publisher: Event publisher, required only to run the engine live.
+    :param rng: Random number generator.
+    """
+
+    def __init__(self, nodes, mobility_pattern, mobility_config, duration, publisher=None,
+                 rng=None):
+        mobility_config = mobility_config or {}
+        self.nem_ids = np.array(sorted(node.nem_id for node in nodes.values()))
+        self.duration = duration
+        self.publisher = publisher
+        self.rate = float(mobility_config.get('rate', 10.0))
+        self.stopped = Event()
+        self.pathloss_threshold = float(mobility_config.get('pathloss_threshold', 1.0))
+        self.location_threshold = float(mobility_config.get('location_threshold', 1.0))
+        pathloss_model = mobility_config.get('pathloss_model', 'freespace')
+        if pathloss_model not in PATHLOSS_MODELS:
+            raise ValueError('Unknown pathloss model %s, supported models are %s' % (
+                pathloss_model, ', '.join(PATHLOSS_MODELS)))
+        self.pathloss_model = PATHLOSS_MODELS[pathloss_model]
+        self.pathloss_parameters = {
+            'frequency': float(mobility_config.get('frequency', 2.4e9)),
+            'antenna_height': float(mobility_config.get('antenna_height', 1.5))
+        }
+        self.frame = LocalFrame(*mobility_config.get('reference', (0.0, 0.0, 0.0)))
+
+        if mobility_pattern == 'random_waypoint':
+            random_waypoint = mobility_config.get('random_waypoint', None) or {}
+            self.model = RandomWaypointMobility(len(self.nem_ids),
+                                                area=random_waypoint.get('area', (1000, 1000)),
+                                                speed=random_waypoint.get('speed', (1.0, 10.0)),
+                                                pause=random_waypoint.get('pause', 0.0), rng=rng)
+        else:
+            self.model = TraceMobility(mobility_pattern, self.nem_ids, self.frame)
+
+        num_nems = len(self.nem_ids)
+        self.published_positions = np.full((num_nems, 3), np.nan)
+        self.published_pathloss = np.full((num_nems, num_nems), np.nan)
+        np.fill_diagonal(self.published_pathloss, MAX_PATHLOSS)
+
+    def compute_pathloss(self, positions):
+        """
+        Computes the pathloss between all NEM pairs.
+
+        :param positions: N x 3 array of local positions.
+        :return: N x N array of pathloss values, in dB.
+        """
+        differences = positions[:, np.newaxis, :] - positions[np.newaxis, :, :]
+        distances = np.sqrt(np.einsum('ijk,ijk->ij', differences, differences))
+        pathloss = np.minimum(self.pathloss_model(distances, **self.pathloss_parameters),
+                              MAX_PATHLOSS)
+        np.fill_diagonal(pathloss, MAX_PATHLOSS)
+        return pathloss
+
+    def step(self, current_time):
+        """
+        Moves the NEMs to the given time and returns the changes that must be published.
+
+        :param current_time: Time since the beginning of the experiment, in seconds.
+        :return: List of (NEM, latitude, longitude, altitude) tuples and the pathloss updates as a
+            dictionary from a receiving NEM to a list of (transmitting NEM, pathloss) tuples.
+        """
+        positions = self.model.positions(current_time)
+
+        distances = np.linalg.norm(positions - self.published_positions, axis=1)
+        moved = ~(distances <= self.location_threshold)
+        locations = []
+        if moved.any():
+            self.published_positions[moved] = positions[moved]
+            gps = self.frame.to_gps(positions[moved])
+            locations = [(nem_id, latitude, longitude, altitude) for nem_id, (
+                latitude, longitude, altitude) in zip(self.nem_ids[moved], gps)]
+
+        pathloss = self.compute_pathloss(positions)
+        changed = ~(np.abs(pathloss - self.published_pathloss) <= self.pathloss_threshold)
+        updates = {}
+        for row in np.flatnonzero(changed.any(axis=1)):
+            columns = np.flatnonzero(changed[row])
+            updates[self.nem_ids[row]] = list(zip(self.nem_ids[columns], pathloss[row, columns]))
+        self.published_pathloss[changed] = pathloss[changed]
+        return locations, updates
+
+    def ticks(self):
+        """
+        Yields the time of each tick until the end of the experiment or the trace.
+        """
+        end_time = min(self.duration, self.model.duration)
+        tick = 0
+        while tick / self.rate <= end_time:
+            yield tick / self.rate
+            tick += 1
+
+    def export_eel(self, offset=0.0):
+        """
+        Samples all ticks ahead of time as EEL lines, to be replayed by the EMANE event service.
+
+        :param offset: Offset added to each event time, in seconds.
+        :return: Generator of (time, EEL line) tuples.
+        """
+        for current_time in self.ticks():
+            event_time = current_time + offset
+            locations, updates = self.step(current_time)
+            for nem, latitude, longitude, altitude in locations:
+                yield event_time, location_line(event_time, nem, latitude, longitude, altitude)
+            for nem, entries in updates.items():
+                yield event_time, pathloss_line(event_time, nem, entries)
+
+    def start(self):
+        """
+        Runs the mobility engine, publishing the changes at every tick.
+        """
+        LOG.info('Mobility engine is started with %d NEMs at %.1f Hz.', len(self.nem_ids),
+                 self.rate)
+        tick_log = SampledLogger(LOG, max_per_second=Constant.EVENT_LOG_RATE)
+        start_time = monotonic()
+        late_ticks = 0
+        for current_time in self.ticks():
+            delay = start_time + current_time - monotonic()
+            if delay > 0:
+                self.stopped.wait(delay)
+            else:
+                late_ticks += 1
+            if self.stopped.is_set():
+                break
+            locations, updates = self.step(current_time)
+            if locations:
+                self.publisher.publish_locations(locations)
+            if updates:
+                self.publisher.publish_pathloss(updates)
+            tick_log.debug('Mobility tick at %.2f: %d locations, %d pathloss events',
+                           current_time, len(locations), len(updates))
+        if late_ticks:
+            LOG.warning('Mobility engine missed the deadline of %d ticks.', late_ticks)
+        LOG.info('Mobility engine is finished.')
+
+    def stop(self):
+        """
+        Stops the mobility engine, start returns before the next tick.
+        """
+        self.stopped.set()
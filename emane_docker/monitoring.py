@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import json
+import os
+
+from emane_docker.log import LOG
+from emane_docker.util import mkdir_p
+
+
+def node_targets(nodes, host, port_base, namespace=''):
+    """
+    Returns the Prometheus targets of the nodes, each node exposes its Telegraf metrics at
+    port_base + node index.
+
+    :param nodes: The nodes of the topology.
+    :param host: The host the node ports are published at.
+    :param port_base: The Telegraf port of the first node.
+    :param namespace: The namespace of the experiment.
+    :return: List of target groups in the Prometheus file-based service discovery format.
+    """
+    return [{'targets': ['%s:%d' % (host, port_base + node.index)],
+             'labels': {'node': node.name, 'domain': str(node.domain), 'nem_id': str(node.nem_id),
+                        'namespace': namespace}}
+            for node in sorted(nodes.values(), key=lambda node: node.index)]
+
+
+def aggregator_targets(host, port, namespace=''):
+    """
+    Returns the Prometheus target of a Telegraf aggregator, which exposes the metrics of all nodes.
+    The node of each metric is kept in its node tag.
+
+    :param host: The host the aggregator port is published at.
+    :param port: The port of the aggregator.
+    :param namespace: The namespace of the experiment.
+    :return: List of target groups in the Prometheus file-based service discovery format.
+    """
+    return [{'targets': ['%s:%d' % (host, port)], 'labels': {'namespace': namespace}}]
+
+
+def controller_targets(host, port, namespace=''):
+    """
+    Returns the Prometheus target of the controller metrics endpoint.
+
+    :param host: The host the endpoint is scraped at.
+    :param port: The port of the endpoint.
+    :param namespace: The namespace of the experiment.
+    :return: List of target groups in the Prometheus file-based service discovery format.
+    """
+    return [{'targets': ['%s:%d' % (host, port)],
+             'labels': {'namespace': namespace, 'role': 'controller'}}]
+
+
+def write_targets(targets_file, targets):
+    """
+    Writes the target file read by Prometheus. The file is replaced atomically, so Prometheus never
+    reads a partially written file.
+
+    :param targets_file: Path to the target file.
+    :param targets: List of target groups.
+    """
+    mkdir_p(os.path.dirname(targets_file))
+    with open(targets_file + '.tmp', 'w') as f:
+        json.dump(targets, f, indent=2)
+    os.replace(targets_file + '.tmp', targets_file)
+    LOG.debug('%d scrape targets are written to %s', len(targets), targets_file)
+
+
+def remove_targets(targets_file):
+    """
+    Removes the target file, Prometheus stops scraping its targets.
+
+    :param targets_file: Path to the target file.
+    """
+    try:
+        os.remove(targets_file)
+    except FileNotFoundError:
+        pass
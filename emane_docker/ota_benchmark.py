@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+import json
+import shlex
+from multiprocessing.pool import ThreadPool
+from time import sleep
+
+import numpy as np
+
+from emane_docker.constant import Constant
+from emane_docker.log import LOG
+
+# Joins the multicast group and counts the received datagrams until the deadline.
+_RECEIVER = '''
+import json, socket, struct, sys, time
+group, port, duration = sys.argv[1], int(sys.argv[2]), float(sys.argv[3])
+s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 24)
+s.bind(('', port))
+s.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+             struct.pack('4s4s', socket.inet_aton(group), socket.inet_aton('0.0.0.0')))
+s.settimeout(0.2)
+packets = size = 0
+deadline = time.time() + duration
+while time.time() < deadline:
+    try:
+        size += len(s.recv(65535))
+        packets += 1
+    except socket.timeout:
+        pass
+print(json.dumps({'packets': packets, 'bytes': size}))
+'''
+
+# Sends datagrams to the multicast group at the given rate (0 is unlimited) for the duration.
+_SENDER = '''
+import json, socket, sys, time
+group, port, duration = sys.argv[1], int(sys.argv[2]), float(sys.argv[3])
+payload, rate = b'x' * int(sys.argv[4]), float(sys.argv[5])
+s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+s.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+packets = 0
+start = time.time()
+while True:
+    now = time.time()
+    if now - start >= duration:
+        break
+    if rate and packets >= (now - start) * rate:
+        time.sleep(min(1.0 / rate, 0.01))
+        continue
+    try:
+        s.sendto(payload, (group, port))
+        packets += 1
+    except OSError:
+        pass
+print(json.dumps({'packets': packets, 'bytes': packets * len(payload)}))
+'''
+
+
+class OtaBenchmark:
+    """
+    Measures the multicast throughput the Docker network of the nodes sustains, the traffic EMANE
+    OTA messages put on it. A few nodes send datagrams to a benchmark multicast group and the
+    other nodes receive them, the throughput each receiver gets is compared to the offered load.
+    The benchmark uses its own group, so it can run next to EMANE.
+
+    :param nodes: The nodes of the topology.
+    :param exec_run: Function running a command in the container of a node, e.g.
+        EmaneTopology.exec_run.
+    :param senders: Number of sending nodes, the first nodes in index order.
+    :param duration: Duration of the benchmark, in seconds.
+    :param payload_size: Size of each datagram, in bytes.
+    :param rate: Datagrams sent per second by each sender, 0 sends as fast as possible.
+    :param group: Multicast group of the benchmark, as address:port.
+    """
+
+    def __init__(self, nodes, exec_run, senders=1, duration=10.0, payload_size=1400, rate=0,
+                 group=Constant.OTA_BENCHMARK_GROUP):
+        self.nodes = sorted(nodes.values(), key=lambda node: node.index)
+        self.exec_run = exec_run
+        self.senders = self.nodes[:max(1, min(senders, len(self.nodes) - 1))]
+        self.receivers = self.nodes[len(self.senders):]
+        self.duration = float(duration)
+        self.payload_size = int(payload_size)
+        self.rate = rate
+        self.address, self.port = group.rsplit(':', 1)
+
+    @classmethod
+    def from_config(cls, config, nodes, exec_run):
+        """
+        Creates the benchmark using the benchmark block of the network configuration.
+
+        :param config: EMANE-Docker configuration.
+        :param nodes: The nodes of the topology.
+        :param exec_run: Function running a command in the container of a node.
+        :return: The benchmark.
+        """
+        benchmark = (config.get('network', None) or {}).get('benchmark', None) or {}
+        return cls(nodes=nodes, exec_run=exec_run, senders=benchmark.get('senders', 1),
+                   duration=benchmark.get('duration', 10.0),
+                   payload_size=benchmark.get('payload_size', 1400),
+                   rate=benchmark.get('rate', 0),
+                   group=benchmark.get('group', Constant.OTA_BENCHMARK_GROUP))
+
+    def command(self, script, duration, output_file, *args):
+        """
+        Returns the command running a benchmark script in a container.
+
+        :param script: The Python script.
+        :param duration: Run time of the script, in seconds.
+        :param output_file: File the script writes its counts to.
+        :param args: Additional arguments of the script.
+        :return: The command, as a list of arguments.
+        """
+        arguments = (self.address, self.port, duration) + args
+        return ['sh', '-c', 'python3 -c %s %s > %s 2>&1' % (
+            shlex.quote(script), ' '.join(shlex.quote(str(arg)) for arg in arguments),
+            output_file)]
+
+    def collect(self, node, output_file):
+        try:
+            result = self.exec_run(node, ['cat', output_file])
+            return json.loads(result.output.decode(errors='replace'))
+        except Exception as exc:
+            LOG.debug('OTA benchmark result of %s cannot be read: %s', node.name, exc)
+            return None
+
+    def run(self):
+        """
+        Runs the benchmark. Receivers are started first and keep receiving a second longer than
+        the senders send.
+
+        :return: Dictionary of the offered load, the receiver throughputs and the loss.
+        """
+        if not self.receivers:
+            raise ValueError('The OTA benchmark requires at least two nodes')
+        threadpool = ThreadPool(min(len(self.nodes), Constant.NODE_POLL_THREADS) or 1)
+        receive_time = self.duration + 2 * Constant.OTA_BENCHMARK_GUARD_TIME
+        threadpool.map(lambda node: self.exec_run(node, self.command(
+            _RECEIVER, receive_time, Constant.OTA_BENCHMARK_RECEIVER_FILE), detach=True),
+            self.receivers)
+        sleep(Constant.OTA_BENCHMARK_GUARD_TIME)
+        threadpool.map(lambda node: self.exec_run(node, self.command(
+            _SENDER, self.duration, Constant.OTA_BENCHMARK_SENDER_FILE, self.payload_size,
+            self.rate), detach=True), self.senders)
+        sleep(receive_time)
+        # The receivers print their counts when they finish.
+        sent = threadpool.map(lambda node: self.collect(node, Constant.OTA_BENCHMARK_SENDER_FILE),
+                              self.senders)
+        received = threadpool.map(
+            lambda node: self.collect(node, Constant.OTA_BENCHMARK_RECEIVER_FILE), self.receivers)
+        threadpool.close()
+        threadpool.join()
+        return self.summarize(sent, received)
+
+    def summarize(self, sent, received):
+        """
+        Summarizes the sender and receiver counts.
+
+        :param sent: List of sender counts, dictionaries of packets and bytes, None if missing.
+        :param received: List of receiver counts.
+        :return: Dictionary of the offered load, the receiver throughputs and the loss.
+        """
+        sent_packets = sum(count['packets'] for count in sent if count)
+        sent_bytes = sum(count['bytes'] for count in sent if count)
+        throughputs = np.array([count['bytes'] * 8 / self.duration for count in received
+                                if count])
+        losses = np.array([1.0 - count['packets'] / sent_packets for count in received
+                           if count and sent_packets])
+        summary = {'senders': len(self.senders), 'receivers': len(self.receivers),
+                   'reporting_receivers': len(throughputs), 'payload_size': self.payload_size,
+                   'duration': self.duration, 'sent_packets': sent_packets,
+                   'offered_bps': sent_bytes * 8 / self.duration}
+        if len(throughputs):
+            summary.update({'mean_received_bps': float(throughputs.mean()),
+                            'min_received_bps': float(throughputs.min())})
+        if len(losses):
+            summary.update({'mean_loss': float(np.clip(losses, 0, 1).mean()),
+                            'max_loss': float(np.clip(losses, 0, 1).max())})
+        return summary
+
+    def write_report(self, summary, report_file):
+        """
+        Writes the summary to a JSON file.
+
+        :param summary: Summary of the benchmark.
+        :param report_file: Path to the report file.
+        """
+        with open(report_file, 'w') as f:
+            json.dump(summary, f, indent=2)
+        LOG.info('OTA benchmark: %.1f Mbps offered, %s Mbps received on average (loss: %s), see %s',
+                 summary['offered_bps'] / 1e6,
+                 '%.1f' % (summary['mean_received_bps'] / 1e6)
+                 if 'mean_received_bps' in summary else '-',
+                 '%.2f%%' % (100 * summary['mean_loss']) if 'mean_loss' in summary else '-',
+                 report_file)
@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 
+import json
 from math import ceil, floor
 
 import matplotlib.pyplot as plt
+from emane_docker.addressing import AddressAllocator
 from emane_docker.constant import Constant
 
 
@@ -45,13 +47,19 @@ class Flow:
 
 
 class Report:
-    def __init__(self, num_nodes):
+    def __init__(self, num_nodes, address_allocator=None,
+                 config_directory=Constant.CP_CONFIG_DIRECTORY):
+        if address_allocator is None:
+            address_allocator = AddressAllocator()
         self.flows = dict()
         self.servers = list()
         self.clients = set()
         for node_id in range(1, num_nodes + 1):
-            with open('%s/node-%d/mgen.in' % (Constant.CP_CONFIG_DIRECTORY, node_id), 'r') as f:
+            with open('%s/node-%d/mgen.in' % (config_directory, node_id), 'r') as f:
                 for line in f:
+                    # The absolute start time of the schedule, written by older versions.
+                    if line.startswith('START'):
+                        continue
                     if 'LISTEN' in line:
                         self.servers.append(node_id)
                         break
@@ -59,7 +67,7 @@ class Report:
                     if 'ON' in line:
                         line = line.split()
                         flow_id = int(line[2])
-                        destination_id = int(line[7].split('/')[0].split('.')[-1])
+                        destination_id = address_allocator.nem_id(line[7].split('/')[0])
                         self.flows[flow_id] = Flow(flow_id=flow_id, start_time=float(line[0]),
                                                    flow_type=line[3], source=node_id,
                                                    destination=destination_id,
@@ -70,7 +78,7 @@ class Report:
         self.clients = list(self.clients)
 
         for node_id in self.servers:
-            with open('%s/node-%d/mgen.out' % (Constant.CP_CONFIG_DIRECTORY, node_id), 'r') as f:
+            with open('%s/node-%d/mgen.out' % (config_directory, node_id), 'r') as f:
                 for line in f:
                     if 'RECV' not in line:
                         continue
@@ -104,6 +112,69 @@ class Report:
             print(flow)
 
 
+class IperfReport:
+    """
+    Reports the results of the iperf3 workload, see IperfWorkload.
+
+    :param config_directory: Directory of the node configurations, containing iperf.json.
+    """
+
+    def __init__(self, config_directory=Constant.CP_CONFIG_DIRECTORY):
+        with open('%s/iperf.json' % config_directory, 'r') as f:
+            self.transfers = json.load(f)
+
+    def summary(self):
+        """
+        Summarizes the transfers.
+
+        :return: Dictionary of the number of transfers, the completed transfers and the total,
+            minimum and maximum throughputs in bits per second.
+        """
+        throughputs = [transfer['result']['bits_per_second'] for transfer in self.transfers
+                       if transfer['result'] is not None]
+        summary = {'transfers': len(self.transfers), 'completed': len(throughputs),
+                   'total_bits_per_second': sum(throughputs)}
+        if throughputs:
+            summary.update({'min_bits_per_second': min(throughputs),
+                            'max_bits_per_second': max(throughputs)})
+        return summary
+
+    def draw_figures(self):
+        self.print_transfers()
+
+        plt.figure()
+        for transfer in self.transfers:
+            if transfer['result'] is None:
+                continue
+            x = [end for _, end, _ in transfer['result']['intervals']]
+            y = [bits_per_second / 1e6 for _, _, bits_per_second in
+                 transfer['result']['intervals']]
+            plt.plot(x, y, label='node-%d -> node-%d' % (transfer['client'], transfer['server']))
+        plt.xlabel('Time (s)')
+        plt.ylabel('Throughput (Mbps)')
+        plt.legend()
+        plt.show()
+
+    def print_transfers(self):
+        for transfer in self.transfers:
+            result = transfer['result']
+            line = '%s node-%d -> node-%d:%d: ' % (transfer['protocol'].upper(), transfer['client'],
+                                                   transfer['server'], transfer['port'])
+            if result is None:
+                print(line + 'failed')
+                continue
+            line += '%.2f Mbps' % (result['bits_per_second'] / 1e6)
+            if 'lost_percent' in result:
+                line += ', loss: %.2f%%, jitter: %.3f ms' % (result['lost_percent'],
+                                                             result['jitter_ms'])
+            else:
+                line += ', retransmits: %d' % result['retransmits']
+            print(line)
+        summary = self.summary()
+        print('%d of %d transfers completed, %.2f Mbps in total' % (
+            summary['completed'], summary['transfers'], summary['total_bits_per_second'] / 1e6))
+
+
 if __name__ == "__main__":
     print('Please run it using emane-docker interface: `emane-docker --draw-results` '
           'after running an experiment')
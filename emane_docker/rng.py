@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+import hashlib
+
+import numpy as np
+
+from emane_docker.log import LOG
+
+
+def _spawn_key(name):
+    return int.from_bytes(hashlib.sha256(str(name).encode()).digest()[:16], 'big')
+
+
+class RandomStreams:
+    """
+    A tree of independent random number generator streams derived from a single experiment seed.
+    Each stream is identified by a path of names, e.g. ('traffic', 'node-1'), and it only depends
+    on the seed and the path. Streams can therefore be created in any order, thread or process,
+    and the generated schedules are reproducible across runs.
+
+    :param seed: The experiment seed. If it is not given, a random seed is drawn and logged so
+        that the experiment can be reproduced.
+    """
+
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+            LOG.info('Experiment seed is not configured, using seed %d', seed)
+        self.seed = int(seed)
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates the streams using the `seed` of the experiment configuration.
+
+        :param config: EMANE-Docker configuration.
+        :return: The random streams.
+        """
+        experiment = config.get('experiment', None) or {}
+        return cls(seed=experiment.get('seed', None))
+
+    def seed_sequence(self, *path):
+        return np.random.SeedSequence(self.seed, spawn_key=tuple(_spawn_key(name)
+                                                                 for name in path))
+
+    def generator(self, *path):
+        """
+        Returns a new generator of the stream identified by the given path.
+
+        :param path: Names identifying the stream, e.g. ('events', 0).
+        :return: A numpy random Generator.
+        """
+        return np.random.Generator(np.random.PCG64(self.seed_sequence(*path)))
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+
+import ipaddress
+
+import numpy as np
+
+from emane_docker.log import LOG
+
+# Hop distance of unreachable node pairs.
+UNREACHABLE = np.iinfo(np.uint16).max
+# Number of (source, edge) pairs visited at once by the batched breadth-first search.
+BFS_BATCH_SIZE = 2 ** 27
+
+
+def _pack(bits):
+    """
+    Packs the columns of a boolean matrix into 64-bit words.
+    """
+    packed = np.packbits(bits, axis=1, bitorder='little')
+    padding = -packed.shape[1] % 8
+    if padding:
+        packed = np.pad(packed, ((0, 0), (0, padding)))
+    return packed.view(np.uint64)
+
+
+def _unpack(words, num_columns):
+    return np.unpackbits(words.view(np.uint8), axis=1, count=num_columns,
+                         bitorder='little').astype(bool)
+
+
+def parse_routes(output, node_addresses):
+    """
+    Parses the host routes of `ip route` output. Routes to or via addresses that do not belong to
+    a node are ignored.
+
+    :param output: Output of `ip route`, as a string.
+    :param node_addresses: Dictionary from an integer IPv4 address to the index of its node.
+    :return: Dictionary from a destination node index to the set of next hop node indices.
+    """
+    routes = {}
+    for line in output.splitlines():
+        fields = line.split()
+        if not fields or fields[0] == 'default':
+            continue
+        destination, _, prefix_length = fields[0].partition('/')
+        if prefix_length not in ('', '32'):
+            continue
+        try:
+            destination = node_addresses.get(int(ipaddress.IPv4Address(destination)), None)
+            gateway = fields[fields.index('via') + 1] if 'via' in fields else None
+            next_hop = destination if gateway is None else node_addresses.get(
+                int(ipaddress.IPv4Address(gateway)), None)
+        except (ValueError, IndexError):
+            continue
+        if destination is not None and next_hop is not None:
+            routes.setdefault(destination, set()).add(next_hop)
+    return routes
+
+
+class RouteOracle:
+    """
+    Computes the routes each node should have for the current link state. Links are kept as a
+    sparse adjacency (compressed rows of neighbor indices), and the hop distances of all node
+    pairs are computed with a breadth-first search that expands a batch of sources at once with
+    numpy. When links change, only the sources whose shortest paths can change are searched
+    again. The distance matrix takes 2 bytes per node pair, e.g. 200 MB for 10k nodes.
+
+    :param nodes: The nodes of the topology.
+    :param links: The links of the topology, links that are not up are ignored.
+    """
+
+    def __init__(self, nodes, links):
+        self.nodes = sorted(nodes.values(), key=lambda node: node.index)
+        self.num_nodes = len(self.nodes)
+        self.edges = {link.key for link in links if link.status == link.UP}
+        self.indptr = None
+        self.indices = None
+        self.build_adjacency()
+        self.distances = self.search(np.arange(self.num_nodes))
+
+    def build_adjacency(self):
+        """
+        Builds the compressed rows of the adjacency, the neighbors of node i are
+        indices[indptr[i]:indptr[i + 1]].
+        """
+        edges = np.array(sorted(self.edges), dtype=np.int64).reshape(-1, 2)
+        sources = np.concatenate([edges[:, 0], edges[:, 1]])
+        targets = np.concatenate([edges[:, 1], edges[:, 0]])
+        order = np.lexsort((targets, sources))
+        self.indices = targets[order]
+        self.indptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=self.num_nodes), out=self.indptr[1:])
+
+    def neighbors(self, index):
+        return self.indices[self.indptr[index]:self.indptr[index + 1]]
+
+    def search(self, sources):
+        """
+        Computes the hop distances from the given sources to all nodes.
+
+        :param sources: Array of source node indices.
+        :return: Array of hop distances with shape (len(sources), number of nodes).
+        """
+        distances = np.full((self.num_nodes, len(sources)), UNREACHABLE, dtype=np.uint16)
+        degrees = np.diff(self.indptr)
+        connected = np.flatnonzero(degrees)
+        starts = self.indptr[:-1][connected]
+        batch = max(64, BFS_BATCH_SIZE // max(len(self.indices), 1) // 64 * 64)
+        # Nodes are rows and sources are bits of the columns, so that the frontiers of 64 sources
+        # are expanded with a single bitwise operation and neighbors are gathered as rows.
+        for first in range(0, len(sources), batch):
+            batch_sources = sources[first:first + batch]
+            frontier = np.zeros((self.num_nodes, len(batch_sources)), dtype=bool)
+            frontier[batch_sources, np.arange(len(batch_sources))] = True
+            batch_distances = distances[:, first:first + batch]
+            batch_distances[frontier] = 0
+            frontier = _pack(frontier)
+            visited = frontier.copy()
+            level = 0
+            while len(connected) and frontier.any():
+                level += 1
+                # A node is reached if any of its neighbors is in the frontier.
+                reached = np.zeros_like(frontier)
+                reached[connected] = np.bitwise_or.reduceat(frontier[self.indices], starts, axis=0)
+                reached &= ~visited
+                visited |= reached
+                batch_distances[_unpack(reached, len(batch_sources))] = level
+                frontier = reached
+        return distances.T
+
+    def update(self, links):
+        """
+        Updates the oracle to the current link states. Only the sources for which a changed link
+        is on a shortest path, or shortens a path, are searched again.
+
+        :param links: The links of the topology.
+        :return: Number of sources that are searched again.
+        """
+        edges = {link.key for link in links if link.status == link.UP}
+        removed = self.edges - edges
+        added = edges - self.edges
+        if not removed and not added:
+            return 0
+        self.edges = edges
+        self.build_adjacency()
+        affected = np.zeros(self.num_nodes, dtype=bool)
+        for node1, node2 in removed:
+            distances1 = self.distances[:, node1].astype(np.int32)
+            distances2 = self.distances[:, node2].astype(np.int32)
+            # The link is on a shortest path from a source if its ends are one hop apart. The
+            # distances change only if the farther end has no other neighbor one hop closer.
+            far = np.where(distances1 < distances2, node2, node1)
+            far_distances = np.maximum(distances1, distances2)
+            other_parents = np.zeros(self.num_nodes, dtype=np.int64)
+            for end in (node1, node2):
+                rows = far == end
+                parent_distances = far_distances[rows, np.newaxis] - 1
+                neighbor_distances = self.distances[np.ix_(rows, self.neighbors(end))]
+                other_parents[rows] = (neighbor_distances == parent_distances).sum(axis=1)
+            affected |= (np.abs(distances1 - distances2) == 1) & (other_parents == 0)
+        for node1, node2 in added:
+            # The link shortens a path from a source if its ends are more than one hop apart.
+            distances1 = self.distances[:, node1].astype(np.int32)
+            affected |= np.abs(distances1 - self.distances[:, node2]) > 1
+        sources = np.flatnonzero(affected)
+        if len(sources):
+            distances = self.search(sources)
+            self.distances[sources, :] = distances
+            self.distances[:, sources] = distances.T
+        LOG.debug('Route oracle is updated: %d links are added, %d are removed, %d of %d sources '
+                  'are searched again.', len(added), len(removed), len(sources), self.num_nodes)
+        return len(sources)
+
+    def next_hops(self, source):
+        """
+        Returns the expected next hops of a node to all destinations, every neighbor on a
+        shortest path is a valid (equal-cost) next hop.
+
+        :param source: Index of the node.
+        :return: Boolean array of shape (number of neighbors, number of nodes) and the neighbor
+            indices, entry (i, d) is set if neighbor i is a next hop to destination d.
+        """
+        neighbors = self.neighbors(source)
+        source_distances = self.distances[source].astype(np.int32)
+        valid = self.distances[neighbors].astype(np.int32) == source_distances - 1
+        valid &= (source_distances != UNREACHABLE) & (source_distances > 0)
+        return valid, neighbors
+
+    def expected_routes(self, source):
+        """
+        Returns the expected routes of a node.
+
+        :param source: Index of the node.
+        :return: Dictionary from a destination node index to the set of next hop node indices.
+        """
+        valid, neighbors = self.next_hops(source)
+        routes = {}
+        for row, column in zip(*np.nonzero(valid)):
+            routes.setdefault(int(column), set()).add(int(neighbors[row]))
+        return routes
+
+    def compare(self, source, routes):
+        """
+        Compares the routes of a node with the expected routes.
+
+        :param source: Index of the node.
+        :param routes: Dictionary from a destination node index to the set of next hop node
+            indices, e.g. parsed from the FIB with parse_routes.
+        :return: Dictionary of the numbers of correct, missing, wrong (via a next hop that is not
+            on a shortest path) and unexpected (to an unreachable destination) routes.
+        """
+        valid, neighbors = self.next_hops(source)
+        neighbor_rows = {int(neighbor): row for row, neighbor in enumerate(neighbors)}
+        expected = valid.any(axis=0)
+        result = {'correct': 0, 'missing': 0, 'wrong': 0, 'unexpected': 0}
+        for destination, next_hops in routes.items():
+            if destination == source:
+                continue
+            if not expected[destination]:
+                result['unexpected'] += 1
+            elif all(next_hop in neighbor_rows and valid[neighbor_rows[next_hop], destination]
+                     for next_hop in next_hops):
+                result['correct'] += 1
+            else:
+                result['wrong'] += 1
+        result['missing'] = int(expected.sum()) - result['correct'] - result['wrong']
+        return result
+
+    def compare_all(self, fibs):
+        """
+        Compares the routes of all nodes with the expected routes.
+
+        :param fibs: Dictionary from a node index to its routes, nodes without routes are skipped.
+        :return: Dictionary of the total numbers of correct, missing, wrong and unexpected routes,
+            and the names of the nodes with incorrect routes.
+        """
+        total = {'correct': 0, 'missing': 0, 'wrong': 0, 'unexpected': 0, 'incorrect_nodes': []}
+        for source, routes in sorted(fibs.items()):
+            result = self.compare(source, routes)
+            for key, value in result.items():
+                total[key] += value
+            if result['missing'] or result['wrong'] or result['unexpected']:
+                total['incorrect_nodes'].append(self.nodes[source].name)
+        return total
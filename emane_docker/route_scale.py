@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+
+import ipaddress
+import json
+from multiprocessing.pool import ThreadPool
+from time import monotonic, sleep
+
+import numpy as np
+
+from emane_docker.constant import Constant
+from emane_docker.log import LOG
+
+# Number of static routes formatted and written at once.
+WRITE_CHUNK_SIZE = 65536
+_OCTETS = [str(octet) for octet in range(256)]
+
+
+class RouteScale:
+    """
+    Generates the extra prefixes announced by each node for route-scale experiments. Each node
+    gets its own power-of-two block of the pool, so the prefixes of different nodes never overlap.
+    Aggregatable prefixes are consecutive and can be summarized by the block prefix, otherwise
+    every other prefix of the block is used so that no two prefixes can be aggregated.
+
+    :param routes: Number of prefixes per node.
+    :param prefix_length: Prefix length of each prefix.
+    :param aggregatable: If set, the prefixes of a node are consecutive.
+    :param pool: The pool the node blocks are allocated from.
+    :param measure: If set, the FIB install rate and the memory of the routing daemons are
+        measured after the nodes are started.
+    :param poll_interval: Time between two polls of the measurement, in seconds.
+    :param timeout: Nodes that do not install all routes within this time are reported as timed
+        out.
+    :param command: Command printing the number of installed routes and the memory of the
+        routing daemons, see parse_route_status.
+    """
+    DEFAULT_POOL = '16.0.0.0/4'
+
+    def __init__(self, routes=0, prefix_length=32, aggregatable=False, pool=DEFAULT_POOL,
+                 measure=False, poll_interval=1.0, timeout=300.0,
+                 command=Constant.ROUTE_SCALE_STATUS_COMMAND):
+        self.routes = int(routes)
+        self.prefix_length = int(prefix_length)
+        self.aggregatable = aggregatable
+        network = ipaddress.IPv4Network(pool)
+        if not network.prefixlen <= self.prefix_length <= 32:
+            raise ValueError('Prefix length %d does not fit into the route pool %s' % (
+                self.prefix_length, pool))
+        self.pool_base = int(network.network_address)
+        self.pool_size = network.num_addresses
+        self.step = (1 << (32 - self.prefix_length)) * (1 if aggregatable else 2)
+        # Each node block is a power of two, so that it is a single prefix.
+        self.block_size = 1 << max(self.routes * self.step - 1, 0).bit_length()
+        self.measure = measure
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.command = command
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates the route scale using the `route_scale` block of the configuration. The number of
+        routes defaults to the deprecated number_of_route_announcements.
+
+        :param config: EMANE-Docker configuration.
+        :return: The route scale.
+        """
+        route_scale = config.get('route_scale', None) or {}
+        return cls(routes=route_scale.get('routes',
+                                          config.get('number_of_route_announcements', 0)),
+                   prefix_length=route_scale.get('prefix_length', 32),
+                   aggregatable=route_scale.get('aggregatable', False),
+                   pool=route_scale.get('pool', cls.DEFAULT_POOL),
+                   measure=route_scale.get('measure', False),
+                   poll_interval=route_scale.get('poll_interval', 1.0),
+                   timeout=route_scale.get('timeout', 300.0),
+                   command=route_scale.get('command', Constant.ROUTE_SCALE_STATUS_COMMAND))
+
+    def node_block(self, node_index):
+        """
+        Returns the block of a node, which covers all prefixes of the node.
+
+        :param node_index: Index of the node.
+        :return: The block as an IPv4Network.
+        """
+        self.check(node_index)
+        return ipaddress.IPv4Network((self.pool_base + node_index * self.block_size,
+                                      32 - (self.block_size.bit_length() - 1)))
+
+    def check(self, node_index):
+        """
+        Raises ValueError if the block of a node does not fit into the pool.
+
+        :param node_index: Index of the node.
+        """
+        if (node_index + 1) * self.block_size > self.pool_size:
+            raise ValueError('Route pool is exhausted at node %d, %d routes per node need %d '
+                             'addresses' % (node_index, self.routes, self.block_size))
+
+    def prefixes(self, node_index, start=0, stop=None):
+        """
+        Returns the network addresses of the prefixes of a node.
+
+        :param node_index: Index of the node.
+        :param start: Index of the first prefix.
+        :param stop: Index after the last prefix, defaults to the number of routes.
+        :return: Array of integer network addresses.
+        """
+        self.check(node_index)
+        stop = self.routes if stop is None else min(stop, self.routes)
+        block_base = self.pool_base + node_index * self.block_size
+        return block_base + np.arange(start, stop, dtype=np.int64) * self.step
+
+    def write_static_routes(self, f, node_index, interface='eth0'):
+        """
+        Writes the prefixes of a node as Zebra static routes, in chunks so that the routes are
+        never kept in memory at once.
+
+        :param f: The Zebra configuration file.
+        :param node_index: Index of the node.
+        :param interface: The interface the routes point to.
+        """
+        suffix = '/%d %s\n' % (self.prefix_length, interface)
+        for start in range(0, self.routes, WRITE_CHUNK_SIZE):
+            addresses = self.prefixes(node_index, start, start + WRITE_CHUNK_SIZE)
+            octets = [(addresses >> shift) & 0xff for shift in (24, 16, 8, 0)]
+            f.write(''.join(['ip route %s.%s.%s.%s%s' % (
+                _OCTETS[a], _OCTETS[b], _OCTETS[c], _OCTETS[d], suffix)
+                for a, b, c, d in zip(*[octet.tolist() for octet in octets])]))
+
+    def measure_installation(self, nodes, exec_run):
+        """
+        Polls the nodes in parallel until each node has installed its routes, and records the time
+        the routes are installed and the peak memory of the routing daemons of each node.
+
+        :param nodes: The nodes of the topology.
+        :param exec_run: Function running a command in the container of a node, e.g.
+            EmaneTopology.exec_run.
+        :return: Dictionary from a node name to its number of installed routes, install time (None
+            if timed out), install rate in routes per second and daemon memory in KB.
+        """
+        nodes = sorted(nodes.values(), key=lambda node: node.index)
+        results = {node.name: {'routes': 0, 'install_time': None, 'install_rate': None,
+                               'memory': {}} for node in nodes}
+
+        def poll(node):
+            try:
+                result = exec_run(node, ['sh', '-c', self.command])
+            except Exception as exc:
+                LOG.debug('Route status of %s cannot be read: %s', node.name, exc)
+                return node, None, {}
+            return (node,) + parse_route_status(result.output.decode(errors='replace'))
+
+        threadpool = ThreadPool(min(len(nodes), Constant.NODE_POLL_THREADS) or 1)
+        start_time = monotonic()
+        pending = nodes
+        while pending:
+            poll_time = monotonic() - start_time
+            remaining = []
+            for node, num_routes, memory in threadpool.map(poll, pending):
+                result = results[node.name]
+                for daemon, rss in memory.items():
+                    result['memory'][daemon] = max(result['memory'].get(daemon, 0), rss)
+                if num_routes is not None:
+                    result['routes'] = num_routes
+                if num_routes is not None and num_routes >= self.routes:
+                    result['install_time'] = poll_time
+                    result['install_rate'] = self.routes / poll_time if poll_time else None
+                else:
+                    remaining.append(node)
+            pending = remaining
+            if pending and monotonic() - start_time >= self.timeout:
+                break
+            if pending:
+                sleep(self.poll_interval)
+        threadpool.close()
+        threadpool.join()
+        return results
+
+    def write_report(self, results, report_file):
+        """
+        Writes the measurement results and their summary to a JSON file.
+
+        :param results: Results of measure_installation.
+        :param report_file: Path to the report file.
+        """
+        times = np.array([result['install_time'] for result in results.values()
+                          if result['install_time'] is not None])
+        memory = {}
+        for result in results.values():
+            for daemon, rss in result['memory'].items():
+                memory[daemon] = max(memory.get(daemon, 0), rss)
+        summary = {'nodes': len(results), 'routes_per_node': self.routes,
+                   'installed': len(times), 'timed_out': len(results) - len(times),
+                   'max_memory': memory}
+        if len(times):
+            summary.update({'max_install_time': float(times.max()),
+                            'min_install_rate': self.routes / float(times.max())
+                            if times.max() else None})
+        with open(report_file, 'w') as f:
+            json.dump({'summary': summary, 'nodes': results}, f, indent=2)
+        LOG.info('%d of %d nodes installed %d routes (slowest: %s s), see %s', len(times),
+                 len(results), self.routes, '%.1f' % times.max() if len(times) else '-',
+                 report_file)
+
+
+def parse_route_status(output):
+    """
+    Parses the output of Constant.ROUTE_SCALE_STATUS_COMMAND, the number of installed routes
+    followed by `<rss in KB> <daemon>` lines.
+
+    :param output: The output, as a string.
+    :return: Number of installed routes and a dictionary from a daemon to its RSS in KB.
+    """
+    lines = output.split('\n')
+    try:
+        num_routes = int(lines[0].strip())
+    except (IndexError, ValueError):
+        return None, {}
+    memory = {}
+    for line in lines[1:]:
+        fields = line.split()
+        if len(fields) == 2 and fields[0].isdigit():
+            memory[fields[1]] = memory.get(fields[1], 0) + int(fields[0])
+    return num_routes, memory
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+
+from copy import deepcopy
+from functools import partial
+import ipaddress
+from itertools import product
+from multiprocessing import Pool
+import os
+import shutil
+
+import yaml
+
+from emane_docker.constant import Constant
+from emane_docker.log import LOG
+from emane_docker.log import flush as log_flush
+from emane_docker.metrics import REGISTRY
+from emane_docker.topology import EmaneTopology
+from emane_docker.util import load_yaml, mkdir_p
+
+
+def set_parameter(config, path, value):
+    """
+    Sets a parameter of the configuration, missing blocks are created.
+
+    :param config: EMANE-Docker configuration.
+    :param path: Dotted path of the parameter, e.g. experiment.duration.
+    :param value: The new value.
+    """
+    keys = path.split('.')
+    for key in keys[:-1]:
+        if not isinstance(config.get(key, None), dict):
+            config[key] = {}
+        config = config[key]
+    config[keys[-1]] = value
+
+
+def count_nodes(topology_file):
+    """
+    Counts the nodes of a topology file without loading the topology.
+
+    :param topology_file: Path to the topology file.
+    :return: Number of nodes.
+    """
+    with open(topology_file, 'r') as f:
+        topology = load_yaml(f)
+    return sum(len(nodes) for nodes in topology['nodes'].values())
+
+
+def run_point(point, warm=False, results_directory=None):
+    """
+    Deploys the topology of a sweep point in its namespace, runs the experiment and removes the
+    topology. It runs in a separate process.
+
+    :param point: Tuple of the swept parameters and the configuration of the point.
+    :param warm: If set, the containers are kept running for the next point of the namespace.
+    :param results_directory: If set, the node configurations, outputs and controller metrics are
+        copied to this directory after the experiment.
+    :return: Summary of the run.
+    """
+    parameters, config = point
+    namespace = config['namespace']
+    summary = {'namespace': namespace, 'parameters': parameters, 'status': 'failed'}
+    emane_topology = None
+    # Worker processes run several points, each point has its own controller metrics.
+    REGISTRY.reset()
+    try:
+        emane_topology = EmaneTopology(config=config)
+        with open('%s/%s/config.yaml' % (Constant.NAMESPACE_DIRECTORY, namespace), 'w') as f:
+            yaml.safe_dump(config, f, default_flow_style=False)
+        LOG.info('Sweep point %s is started: %s', namespace, parameters)
+        # A failed start removes the nodes, so some of the containers are missing.
+        if emane_topology.start() == 0 and len(emane_topology.containers) == len(
+                emane_topology.nodes):
+            summary['status'] = 'done'
+            if emane_topology.controller.experiment_aborted.is_set():
+                summary['status'] = 'aborted'
+        if results_directory is not None:
+            if os.path.exists(results_directory):
+                shutil.rmtree(results_directory)
+            shutil.copytree(emane_topology.config_directory, results_directory)
+            summary['results'] = results_directory
+    except (Exception, SystemExit) as exc:
+        LOG.error('Sweep point %s failed: %s', namespace, exc)
+    finally:
+        if emane_topology is not None:
+            if warm:
+                emane_topology.release()
+            else:
+                emane_topology.stop()
+    metrics_directory = results_directory or '%s/%s' % (Constant.NAMESPACE_DIRECTORY, namespace)
+    mkdir_p(metrics_directory)
+    REGISTRY.dump('%s/metrics.json' % metrics_directory)
+    LOG.info('Sweep point %s is %s.', namespace, summary['status'])
+    # Worker processes are terminated at the end of the sweep, without writing queued logs.
+    log_flush()
+    return summary
+
+
+def run_lane(points, warm=True):
+    """
+    Runs sweep points one after another in the same namespace. The outputs of each point are kept
+    in the results directory of the namespace, since the next point clears them.
+
+    :param points: The points of the lane.
+    :param warm: If set, each point reuses the warm containers of the previous point and the
+        containers are removed after the last point, otherwise after each point.
+    :return: List of run summaries.
+    """
+    summaries = []
+    for index, point in enumerate(points):
+        results_directory = '%s/%s/results/%d' % (Constant.NAMESPACE_DIRECTORY,
+                                                  point[1]['namespace'], index)
+        summaries.append(run_point(point, warm=warm and index < len(points) - 1,
+                                   results_directory=results_directory))
+    return summaries
+
+
+class SweepRunner:
+    """
+    Runs an experiment for each point of a parameter grid, see the sweep block of
+    config.default.yaml. Each parallel run has its own namespace, which has its own Docker network,
+    container name prefix, Telegraf port range and configuration directory, so that several points
+    can run in parallel on the same host. The points of a namespace run one after another.
+
+    :param config: EMANE-Docker configuration.
+    """
+    DEFAULT_SUBNET_POOL = '10.128.0.0/16'
+    DEFAULT_SUBNET_PREFIX_LENGTH = 24
+    DEFAULT_PORT_STRIDE = 1000
+
+    def __init__(self, config):
+        sweep = config.get('sweep', None) or {}
+        self.config = config
+        self.parameters = sweep.get('parameters', None) or {}
+        self.max_parallel_runs = sweep.get('max_parallel_runs', 1)
+        self.max_containers = sweep.get('max_containers', None)
+        self.port_stride = sweep.get('port_stride', self.DEFAULT_PORT_STRIDE)
+        self.subnet_pool = ipaddress.IPv4Network(sweep.get('subnet_pool',
+                                                           self.DEFAULT_SUBNET_POOL))
+        self.subnet_prefix_length = sweep.get('subnet_prefix_length',
+                                              self.DEFAULT_SUBNET_PREFIX_LENGTH)
+
+    def expand(self, slots=None):
+        """
+        Expands the parameter grid, the cartesian product of the swept values.
+
+        :param slots: If set, points share this many namespaces round-robin, otherwise each point
+            has its own namespace.
+        :return: List of (swept parameters, configuration) tuples, one per point.
+        """
+        paths = list(self.parameters)
+        port_base = self.config.get('telegraf_port_base', Constant.TELEGRAF_PORT_BASE)
+        subnets = self.subnet_pool.subnets(new_prefix=self.subnet_prefix_length)
+        namespace_subnets = []
+        points = []
+        for index, values in enumerate(product(*[self.parameters[path] for path in paths])):
+            config = deepcopy(self.config)
+            config.pop('sweep', None)
+            # Only the sweep runner could serve the metrics, points dump their metrics instead.
+            if isinstance(config.get('metrics', None), dict):
+                config['metrics'].pop('port', None)
+            for path, value in zip(paths, values):
+                set_parameter(config, path, value)
+            slot = index if slots is None else index % slots
+            if slot == len(namespace_subnets):
+                namespace_subnets.append(next(subnets, None))
+            if namespace_subnets[slot] is None:
+                raise ValueError('Subnet pool %s is exhausted after %d namespaces' % (
+                    self.subnet_pool, slot))
+            config.update(namespace='sw%d' % slot, no_cli=True,
+                          docker_subnet=str(namespace_subnets[slot]),
+                          telegraf_port_base=port_base + slot * self.port_stride)
+            points.append((dict(zip(paths, values)), config))
+        return points
+
+    def parallel_runs(self, points):
+        """
+        Returns the number of points that can run in parallel within the host budget.
+
+        :param points: The expanded points.
+        :return: Number of parallel runs, at least 1.
+        """
+        num_nodes = max(count_nodes(config['topology_file']) for _, config in points)
+        if num_nodes > self.port_stride:
+            raise ValueError('Port stride %d is smaller than the number of nodes (%d)' % (
+                self.port_stride, num_nodes))
+        # The network, the broadcast and the gateway addresses are not assigned to containers.
+        if num_nodes > 2 ** (32 - self.subnet_prefix_length) - 3:
+            raise ValueError('A /%d subnet cannot hold %d nodes' % (
+                self.subnet_prefix_length, num_nodes))
+        parallel_runs = min(self.max_parallel_runs, len(points))
+        if self.max_containers is not None:
+            parallel_runs = min(parallel_runs, self.max_containers // num_nodes)
+        if parallel_runs < 1:
+            LOG.warning('A single point (%d nodes) exceeds the container budget (%d), points are '
+                        'run one at a time.', num_nodes, self.max_containers)
+            parallel_runs = 1
+        port_base = self.config.get('telegraf_port_base', Constant.TELEGRAF_PORT_BASE)
+        last_port = port_base + (parallel_runs - 1) * self.port_stride + num_nodes - 1
+        if last_port > Constant.MAX_PORT:
+            raise ValueError('Telegraf ports of %d parallel runs exceed %d (last port %d)' % (
+                parallel_runs, Constant.MAX_PORT, last_port))
+        return parallel_runs
+
+    def run(self):
+        """
+        Runs all points of the sweep and writes a summary to the namespace directory.
+
+        :return: 0 if all points are done, -1 otherwise.
+        """
+        try:
+            parallel_runs = self.parallel_runs(self.expand(slots=self.max_parallel_runs))
+            # Each namespace runs its points back to back, only parallel_runs namespaces are used.
+            points = self.expand(slots=parallel_runs)
+        except (OSError, ValueError) as exc:
+            LOG.error('Sweep cannot be started: %s', exc)
+            return -1
+        for _, config in points:
+            mkdir_p('%s/%s' % (Constant.NAMESPACE_DIRECTORY, config['namespace']))
+
+        LOG.info('Running %d sweep points, %d in parallel.', len(points), parallel_runs)
+        lanes = [points[slot::parallel_runs] for slot in range(parallel_runs)]
+        lane_runner = partial(run_lane, warm=self.config.get('warm_pool', False))
+        with Pool(processes=parallel_runs) as pool:
+            summaries = [summary for lane in pool.map(lane_runner, lanes, chunksize=1)
+                         for summary in lane]
+
+        summary_file = '%s/sweep.yaml' % Constant.NAMESPACE_DIRECTORY
+        with open(summary_file, 'w') as f:
+            yaml.safe_dump(summaries, f, default_flow_style=False)
+        failed = [summary['namespace'] for summary in summaries if summary['status'] != 'done']
+        if failed:
+            LOG.error('Sweep points %s failed or were aborted, see %s.', ', '.join(failed),
+                      summary_file)
+            return -1
+        LOG.info('All sweep points are done, see %s.', summary_file)
+        return 0
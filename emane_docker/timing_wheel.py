@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+from itertools import count
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel. Each level has 2^slot_bits slots, a slot of level L covers
+    2^(slot_bits * L) ticks. An item is inserted at the lowest level that covers its delay, and
+    moved one level down when the lower wheel wraps around. Scheduling and expiring an item cost
+    O(1), independently of the number of scheduled items.
+
+    :param resolution: Length of a tick, in seconds. Items of the same tick expire together.
+    :param slot_bits: Number of bits of the slot index, each level has 2^slot_bits slots.
+    :param levels: Number of levels, items can be scheduled up to 2^(slot_bits * levels) ticks
+        ahead.
+    """
+
+    def __init__(self, resolution, slot_bits=8, levels=4):
+        self.resolution = float(resolution)
+        self.slot_bits = slot_bits
+        self.mask = (1 << slot_bits) - 1
+        self.wheels = [[[] for _ in range(1 << slot_bits)] for _ in range(levels)]
+        self.max_delay = 1 << (slot_bits * levels)
+        # The next tick to expire.
+        self.current_tick = 0
+        self.size = 0
+        # Items of the same time expire in the order they are scheduled.
+        self.sequence = count()
+
+    def __len__(self):
+        return self.size
+
+    def tick(self, event_time):
+        return int(event_time / self.resolution)
+
+    def schedule(self, event_time, item):
+        """
+        Schedules an item. Items scheduled in the past expire at the next tick.
+
+        :param event_time: Expiry time of the item, in seconds.
+        :param item: The item.
+        """
+        self._insert((event_time, next(self.sequence), item),
+                     max(self.tick(event_time), self.current_tick))
+        self.size += 1
+
+    def _insert(self, entry, tick):
+        delay = tick - self.current_tick
+        if delay >= self.max_delay:
+            raise ValueError('Item at %.6f is beyond the range of the timing wheel' % entry[0])
+        level = 0
+        while delay >> (self.slot_bits * (level + 1)):
+            level += 1
+        self.wheels[level][(tick >> (self.slot_bits * level)) & self.mask].append(entry)
+
+    def _cascade(self):
+        """
+        Moves the items of the higher level slots that start at the current tick one level down.
+        """
+        level = 1
+        while level < len(self.wheels) and not self.current_tick & (
+                (1 << (self.slot_bits * level)) - 1):
+            level += 1
+        for level in range(level - 1, 0, -1):
+            index = (self.current_tick >> (self.slot_bits * level)) & self.mask
+            entries, self.wheels[level][index] = self.wheels[level][index], []
+            for entry in entries:
+                self._insert(entry, max(self.tick(entry[0]), self.current_tick))
+
+    def expire(self, until_time):
+        """
+        Expires the items up to the given time, tick by tick. Items of a tick are yielded in time
+        order. Items can be scheduled while iterating, they expire at the next tick at the
+        earliest.
+
+        :param until_time: Time of the last tick to expire, in seconds.
+        :return: Generator of (time, item) tuples.
+        """
+        until_tick = self.tick(until_time)
+        while self.current_tick <= until_tick:
+            if not self.size:
+                self.current_tick = until_tick + 1
+                break
+            index = self.current_tick & self.mask
+            entries, self.wheels[0][index] = self.wheels[0][index], []
+            self.current_tick += 1
+            if not self.current_tick & self.mask:
+                self._cascade()
+            entries.sort()
+            for event_time, _, item in entries:
+                self.size -= 1
+                yield event_time, item
@@ -2,184 +2,141 @@
 
 
 from copy import deepcopy
-from functools import total_ordering
+import hashlib
 import os
 import shutil
 import sys
-from signal import signal, SIGINT
-from time import sleep
-import tarfile
+from signal import signal, SIGINT, SIGTERM
+from time import perf_counter, sleep
 from multiprocessing.pool import ThreadPool
+from operator import attrgetter
+import tempfile
 
 from jinja2 import Environment, FileSystemLoader
 from redis import Redis
-import yaml
 
 import docker
 
+from emane_docker.addressing import AddressAllocator
+from emane_docker.config_bundle import ConfigBundle, ConfigBundleWriter, pack_directory
+from emane_docker.config_bundle import pack_files, unpack_file
 from emane_docker.constant import Constant
-from emane_docker.event_generator import EventGenerator
+from emane_docker.controller import ExperimentController
+from emane_docker.cp_config import write_cp_config, write_zebra_config
+from emane_docker.eel import pathloss_line, write_eel
+from emane_docker.emane_network import EmaneNetwork, run_host_command
+from emane_docker.helper_script import HelperStep, helper_script, parse_helper_output
 from emane_docker.log import LOG
-from emane_docker.util import mkdir_p
-from emane_docker.traffic_generator import TrafficGenerator
+from emane_docker.metrics import EXEC_SECONDS, REGISTRY
+from emane_docker.monitoring import aggregator_targets, controller_targets, node_targets
+from emane_docker.monitoring import remove_targets, write_targets
+from emane_docker.rng import RandomStreams
+from emane_docker.route_scale import RouteScale
+from emane_docker.topology_cache import load_topology_cache, save_topology_cache
+from emane_docker.topology_cache import topology_cache_file
+from emane_docker.topology_model import Link, Node
+from emane_docker.util import load_yaml, mkdir_p, sync_directory
+
+CONFIG_GENERATION_SECONDS = REGISTRY.histogram(
+    'emane_docker_config_generation_seconds', 'Time to generate the configurations of a node')
+CONTAINER_START_SECONDS = REGISTRY.histogram(
+    'emane_docker_container_start_seconds', 'Time to start the container of a node')
+CONTAINER_START_FAILURES = REGISTRY.counter(
+    'emane_docker_container_start_failures_total', 'Number of containers failed to start')
+HELPER_STEP_SECONDS = REGISTRY.histogram('emane_docker_helper_step_seconds',
+                                         'Duration of the helper startup steps in the containers')
+HELPER_STEP_FAILURES = REGISTRY.counter('emane_docker_helper_step_failures_total',
+                                        'Number of helper startup steps that failed')
 
 
-class Node:
-    """
-    It contains information related to each "emulated" node. Each node runs as a separate
-    Docker container. The names node and node are used interchangeably throughout this project.
-
-    :param domain: The domain that node belongs to.
-    :param node: The node dictionary, see the configuration examples for details.
+class EmaneTopology:
     """
+    Deploys and controls an EMANE topology.
 
-    def __init__(self, domain, node, index, as_id):
-        """
-        Initializes a node instance.
-
-        """
-        self.domain = domain
-        self.name = node['name']
-        # later support auto id assignment
-        self.index = index
-        self.as_id = as_id
-        self.id = node['name']
-        self.neighbors = node['neighbors']
-        self.is_border = node['is_border']
-        self.bootstrapfile = node[
-            'bootstrapfile'] if 'bootstrapfile' in node else '/bootstrap/start.sh'
-        self.port_offset = 0
-        self.links = []
-
-    def __str__(self):
-        return 'Name: %s, Neighbors: %s' % (self.name, ', '.join(self.neighbors))
-
-    def __eq__(self, other):
-        return other.id == self.id
-
-
-@total_ordering
-class Link:
+    :param config: EMANE-Docker configuration, see config.default.yaml for details.
+    :param docker_client: Docker client used to manage containers, defaults to the client
+        configured by the environment.
+    :param redis_class: Redis client class used to connect to the nodes.
     """
-    Contains the information related to a link between two nodes (nodes).
-
-    :param node1:
-    :param node2:
-    :param mask1:
-    :param mask2:
-    :param lid:
-    :param ip1:
-    :param ip2:
-    """
-    LINK_COUNT = 0
-    UP = 1
-    DOWN = 0
-
-    def __init__(self, node1, node2, mask1=24, mask2=24, lid=None, ip1=None, ip2=None):
-        self.node1 = node1
-        self.node2 = node2
-        if lid is None:
-            self.id = Link.LINK_COUNT
-        else:
-            self.id = lid
-        Link.LINK_COUNT += 1
-        self.node1_portid = None
-        self.node2_portid = None
-        if ip1 is None or ip2 is None:
-            self._init_ipv4_addresses()
-            self.mask1 = mask1
-            self.mask2 = mask2
-        else:
-            if '/' in ip1:
-                self.node1_ipv4, self.mask1 = ip1.split('/')[0], int(ip1.split('/')[1])
-            else:
-                self.node1_ipv4 = ip1
-                self.mask1 = mask1
-            if '/' in ip2:
-                self.node2_ipv4, self.mask2 = ip2.split('/')[0], int(ip2.split('/')[1])
-            else:
-                self.node2_ipv4 = ip2
-                self.mask2 = mask2
-
-        self.node1.links.append(self)
-        self.node2.links.append(self)
-        self.status = Link.UP
-
-    def swap_nodes(self):
-        tmp = self.node1
-        self.node1 = self.node2
-        self.node2 = tmp
-        tmp = self.node1_portid
-        self.node1_portid = self.node2_portid
-        self.node2_portid = tmp
-        tmp = self.mask1
-        self.mask1 = self.mask2
-        self.mask2 = tmp
-        tmp = self.node1_ipv4
-        self.node1_ipv4 = self.node2_ipv4
-        self.node2_ipv4 = tmp
-
-    def _init_ipv4_addresses(self):
-        try:
-            node1 = int(self.node1.name)
-            node2 = int(self.node2.name)
-            # special mode where node names directly shows the ip addresses
-            if 1 <= node1 <= 255 and 1 <= node2 <= 255:
-                if node1 <= node2:
-                    self.node1_ipv4 = '1.{}.{}.1'.format(node1, node2)
-                    self.node2_ipv4 = '1.{}.{}.2'.format(node1, node2)
-                else:
-                    self.node1_ipv4 = '1.{}.{}.2'.format(node2, node1)
-                    self.node2_ipv4 = '1.{}.{}.1'.format(node2, node1)
-
-            else:
-                raise Exception
-        except Exception:
-            if self.node1.name <= self.node2.name:
-                self.node1_ipv4 = '1.{}.{}.1'.format(self.id // 255 + 1, self.id % 255 + 1)
-                self.node2_ipv4 = '1.{}.{}.2'.format(self.id // 255 + 1, self.id % 255 + 1)
-            else:
-                self.node1_ipv4 = '1.{}.{}.2'.format(self.id // 255 + 1, self.id % 255 + 1)
-                self.node2_ipv4 = '1.{}.{}.1'.format(self.id // 255 + 1, self.id % 255 + 1)
 
-    def set_port_ids(self, node1_portid, node2_portid):
-        self.node1_portid = node1_portid
-        self.node2_portid = node2_portid
-
-    def contains(self, node1, node2=None):
-        return (node1.name == self.node1.name and node2.name == self.node2.name) or (
-            node2.name == self.node1.name and node1.name == self.node2.name)
-
-    def __eq__(self, other):
-        return (self.node1.name, self.node2.name) == (other.node1.name, other.node2.name)
-
-    def __ne__(self, other):
-        return self != other
-
-    def __lt__(self, other):
-        return (self.node1.name, self.node2.name) < (other.node1.name, other.node2.name)
-
-
-class EmaneTopology:
-    def __init__(self, config):
-        file_loader = FileSystemLoader('templates/emane')
+    def __init__(self, config, docker_client=None, redis_class=Redis):
+        file_loader = FileSystemLoader(['templates/emane', Constant.TEMPLATE_DIRECTORY])
         self.jinja_env = Environment(loader=file_loader)
-        self.docker_client = docker.from_env()
+        self.docker_client = docker_client if docker_client is not None else docker.from_env()
+        self.redis_class = redis_class
         self.config = config
         self.nodes = {}
         self.links = []
         self.containers = {}
         self.redis_clients = []
         self.platform = self.config.get('platform', None)
-        self.emane_interface = 'emanenode0'
-        self.event_generator = None
-        self.traffic_generator = None
+        self.address_allocator = AddressAllocator.from_config(self.config)
+        # Experiments with different namespaces are isolated from each other, they have their own
+        # Docker network, container names, Telegraf ports and configuration directories.
+        self.namespace = self.config.get('namespace', None) or ''
+        if self.namespace:
+            self.container_prefix = '%s-' % self.namespace
+            self.emane_bridge = '%s-emane0' % self.namespace
+            namespace_directory = '%s/%s' % (Constant.NAMESPACE_DIRECTORY, self.namespace)
+            self.config_directory = '%s/configs' % namespace_directory
+            self.event_service_directory = '%s/eventservice' % namespace_directory
+            self.event_service_pidfile = '/var/run/emaneeventservice-%s.pid' % self.namespace
+        else:
+            self.container_prefix = ''
+            self.emane_bridge = 'emanenode0'
+            self.config_directory = Constant.CP_CONFIG_DIRECTORY
+            self.event_service_directory = Constant.EVENT_SERVICE_DIRECTORY
+            self.event_service_pidfile = Constant.EVENT_SERVICE_PIDFILE
+        if len(self.emane_bridge) > Constant.MAX_INTERFACE_NAME_LENGTH:
+            LOG.error('Namespace %s is too long, the bridge name %s exceeds %d characters.',
+                      self.namespace, self.emane_bridge, Constant.MAX_INTERFACE_NAME_LENGTH)
+            sys.exit(-1)
+        # Docker network of the nodes, the bridge is the host interface of this network.
+        self.emane_interface = self.container_prefix + 'emanenode0'
+        docker_subnet = self.config.get('docker_subnet', Constant.DOCKER_SUBNET)
+        try:
+            self.emane_network = EmaneNetwork.from_config(self.config, self.docker_client,
+                                                          name=self.emane_interface,
+                                                          bridge=self.emane_bridge,
+                                                          subnet=docker_subnet)
+        except ValueError as exc:
+            LOG.error('Network configuration is invalid: %s', exc)
+            sys.exit(-1)
+        self.telegraf_port_base = self.config.get('telegraf_port_base',
+                                                  Constant.TELEGRAF_PORT_BASE)
+        # Telegraf metrics are either scraped from each node or sent to a central aggregator.
+        self.monitoring = self.config.get('monitoring', None) or {}
+        self.monitoring_mode = self.monitoring.get('mode', Constant.MONITORING_PER_NODE)
+        self.aggregator_name = self.container_prefix + 'telegraf-aggregator'
+        self.aggregator_config_file = os.path.abspath('%s/%saggregator.conf' % (
+            Constant.MONITORING_DIRECTORY, self.container_prefix))
+        self.targets_file = '%s/targets/%s.json' % (Constant.MONITORING_DIRECTORY,
+                                                    self.namespace or 'default')
+        # The node configurations are either bind-mounted or streamed into the containers.
+        self.config_delivery = self.config.get('config_delivery', Constant.CONFIG_DELIVERY_BIND)
+        if self.config_delivery not in Constant.SUPPORTED_CONFIG_DELIVERIES:
+            LOG.error('Configuration delivery %s is not supported, supported deliveries are %s',
+                      self.config_delivery, Constant.SUPPORTED_CONFIG_DELIVERIES)
+            sys.exit(-1)
+        self.bundle_file = '%s/%s' % (self.config_directory, Constant.CONFIG_BUNDLE_FILE)
+        self.config_bundle = None
+        # Warm containers are kept running between experiments and reused by the next start.
+        self.warm_pool = self.config.get('warm_pool', False)
+        self.random_streams = RandomStreams.from_config(self.config)
+        self.scenario_file = os.path.abspath('%s/scenario.eel' % self.event_service_directory)
         # self.pool = ThreadPool()
 
-        # Docker related variables
-        self.port_ids = None
-
         self.load_topology()
+        # Extra prefixes announced by each node, every node must fit into the route pool.
+        try:
+            self.route_scale = RouteScale.from_config(self.config)
+            if self.route_scale.routes:
+                self.route_scale.check(len(self.nodes) - 1)
+        except ValueError as exc:
+            LOG.error('Route scale configuration is invalid: %s', exc)
+            sys.exit(-1)
+        # Runs the experiments and the CLI on the deployed topology.
+        self.controller = ExperimentController(self)
 
     def generate_configs(self):
         config_cps = []
@@ -192,219 +149,303 @@ class EmaneTopology:
             if control_plane != Constant.SDN_CP:
                 config_cps.append(control_plane)
 
-        if os.path.exists(Constant.CP_CONFIG_DIRECTORY):
-            shutil.rmtree(Constant.CP_CONFIG_DIRECTORY)
+        if self.config_delivery == Constant.CONFIG_DELIVERY_BUNDLE:
+            self.generate_config_bundle(config_cps)
+            LOG.info('Configuring initial scenario file using the topology information')
+            self.generate_emane_scenario_eel()
+            return 0
+
+        # Warm containers keep the configuration directories mounted, so the configurations are
+        # generated aside and only the changed files are copied.
+        config_directory = self.config_directory
+        if self.warm_pool:
+            config_directory += '.staging'
+        if os.path.exists(config_directory):
+            shutil.rmtree(config_directory)
 
         LOG.info('Generating configuration files for %s CPs', ', '.join(config_cps))
         for node in self.nodes.values():
-            config_path = '%s/%s' % (Constant.CP_CONFIG_DIRECTORY, node.name)
-            mkdir_p(config_path)
-            self.generate_zebra_config(config_path=config_path, node=node)
-            for control_plane in config_cps:
-                self.generate_cp_config(config_path=config_path, node=node,
-                                        control_plane=control_plane)
-            # TODO enable defining NEMs in configuration!
-            emane_configuration = deepcopy(self.config['emane_configuration'])
-            emane_configuration['platform'] = {
-                'ip_address': '10.100.0.%s' % (node.index + 1),
-                'transport': 'transvirtual',
-                'nem_id': (node.index + 1)
-            }
-            self.generate_emane_config(config_path=config_path, node=node,
-                                       emane_configuration=emane_configuration)
+            self.generate_node_configs(config_path='%s/%s' % (config_directory, node.name),
+                                       node=node, config_cps=config_cps)
+        if self.warm_pool:
+            changed = sync_directory(config_directory, self.config_directory)
+            shutil.rmtree(config_directory)
+            LOG.info('%d configuration files are changed.', len(changed))
 
         LOG.info('Configuring initial scenario file using the topology information')
         self.generate_emane_scenario_eel()
         return 0
 
-    def generate_zebra_config(self, config_path, node):
-        # Zebra (Quagga) Configuration
-        with open('%s/zebra.conf' % config_path, 'a') as f:
-            f.write('hostname Router\npassword zebra\nenable password zebra')
-            for i in range(self.config.get('number_of_route_announcements', 0)):
-                f.write('ip route 10.%d.%d.%d/32 eth0\n' % (node.index, int(i / 255), int(i % 255)))
-
-    def generate_cp_config(self, config_path, node, control_plane):
-        """
-        Generates control plane configurations. User can override the default values by specifying
-        it at EMANE-Docker configuration file. See the config.default.yaml for details.
-
-        :param config_path: Configuration path
-        :param node: The node
-        :param control_plane: The CP plane (OLSR, OLSRv2, OSPF, BGP, IS-IS and RIP)
-        """
-        if control_plane == Constant.OLSR_CP:
-            with open('%s/olsrd.conf' % Constant.TEMPLATE_DIRECTORY, 'r') as f:
-                olsrd_conf_template = f.read()
-
-            with open('%s/olsrd.conf' % config_path, 'a') as f:
-                f.write(olsrd_conf_template)
-                ifaces = '\nInterface '
-                for i in range(1):
-                    ifaces += '"emane{}" '.format(i)
-                f.write(ifaces + '{}\n')
-        elif control_plane == Constant.OLSRv2_CP:
-            with open('%s/olsrd2.conf' % config_path, 'a') as f:
-                # TODO: Remove
-                # '[global]\n\tfork 1\n\tplugin mpr\n\tplugin olsrv2\n\tplugin olsrv2info\n'
-                # TODO: END
-                # lans = ""
-                org = '10.100.0.%d/24' % (node.index + 1)
-                for interface_id, _ in enumerate(['emane0']):
-                    # org = link.node1_ipv4 if node == link.node1 else link.node2_ipv4
-                    config = '[interface=emane%d]\n' % interface_id
-                    config = config + '\thello_interval 0.5\n\thello_validity 2.5\n\t'
-                    config = config + 'ifaddr_filter default_accept\n\t'
-                    # config = config + 'ifaddr_filter {}.0/24\n\t'.format(link.node1_ipv4[:-2])
-                    # config = config + 'ifaddr_filter 1.0.0.0/8\n\t'
-                    config = config + 'bindto default_reject\n'
-                    config = config + '\tbindto %s' % org
-                    # config = config + '\tbindto %s.0/24\n\n' % link.node1_ipv4[:-2]
-                    # lans = lans + 'lan {}.0/24'.format(link.node1_ipv4[:-2]) + '\n\t'
-                    f.write(config)
-                    # break
-                # f.write('[interface=lo]\n')
-                f.write('[olsrv2]\n\toriginator %s\n\tnhdp_routable true\n\t' % org)
-                f.write('tc_interval 1.0\n\ttc_validity 10.0\n')
-        elif control_plane == Constant.OSPF_CP:
-            with open('%s/ospfd.conf' % Constant.TEMPLATE_DIRECTORY) as f:
-                ospfd_conf_template = f.read()
-
-            with open('%s/ospfd.conf' % config_path, 'a') as f:
-                f.write(ospfd_conf_template)
-                networks = ''
-                for interface_id, link in enumerate(node.links):
-                    interface_ip = link.node1_ipv4 if link.node1 == node else link.node2_ipv4
-                    mask = link.mask1 if link.node1 == node else link.mask2
-                    f.write('interface i%d\n' % interface_id)
-                    f.write('\tip ospf dead-interval minimal hello-multiplier 10\n')
-                    f.write('\tip ospf retransmit-interval 1\n')
-                    # '\tip ospf hello-interval 1\n\tip ospf dead-interval 10\n\t
-                    # ip ospf retransmit-interval 3\n')
-                    # f.write('\tip ospf cost 50\n')
-                    networks += '\tnetwork %s/%d area 0\n' % (interface_ip, mask)
-                f.write('router ospf\n')
-                f.write('\ttimers throttle lsa all 0\n\ttimers lsa arrival 0\n')
-                f.write('\tredistribute static\n\tredistribute kernel\n')
-                f.write(networks + '\n')
-        elif control_plane == Constant.BGP_CP:
-            with open('%s/bgpd.conf' % Constant.TEMPLATE_DIRECTORY) as f:
-                bgpd_conf_template = f.read()
-
-            with open('%s/bgpd.conf' % config_path, 'a') as f:
-                f.write(bgpd_conf_template)
-                f.write('router bgp %s\n' % node.as_id)
-                f.write('\tneighbor provider_ip update-source %s\n' % node.as_id)
-                f.write('\tredistribute static\n\tredistribute kernel\n')
-                networks = ''
-                neighbors = ''
-                for interface_id, link in enumerate(node.links):
-                    if link.node1 == node:
-                        interface_ip = link.node1_ipv4
-                        neighbor_ip = link.node2_ipv4
-                        neighbor_as = link.node2.as_id
-                        mask = link.mask1
-                    else:
-                        interface_ip = link.node2_ipv4
-                        neighbor_ip = link.node1_ipv4
-                        neighbor_as = link.node1.as_id
-                        mask = link.mask2
-                    # interface_ip = link.node1_ipv4 if link.node1 == node else link.node2_ipv4
-                    networks += '\tnetwork %s/%d\n' % (interface_ip, mask)
-                    neighbors += '\tneighbor %s remote-as %s\n' % (neighbor_ip, neighbor_as)
-                    neighbors += '\tneighbor %s advertisement-interval 0\n' % neighbor_ip
-                    neighbors += '\tneighbor %s peer-group upstream\n' % neighbor_ip
-                f.write('%s\n%s' % (networks, neighbors))
-        elif control_plane == Constant.ISIS_CP:
-            with open('%s/isisd.conf' % Constant.TEMPLATE_DIRECTORY) as f:
-                isisd_conf_template = f.read()
-
-            with open('%s/isisd.conf' % config_path, 'a') as f:
-                f.write(isisd_conf_template)
-                networks = ''
-                for interface_id, link in enumerate(node.links):
-                    interface_ip = link.node1_ipv4 if link.node1 == node else link.node2_ipv4
-                    mask = link.mask1 if link.node1 == node else link.mask2
-                    f.write('Interface i%d\n' % interface_id)
-                    f.write('\tip isis hello-interval 1\n')
-
-                f.write('router isis IS\n')
-                f.write('isis net 47.0001.1720.1700.0%03d.00' % (node.index + 2))
-
-        elif control_plane == Constant.RIP_CP:
-            with open('%s/ripd.conf' % Constant.TEMPLATE_DIRECTORY) as f:
-                ripd_conf_template = f.read()
-
-            with open('%s/ripd.conf' % config_path, 'a') as f:
-                f.write(ripd_conf_template)
-                networks = ''
-                for interface_id, link in enumerate(node.links):
-                    interface_ip = link.node1_ipv4 if link.node1 == node else link.node2_ipv4
-                    mask = link.mask1 if link.node1 == node else link.mask2
-                    # f.write('Interface i%d\n' % interface_id)
-                    # f.write('\tip isis hello-interval 1\n')
-
-                    networks += '\tnetwork %s/%d\n' % (interface_ip, mask)
-                f.write('router rip\n')
-                f.write(networks)
-
-                # f.write('\ttimers throttle lsa all 0\n\ttimers lsa arrival 0\n')
-                # f.write('\tredistribute static\n\tredistribute kernel\n' + networks)
-                # f.write(networks + '\n')
+    def generate_config_bundle(self, config_cps):
+        """
+        Compiles the configurations of all nodes into a single bundle, one member per node. The
+        configurations of each node are generated in a temporary directory, packed and removed,
+        so only the bundle is left in the configuration directory.
 
-        else:
-            LOG.error('Unknown control plane type %s', control_plane)
+        :param config_cps: The CPs that have configurations.
+        """
+        if os.path.exists(self.config_directory):
+            shutil.rmtree(self.config_directory)
+        mkdir_p(self.config_directory)
+        LOG.info('Compiling configuration files for %s CPs into %s', ', '.join(config_cps),
+                 self.bundle_file)
+        with tempfile.TemporaryDirectory() as staging_directory, \
+                ConfigBundleWriter(self.bundle_file) as bundle:
+            for node in self.nodes.values():
+                config_path = '%s/%s' % (staging_directory, node.name)
+                self.generate_node_configs(config_path=config_path, node=node,
+                                           config_cps=config_cps)
+                bundle.add(node.name, pack_directory(config_path))
+                shutil.rmtree(config_path)
+        self.config_bundle = ConfigBundle(self.bundle_file)
+        LOG.info('%d node configurations are compiled (%d bytes).', len(self.config_bundle),
+                 os.path.getsize(self.bundle_file))
+
+    def put_node_configs(self, node, container=None):
+        """
+        Streams the configurations of a node from the bundle into its container.
+
+        :param node: The node.
+        :param container: The container, defaults to the running container of the node.
+        """
+        if self.config_bundle is None:
+            self.config_bundle = ConfigBundle(self.bundle_file)
+        container = container if container is not None else self.containers[node.name]
+        container.put_archive(Constant.CONTAINER_CONFIG_DIRECTORY,
+                              self.config_bundle.read(node.name))
+
+    def collect_outputs(self, names=('mgen.out',)):
+        """
+        Copies the output files of the nodes from the containers to the configuration directory.
+        The outputs are written to the bind-mounted directories already, so this is needed only
+        if the configurations are delivered as a bundle. It is called at the end of the experiment
+        and before the containers are removed or reused.
+
+        :param names: Names of the files in the configuration directory of the containers.
+        :return: Number of copied files.
+        """
+        if self.config_delivery != Constant.CONFIG_DELIVERY_BUNDLE:
+            return 0
+
+        def collect(node):
+            copied = 0
+            for name in names:
+                try:
+                    chunks, _ = self.containers[node.name].get_archive(
+                        '%s/%s' % (Constant.CONTAINER_CONFIG_DIRECTORY, name))
+                    data = unpack_file(chunks, name)
+                except Exception as exc:
+                    LOG.debug('%s cannot be copied from %s: %s', name, node.name, exc)
+                    continue
+                mkdir_p('%s/%s' % (self.config_directory, node.name))
+                with open('%s/%s/%s' % (self.config_directory, node.name, name), 'wb') as f:
+                    f.write(data)
+                copied += 1
+            return copied
+
+        threadpool = ThreadPool()
+        copied = sum(threadpool.map(collect, [node for node in self.nodes.values()
+                                              if node.name in self.containers]))
+        threadpool.close()
+        threadpool.join()
+        LOG.info('%d output files are copied from the containers.', copied)
+        return copied
+
+    @CONFIG_GENERATION_SECONDS.time()
+    def generate_node_configs(self, config_path, node, config_cps):
+        """
+        Generates the Zebra, CP and EMANE configurations of a node.
+
+        :param config_path: Configuration path of the node.
+        :param node: The node.
+        :param config_cps: The CPs that have configurations.
+        """
+        mkdir_p(config_path)
+        write_zebra_config(config_path=config_path, node=node, route_scale=self.route_scale)
+        for control_plane in config_cps:
+            write_cp_config(config_path=config_path, node=node, control_plane=control_plane,
+                            nem_prefix_length=self.address_allocator.nem_prefix_length)
+        # TODO enable defining NEMs in configuration!
+        emane_configuration = deepcopy(self.config['emane_configuration'])
+        emane_configuration['platform'] = {
+            'ip_address': node.nem_ipv4,
+            'mask': self.address_allocator.nem_netmask,
+            'transport': 'transvirtual',
+            'nem_id': node.nem_id
+        }
+        self.generate_emane_config(config_path=config_path, node=node,
+                                   emane_configuration=emane_configuration)
 
     def load_topology(self):
         """
         Loads the topology file specified by the user (either in configuration file or as a command
-        line parameter.
+        line parameter. The parsed nodes and links are cached with the hash of the file, so that
+        later invocations skip parsing and link construction.
 
         """
-        topology = None
         topology_file = self.config.get('topology_file', None)
         if not topology_file:
             LOG.error('Please specify a topology file')
             sys.exit(-1)
         try:
-            with open(topology_file, 'r') as f:
-                topology = yaml.load(f)
-                all_nodes = []
-                domains = dict()
-                # Put all nodes in a single list
-                for domain in topology['nodes']:
-                    all_nodes.extend(topology['nodes'][domain])
-                    domains.update({node['name']: domain for node in topology['nodes'][domain]})
-
-                for index, node in enumerate(sorted(all_nodes, key=lambda x: x['name'])):
-                    as_id = node['as_number'] if 'as_number' in node else 1000 + index
-                    self.nodes[node['name']] = Node(domain=domains[node['name']], node=node,
-                                                    index=index, as_id=as_id)
-                for node in self.nodes.values():
-                    for neighbor_name in node.neighbors:
-                        exists = False
-                        neighbor_node = self.nodes[neighbor_name]
-                        for link in self.links:
-                            if link.contains(node, neighbor_node):
-                                exists = True
-                        if not exists:
-                            self.links.append(Link(node, neighbor_node))
-                for i, link in enumerate(self.links):
-                    if link.node1.index > link.node2.index:
-                        self.links[i].swap_nodes()
-                        # self.links[i] = Link(link.node2, link.node1)
-
-                self.links = sorted(self.links)
-                for i, link in enumerate(self.links):
-                    link.id = i
-                LOG.info('Topology (%s) with %d nodes and %d links is loaded.', topology_file,
-                         len(self.nodes), len(self.links))
-
+            with open(topology_file, 'rb') as f:
+                data = f.read()
+            cache_file = topology_cache_file(self.config, topology_file)
+            cached = load_topology_cache(cache_file, data) if cache_file is not None else None
+            if cached is not None:
+                self.nodes, self.links = cached
+                LOG.debug('Topology (%s) is loaded from the cache %s', topology_file, cache_file)
+            else:
+                self.parse_topology(load_yaml(data))
+                if cache_file is not None:
+                    save_topology_cache(cache_file, data, self.nodes, self.links)
+            self.assign_addresses()
+            LOG.info('Topology (%s) with %d nodes and %d links is loaded.', topology_file,
+                     len(self.nodes), len(self.links))
+
+        except ValueError as e:
+            LOG.error('Cannot assign addresses to the topology at %s: %s', topology_file, e)
+            sys.exit(-1)
         except Exception as e:
             LOG.error('Incorrect topology file at %s', topology_file)
             LOG.debug('Exception: %s', e)
             sys.exit(-1)
 
+    def parse_topology(self, topology):
+        """
+        Creates the nodes and the links of a parsed topology file.
+
+        :param topology: The topology dictionary.
+        """
+        all_nodes = []
+        domains = dict()
+        # Put all nodes in a single list
+        for domain in topology['nodes']:
+            all_nodes.extend(topology['nodes'][domain])
+            domains.update({node['name']: domain for node in topology['nodes'][domain]})
+
+        for index, node in enumerate(sorted(all_nodes, key=lambda x: x['name'])):
+            as_id = node['as_number'] if 'as_number' in node else 1000 + index
+            self.nodes[node['name']] = Node(domain=domains[node['name']], node=node,
+                                            index=index, as_id=as_id)
+        # Each link is kept once, with its lower-index node as node1.
+        link_keys = set()
+        for node in self.nodes.values():
+            for neighbor_name in node.neighbors:
+                neighbor_node = self.nodes[neighbor_name]
+                if node.index < neighbor_node.index:
+                    node1, node2 = node, neighbor_node
+                else:
+                    node1, node2 = neighbor_node, node
+                if (node1.index, node2.index) not in link_keys:
+                    link_keys.add((node1.index, node2.index))
+                    self.links.append(Link(node1, node2))
+
+    def assign_addresses(self):
+        """
+        Numbers the links in the order of their node indices and assigns the link and the NEM
+        addresses from the address pools.
+        """
+        self.links.sort(key=attrgetter('key'))
+        numeric_names = self.address_allocator.uses_numeric_names(self.nodes)
+        for i, link in enumerate(self.links):
+            link.id = i
+            self.assign_link_addresses(link, numeric_names)
+        for node in self.nodes.values():
+            node.nem_ipv4 = self.address_allocator.nem_address(node.nem_id)
+
+    def assign_link_addresses(self, link, numeric_names):
+        """
+        Assigns the addresses of a link, by its id or by the names of its nodes.
+
+        :param link: The link, its id must be set.
+        :param numeric_names: If set, the link is addressed by the numeric names of its nodes.
+        """
+        if numeric_names:
+            ip1, ip2 = self.address_allocator.numeric_link_address_ints(
+                link.node1.name, link.node2.name)
+            link.set_ipv4_addresses(ip1, ip2, AddressAllocator.NUMERIC_LINK_PREFIX_LENGTH)
+        else:
+            ip1, ip2 = self.address_allocator.link_address_ints(link.id)
+            link.set_ipv4_addresses(ip1, ip2, self.address_allocator.link_prefix_length)
+
+    def diff_topology(self, topology_file):
+        """
+        Computes the link changes from the running topology to a new topology file. The new
+        topology must have the same nodes, only the links may change.
+
+        :param topology_file: Path to the new topology file.
+        :return: Tuple of the new neighbors of each node, the (node, node) pairs of the added links
+            and the removed links. Pairs and links have the lower-index node first.
+        """
+        with open(topology_file, 'rb') as f:
+            topology = load_yaml(f.read())
+        neighbors = {node['name']: node['neighbors'] for domain_nodes in topology['nodes'].values()
+                     for node in domain_nodes}
+        if set(neighbors) != set(self.nodes):
+            raise ValueError('nodes %s are added or removed, the topology must be restarted' % (
+                ', '.join(sorted(set(neighbors) ^ set(self.nodes)))))
+        keys = set()
+        for name, node_neighbors in neighbors.items():
+            node = self.nodes[name]
+            for neighbor_name in node_neighbors:
+                neighbor = self.nodes[neighbor_name]
+                keys.add((min(node.index, neighbor.index), max(node.index, neighbor.index)))
+        up_links = {link.key: link for link in self.links if link.status == Link.UP}
+        nodes_by_index = {node.index: node for node in self.nodes.values()}
+        added = [(nodes_by_index[key[0]], nodes_by_index[key[1]])
+                 for key in sorted(keys - set(up_links))]
+        removed = [up_links[key] for key in sorted(set(up_links) - keys)]
+        return neighbors, added, removed
+
+    def apply_topology(self, topology_file, publisher=None):
+        """
+        Applies a new topology file to the running topology without restarting the containers.
+        Removed links are marked down and added links are brought up, only the pathloss between
+        the NEMs of the changed links is published to the event service. Links are never deleted,
+        so the ids and addresses of the existing links do not change.
+
+        :param topology_file: Path to the new topology file.
+        :param publisher: Event publisher, a new one is created if it is not given.
+        :return: 0 on success, -1 otherwise.
+        """
+        try:
+            neighbors, added, removed = self.diff_topology(topology_file)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            LOG.error('Topology %s cannot be applied: %s', topology_file, e)
+            return -1
+
+        links = {link.key: link for link in self.links}
+        numeric_names = self.address_allocator.uses_numeric_names(self.nodes)
+        changes = []
+        for node1, node2 in added:
+            link = links.get((node1.index, node2.index), None)
+            if link is None:
+                link = Link(node1, node2)
+                link.id = len(self.links)
+                self.assign_link_addresses(link, numeric_names)
+                self.links.append(link)
+            link.status = Link.UP
+            changes.append((link, Constant.PATHLOSS_CONNECTED))
+        for link in removed:
+            link.status = Link.DOWN
+            changes.append((link, Constant.PATHLOSS_DISCONNECTED))
+        updates = {}
+        for link, pathloss in changes:
+            updates.setdefault(link.node1.nem_id, []).append((link.node2.nem_id, pathloss))
+            updates.setdefault(link.node2.nem_id, []).append((link.node1.nem_id, pathloss))
+        for name, node_neighbors in neighbors.items():
+            self.nodes[name].neighbors = node_neighbors
+
+        if updates:
+            if publisher is None:
+                publisher = self.controller.create_event_publisher()
+            publisher.publish_pathloss(updates)
+        self.config['topology_file'] = topology_file
+        LOG.info('Topology %s is applied: %d links are added and %d links are removed.',
+                 topology_file, len(added), len(removed))
+        return 0
+
     def start(self):
         """
         Starts EMANE-Docker
@@ -415,12 +456,24 @@ class EmaneTopology:
         # Generate configuration files for all CPs and all nodes
         self.generate_configs()
         if self.platform == Constant.PLATFORM_DOCKER:
-            self.create_emane_interface()
-            # Start containers using a thread pool
-            self.run_threadpool(method=self.start_docker_container, params=self.nodes.values())
+            if self.generate_monitoring_configs() != 0:
+                return -1
+            if self.warm_pool:
+                self.run_threadpool(method=self.adopt_warm_container, params=self.nodes.values())
+                LOG.info('%d of %d nodes are reused from the warm pool.', len(self.containers),
+                         len(self.nodes))
+            warm_nodes = [node for node in self.nodes.values() if node.name in self.containers]
+            cold_nodes = [node for node in self.nodes.values() if node.name not in self.containers]
+            if not warm_nodes and self.create_emane_interface() != 0:
+                return -1
+            if self.monitoring_mode == Constant.MONITORING_AGGREGATOR:
+                self.start_telegraf_aggregator()
+            if cold_nodes:
+                # Start containers using a thread pool
+                self.run_threadpool(method=self.start_docker_container, params=cold_nodes)
 
-            # Wait for REDIS to start in each container
-            sleep(Constant.REDIS_WAIT_TIME)
+                # Wait for REDIS to start in each container
+                sleep(self.config.get('redis_wait_time', Constant.REDIS_WAIT_TIME))
 
             if len(self.containers) == len(self.nodes):
                 LOG.info('All nodes are started.')
@@ -436,18 +489,26 @@ class EmaneTopology:
             #     self.configure_container_link(link)
 
             LOG.info('Starting helper programs in containers...')
-            self.run_threadpool(method=self.start_container_helpers, params=self.nodes.values())
+            self.run_threadpool(method=self.reset_docker_container, params=warm_nodes)
+            self.run_threadpool(method=self.start_container_helpers, params=cold_nodes)
+            if self.route_scale.measure and self.route_scale.routes:
+                self.controller.measure_route_installation()
+            if ((self.config.get('network', None) or {}).get('benchmark', None) or {}).get(
+                    'enabled', False):
+                self.controller.run_ota_benchmark()
 
             LOG.info('Starting EMANE Event Service...')
+            if warm_nodes:
+                self.stop_emane_eventservice()
             self.start_emane_eventservice()
 
             if self.config.get('no_cli', False):
                 LOG.info('Skipping EMANE-Docker Controller CLI (--no-cli is set).')
-                self.run_experiment(wait=True)
+                self.controller.run_experiment(wait=True)
 
             else:
                 LOG.info('Staring EMANE-Docker Controller CLI...')
-                self.start_cli()
+                self.controller.start_cli()
         else:
             LOG.error('Platform %s is not supported, supported platforms are %s', self.platform,
                       Constant.SUPPORTED_PLATFORMS)
@@ -466,12 +527,18 @@ class EmaneTopology:
         LOG.info('Stopping all nodes...')
 
         if self.platform == Constant.PLATFORM_DOCKER:
+            self.controller.stop_live_collector()
+            # The outputs of bundled configurations are lost with the containers.
+            self.collect_outputs()
             # Start containers using a thread pool
             threadpool = ThreadPool()
             threadpool.map(self.stop_docker_container, self.nodes.values())
             threadpool.close()
             threadpool.join()
 
+            if self.monitoring_mode == Constant.MONITORING_AGGREGATOR:
+                self.stop_telegraf_aggregator()
+            remove_targets(self.targets_file)
             self.remove_emane_interface()
 
         else:
@@ -486,6 +553,22 @@ class EmaneTopology:
             sys.exit(0)
         return 0
 
+    def release(self):
+        """
+        Ends an experiment without removing the nodes. If the warm pool is enabled, the containers
+        keep running and the next start reuses them, otherwise the nodes are stopped.
+
+        :return: 0 on success, -1 if the platform is not supported.
+        """
+        if not self.warm_pool:
+            return self.stop()
+        self.controller.stop_live_collector()
+        # The next start clears the outputs of the warm containers.
+        self.collect_outputs()
+        self.stop_emane_eventservice()
+        LOG.info('%d nodes are kept running in the warm pool.', len(self.containers))
+        return 0
+
     def run_threadpool(self, method, params):
         """
         Runs a threadpool for given methods and params. Used when starting/stopping/configuring
@@ -499,155 +582,296 @@ class EmaneTopology:
         threadpool.close()
         threadpool.join()
 
-    def start_cli(self):
+    def connect_redis_clients(self):
         """
-        Starts EMANE-Docker CLI.
+        Connects to the Redis server running in each node.
 
+        :return: 0 on success, -1 if the platform is not supported.
         """
         # Initialize connection method to nodes depending on the platform
         if self.platform == Constant.PLATFORM_DOCKER:
-            for container in self.containers:
-                ip = str(self.docker_client.containers.get(container).attrs['NetworkSettings'][
-                    'Networks']['emanenode0']['IPAddress'])
-                self.redis_clients.append(Redis(host=ip, port=6379, db=0))
-
+            for name in self.containers:
+                container = self.docker_client.containers.get(self.container_name(self.nodes[name]))
+                ip = str(container.attrs['NetworkSettings']['Networks'][self.emane_interface][
+                    'IPAddress'])
+                self.redis_clients.append(self.redis_class(host=ip, port=6379, db=0))
         else:
             LOG.error('Platform %s is not supported, supported platforms are %s', self.platform,
                       Constant.SUPPORTED_PLATFORMS)
             return -1
-        while True:
-            command = input('emane-docker> ')
-            # TODO: update commands START
-            if command == 'quit':
-                break
-            if command == 'start-experiment':
-                LOG.info('Experiment will be initialized now... '
-                         'CLI will not be accessible meanwhile.')
-                self.run_experiment(wait=False)
-            elif command == 'start-event-generator':
-                self.start_event_generator()
-            elif command == 'start-traffic-generator':
-                self.start_traffic_generator()
-            # if command == 'init':
-            #     for r in self.redis_clients:
-            #         r.publish('cmd', 'init')
-            elif command in ('help', '?'):
-                print('Available commands are:\n%s' % '\n'.join(['help', 'quit']))
-            # TODO: update commands! END
-            else:
-                print('%s is not a valid command. Type `help` to see available commands.' % command)
+        return 0
+
+    def container_name(self, node):
+        """
+        Returns the name of the container running the node, prefixed by the namespace.
+
+        :param node: The node.
+        :return: The container name.
+        """
+        return self.container_prefix + node.name
 
-        return self.stop()
+    def exec_run(self, node, cmd, **kwargs):
+        """
+        Runs a command in the container of a node, the latency of the call is measured.
+
+        :param node: The node.
+        :param cmd: The command, either a string or a list of arguments.
+        :param kwargs: Keyword arguments of the exec call, e.g. detach.
+        :return: The result of the exec call.
+        """
+        command = cmd.split()[0] if isinstance(cmd, str) else cmd[0]
+        with EXEC_SECONDS.time(command=command):
+            return self.containers[node.name].exec_run(cmd, **kwargs)
+
+    def container_digest(self, node):
+        """
+        Returns the digest of the parameters a node container is started with. A warm container is
+        reused only if it was started with the same parameters.
+
+        :param node: The node.
+        :return: The hex digest.
+        """
+        spec = (self.config['docker_image'], self.emane_interface, node.nem_id, node.bootstrapfile,
+                self.telegraf_port_base + node.index, self.monitoring_mode, os.getcwd(),
+                self.config_directory, self.config_delivery)
+        return hashlib.sha256(repr(spec).encode()).hexdigest()
+
+    def adopt_warm_container(self, node):
+        """
+        Reuses the running container of a node if it is up to date. Outdated containers are
+        removed, so that they are started again.
+
+        :param node: The node.
+        :return: The container, or None if the node has no reusable container.
+        """
+        try:
+            container = self.docker_client.containers.get(self.container_name(node))
+        except docker.errors.NotFound:
+            return None
+        except Exception as exc:
+            LOG.debug('Container of %s cannot be inspected: %s', node.name, exc)
+            return None
+        labels = container.attrs.get('Config', {}).get('Labels', None) or {}
+        if container.status == 'running' and \
+                labels.get(Constant.CONTAINER_DIGEST_LABEL, None) == self.container_digest(node):
+            self.containers[node.name] = container
+            return container
+        LOG.info('The %s container is outdated, it will be started again.', node.name)
+        self.stop_docker_container(node)
+        return None
+
+    def reset_docker_container(self, node):
+        """
+        Prepares a warm container for the next experiment. EMANE and the routing daemons are
+        restarted in place with the new configurations and the MGEN output is cleared.
+
+        :param node: The node.
+        """
+        LOG.debug('Resetting node %s', node.name)
+        if self.config_delivery == Constant.CONFIG_DELIVERY_BUNDLE:
+            self.put_node_configs(node)
+        self.start_container_helpers(node, reset=True)
 
     def start_docker_container(self, node):
         LOG.info('Starting node: %s', node.name)
-        # This the port running Telegraf
-        port = 20000 + node.index
+        start_time = perf_counter()
+        # This the port running Telegraf, it is published only if the nodes are scraped directly.
+        port = self.telegraf_port_base + node.index
+        ports = {'{}/tcp'.format(port): port}
+        if self.monitoring_mode == Constant.MONITORING_AGGREGATOR:
+            ports = None
         try:
             binding_path = os.getcwd() + '/container_helpers'
-            config_path = binding_path + '/configs/' + node.name
-            container = self.docker_client.containers.run(self.config['docker_image'], detach=True,
-                                                          network=self.emane_interface,
-                                                          mac_address='02:00:%02x:01:00:01' % (
-                                                              node.index + 1),
-                                                          cap_add=['sys_nice', 'NET_ADMIN'],
-                                                          name=node.name,
-                                                          privileged=True,
-                                                          tty=True,
-                                                          hostname=node.name,
-                                                          ports={'{}/tcp'.format(port): port},
-                                                          volumes={
-                                                              config_path: {
-                                                                  'bind': '/etc/quagga'},
-                                                              binding_path + '/bootstrap': {
-                                                                  'bind': '/bootstrap'},
-                                                              binding_path + '/fpm': {
-                                                                  'bind': '/fpm'},
-                                                              '/lib/modules': {
-                                                                  'bind': '/lib/modules',
-                                                                  'mode': 'ro'},
-                                                              '/dev/net/tun': {
-                                                                  'bind': '/dev/net/tun'},
-                                                              '/var/run/docker.sock': {
-                                                                  'bind': '/var/run/docker.sock'}},
-                                                          command=node.bootstrapfile)
+            config_path = '%s/%s/%s' % (os.getcwd(), self.config_directory, node.name)
+            volumes = {binding_path + '/bootstrap': {'bind': '/bootstrap'},
+                       binding_path + '/fpm': {'bind': '/fpm'},
+                       '/lib/modules': {'bind': '/lib/modules', 'mode': 'ro'},
+                       '/dev/net/tun': {'bind': '/dev/net/tun'},
+                       '/var/run/docker.sock': {'bind': '/var/run/docker.sock'}}
+            if self.config_delivery == Constant.CONFIG_DELIVERY_BIND:
+                volumes[config_path] = {'bind': Constant.CONTAINER_CONFIG_DIRECTORY}
+            run_kwargs = dict(network=self.emane_interface,
+                              mac_address='02:%02x:%02x:01:00:01' % (node.nem_id >> 8,
+                                                                     node.nem_id & 0xff),
+                              cap_add=['sys_nice', 'NET_ADMIN'], name=self.container_name(node),
+                              privileged=True, tty=True, hostname=node.name,
+                              labels={Constant.CONTAINER_DIGEST_LABEL: self.container_digest(node)},
+                              ports=ports, volumes=volumes, command=node.bootstrapfile)
+            if self.config_delivery == Constant.CONFIG_DELIVERY_BUNDLE:
+                # The configurations are streamed into the created container, so that they are in
+                # place when the bootstrap script starts Zebra.
+                container = self.docker_client.containers.create(self.config['docker_image'],
+                                                                 **run_kwargs)
+                self.put_node_configs(node, container=container)
+                container.start()
+            else:
+                container = self.docker_client.containers.run(self.config['docker_image'],
+                                                              detach=True, **run_kwargs)
 
             self.containers[node.name] = container
             # Create telegraf configuration and copy to the container.
-            port = 20000 + node.index
-            telegraf_conf_path = os.getcwd() + '/templates/telegraf.conf'
-            with open(telegraf_conf_path, 'r') as src, open(
-                    telegraf_conf_path + str(node.index), 'w') as dst:
-                for line in src:
-                    # Replace port number
-                    if '20000' in line:
-                        dst.write(line.replace('20000', str(port)))
-                    else:
-                        dst.write(line)
-            self.container_cp(node, telegraf_conf_path + str(node.index),
-                              '/etc/telegraf/telegraf.conf')
-            os.remove(telegraf_conf_path + str(node.index))
-            # Start telegraf
-            container.exec_run('telegraf &', detach=True)
-
+            aggregator = None
+            if self.monitoring_mode == Constant.MONITORING_AGGREGATOR:
+                aggregator = '%s:%d' % (self.aggregator_name, Constant.TELEGRAF_AGGREGATOR_PORT)
+            telegraf_conf = self.jinja_env.get_template('telegraf.conf').render(
+                node=node.name, domain=node.domain, namespace=self.namespace, port=port,
+                aggregator=aggregator)
+            container.put_archive('/etc/telegraf', pack_files({
+                'telegraf.conf': telegraf_conf.encode()}))
         except FileNotFoundError:
+            CONTAINER_START_FAILURES.inc()
             return LOG.error('%s container cannot be started, is Docker daemon running?',
                              node.name)
         except Exception as exc:
+            CONTAINER_START_FAILURES.inc()
             LOG.exception(exc)
             LOG.error('%s container cannot be started.', node.name)
             return -1
+        CONTAINER_START_SECONDS.observe(perf_counter() - start_time)
         LOG.info('Node %s is started.', node.name)
         return 0
 
     def stop_docker_container(self, node):
         try:
-            self.docker_client.containers.get(node.name).remove(force=True)
+            self.docker_client.containers.get(self.container_name(node)).remove(force=True)
         except Exception as exc:
             LOG.exception(exc)
             LOG.error('%s container cannot be stopped.', node.name)
         LOG.debug('The %s container is removed.', node.name)
         return 0
 
-    def start_container_helpers(self, node):
-        self.start_emane_on_node(node)
-        LOG.debug('Configuring default rules for %s', node.name)
-        # self.containers[node.name].exec_run('/bootstrap/default.py', detach=True)
-        if Constant.OLSR_CP in self.config['control_planes']:
-            LOG.debug('Starting OLSR at node %s', node.name)
-            # self.containers[node.name].exec_run('/bootstrap/olsr.py', detach=True)
-            self.containers[node.name].exec_run('olsrd -f /etc/quagga/olsrd.conf', detach=True)
-        elif Constant.OLSRv2_CP in self.config['control_planes']:
-            LOG.debug('Starting OLSRv2 at node %s', node.name)
-            # self.containers[node.name].exec_run('/bootstrap/olsr2.py', detach=True)
-            self.containers[node.name].exec_run('olsrd2_static -l /etc/quagga/olsrd2.conf',
-                                                detach=True)
+    def generate_monitoring_configs(self):
+        """
+        Writes the Prometheus configuration and the scrape targets of the experiment. Prometheus
+        reads the targets of all namespaces using file-based service discovery, so it does not
+        need to be restarted when experiments start or stop.
+
+        :return: 0 on success, -1 if the monitoring mode is not supported.
+        """
+        if self.monitoring_mode not in Constant.SUPPORTED_MONITORING_MODES:
+            LOG.error('Monitoring mode %s is not supported, supported modes are %s',
+                      self.monitoring_mode, Constant.SUPPORTED_MONITORING_MODES)
+            return -1
+        scrape_host = self.monitoring.get('scrape_host', 'localhost')
+        mkdir_p(Constant.MONITORING_DIRECTORY)
+        self.jinja_renderer('%s/prometheus.yml' % Constant.MONITORING_DIRECTORY, 'prometheus.yml',
+                            {'target_files': 'targets/*.json'}, mode='w')
+        if self.monitoring_mode == Constant.MONITORING_AGGREGATOR:
+            self.jinja_renderer(self.aggregator_config_file, 'telegraf-aggregator.conf', {
+                'name': self.aggregator_name, 'listen_port': Constant.TELEGRAF_AGGREGATOR_PORT,
+                'port': self.telegraf_port_base}, mode='w')
+            targets = aggregator_targets(host=scrape_host, port=self.telegraf_port_base,
+                                         namespace=self.namespace)
+        else:
+            targets = node_targets(nodes=self.nodes, host=scrape_host,
+                                   port_base=self.telegraf_port_base, namespace=self.namespace)
+        metrics_port = (self.config.get('metrics', None) or {}).get('port', None)
+        if metrics_port is not None:
+            targets += controller_targets(host=scrape_host, port=metrics_port,
+                                          namespace=self.namespace)
+        write_targets(self.targets_file, targets)
+        return 0
+
+    def start_telegraf_aggregator(self):
+        """
+        Starts the Telegraf aggregator on the Docker network of the nodes, only its Prometheus port
+        is published. A running aggregator is reused.
+
+        :return: 0 on success, -1 otherwise.
+        """
+        try:
+            if self.docker_client.containers.get(self.aggregator_name).status == 'running':
+                LOG.debug('Telegraf aggregator %s is reused.', self.aggregator_name)
+                return 0
+            self.stop_telegraf_aggregator()
+        except docker.errors.NotFound:
+            pass
+        try:
+            port = self.telegraf_port_base
+            image = self.monitoring.get('aggregator_image', Constant.TELEGRAF_AGGREGATOR_IMAGE)
+            self.docker_client.containers.run(image, detach=True,
+                                              network=self.emane_interface,
+                                              name=self.aggregator_name,
+                                              ports={'{}/tcp'.format(port): port},
+                                              volumes={self.aggregator_config_file: {
+                                                  'bind': '/etc/telegraf/telegraf.conf',
+                                                  'mode': 'ro'}})
+        except Exception as exc:
+            LOG.exception(exc)
+            LOG.error('Telegraf aggregator %s cannot be started.', self.aggregator_name)
+            return -1
+        LOG.info('Telegraf aggregator %s is started.', self.aggregator_name)
+        return 0
+
+    def stop_telegraf_aggregator(self):
+        try:
+            self.docker_client.containers.get(self.aggregator_name).remove(force=True)
+        except Exception as exc:
+            LOG.debug('Telegraf aggregator %s cannot be removed: %s', self.aggregator_name, exc)
+        return 0
+
+    def helper_steps(self, node, reset=False):
+        """
+        Returns the helper startup sequence of a node: EMANE, the CP daemon and FPM (or OLSR).
+        Telegraf is started with the helpers of a new container.
+
+        :param node: The node.
+        :param reset: If set, the helpers of a warm container are stopped first.
+        :return: List of HelperStep.
+        """
+        steps = []
+        if reset:
+            steps.append(HelperStep('reset', Constant.WARM_RESET_COMMAND))
+        else:
+            steps.append(HelperStep('telegraf', 'telegraf', background=True))
+        steps.append(HelperStep('emane', Constant.EMANE_START_COMMAND))
+        control_planes = self.config['control_planes']
+        if Constant.OLSR_CP in control_planes:
+            steps.append(HelperStep('olsrd', 'olsrd -f /etc/quagga/olsrd.conf', background=True))
+        elif Constant.OLSRv2_CP in control_planes:
+            steps.append(HelperStep('olsrd2', 'olsrd2_static -l /etc/quagga/olsrd2.conf',
+                                    background=True))
         else:
             # TODO: fix FPM
-            if Constant.OSPF_CP in self.config['control_planes']:
-                self.containers[node.name].exec_run('ospfd -d -f /etc/quagga/ospfd.conf',
-                                                    detach=True)
-            elif Constant.BGP_CP in self.config['control_planes']:
-                self.containers[node.name].exec_run('bgpd -d -f /etc/quagga/bgpd.conf', detach=True)
-            LOG.debug('Starting FPM in %s', node.name)
-            # self.containers[node.name].exec_run('sudo python3 /fpm/main.py &', detach=True)
-            self.containers[node.name].exec_run('python /fpm/main.py &', detach=True)
-            LOG.debug('Starting FPM in %s', node.name)
-            self.containers[node.name].exec_run('python3 /fpm/main.py &', detach=True)
-
-    def container_cp(self, r, src, dst):
-        container = self.docker_client.containers.get(r.id)
-        tar = tarfile.open(src + '.tar', mode='w')
+            if Constant.OSPF_CP in control_planes:
+                steps.append(HelperStep('ospfd', 'ospfd -d -f /etc/quagga/ospfd.conf'))
+            elif Constant.BGP_CP in control_planes:
+                steps.append(HelperStep('bgpd', 'bgpd -d -f /etc/quagga/bgpd.conf'))
+            steps.append(HelperStep('fpm', Constant.FPM_START_COMMAND, background=True))
+        return steps
+
+    def start_container_helpers(self, node, reset=False):
+        """
+        Starts the helper programs of a node with a single exec call. The whole startup sequence
+        runs as one script in the container, which reports the exit status and the duration of
+        each step.
+
+        :param node: The node.
+        :param reset: If set, the helpers of a warm container are stopped first.
+        :return: List of (step name, exit status, duration in seconds) tuples.
+        """
+        LOG.debug('Starting helper programs at node %s', node.name)
+        script = helper_script(self.helper_steps(node, reset=reset))
         try:
-            tar.add(src, arcname='telegraf.conf')
-        finally:
-            tar.close()
-        data = open(src + '.tar', 'rb').read()
-        container.put_archive(os.path.dirname(dst), data)
-        os.remove(src + '.tar')
-
-    def jinja_renderer(self, temp_path, dest_path, confs):
-        with open(temp_path, 'a') as f:
+            result = self.exec_run(node, ['sh', '-c', script])
+        except Exception as exc:
+            LOG.error('Helper programs of %s cannot be started: %s', node.name, exc)
+            return []
+        steps = parse_helper_output(result.output.decode(errors='replace'))
+        for name, status, duration in steps:
+            if duration is not None:
+                HELPER_STEP_SECONDS.observe(duration, step=name)
+            if status != 0:
+                HELPER_STEP_FAILURES.inc(step=name)
+                LOG.warning('Helper step %s failed at node %s with exit status %d, see %s',
+                            name, node.name, status, Constant.HELPER_LOG_FILE)
+        if result.exit_code:
+            LOG.warning('Helper script of %s exited with %d after %d steps.', node.name,
+                        result.exit_code, len(steps))
+        return steps
+
+    def jinja_renderer(self, temp_path, dest_path, confs, mode='a'):
+        with open(temp_path, mode) as f:
             f.write(self.jinja_env.get_template(dest_path).render(**confs))
 
     # EMANE RELATED FUNCTIONS
@@ -686,70 +910,64 @@ class EmaneTopology:
         else:
             LOG.error('Unknown PHY layer %s', nem['phy'])
 
-    def generate_emane_scenario_eel(self):
-        with open('templates/emane/scenario.eel', 'w') as f:
-            # 0.0  nem:1 pathloss nem:2,50 nem:3,44 nem:4,45
-            for node in self.nodes.values():
-                node_nem = node.name.replace('node-', 'nem:')
-                pathloss_list = []
-                for neighbor_name in self.nodes:
-                    if neighbor_name == node.name:
-                        continue
-                    neighbor_nem = neighbor_name.replace('node-', 'nem:')
-                    if neighbor_name in node.neighbors:
-                        pathloss_list.append('%s,0' % neighbor_nem)
-                    else:
-                        pathloss_list.append('%s,200' % neighbor_nem)
-                f.write('0.0 %s pathloss %s\n' % (node_nem, ' '.join(pathloss_list)))
-
-    def start_emane_on_node(self, node):
-        LOG.debug('Starting EMANE at node %s', node.name)
-        self.containers[node.name].exec_run('emane /etc/quagga/platform.xml -r -d -l 3 -f '
-                                            '/var/log/emane.log --pidfile /var/run/emane.pid '
-                                            '--uuidfile /var/run/emane.uuid')
+    def initial_scenario_lines(self):
+        """
+        Generates the initial pathloss of all NEM pairs using the topology information, neighbors
+        have 0 dB and others have 200 dB pathloss.
+
+        :return: Generator of (time, EEL line) tuples.
+        """
+        # 0.0  nem:1 pathloss nem:2,50 nem:3,44 nem:4,45
+        for node in self.nodes.values():
+            neighbors = set(node.neighbors)
+            pathloss_list = [(neighbor.nem_id, Constant.PATHLOSS_CONNECTED
+                              if neighbor.name in neighbors else Constant.PATHLOSS_DISCONNECTED)
+                             for neighbor in self.nodes.values() if neighbor.name != node.name]
+            yield 0.0, pathloss_line(0.0, node.nem_id, pathloss_list)
+
+    def generate_emane_scenario_eel(self, *streams):
+        """
+        Writes the scenario replayed by the EMANE event service, the initial pathloss of all NEM
+        pairs followed by the given events.
+
+        :param streams: Iterables of (time, EEL line) tuples, each sorted by time.
+        :return: Number of written lines.
+        """
+        mkdir_p(self.event_service_directory)
+        return write_eel(self.scenario_file, self.initial_scenario_lines(), *streams)
 
     def start_emane_eventservice(self):
-        os.system('emaneeventservice -d templates/emane/eventservice.xml -l 3 -f '
-                  '/var/log/emaneeventservice.log --pidfile /var/run/emaneeventservice.pid '
-                  '--uuidfile /var/run/emaneeventservice.uuid')
+        mkdir_p(self.event_service_directory)
+        self.jinja_renderer('%s/eelgenerator.xml' % self.event_service_directory,
+                            'eelgenerator.xml', {'inputfile': self.scenario_file}, mode='w')
+        self.jinja_renderer('%s/eventservice.xml' % self.event_service_directory,
+                            'eventservice.xml', {
+                                'eventservicegroup': '%s:%d' % (Constant.EVENT_SERVICE_GROUP,
+                                                                Constant.EVENT_SERVICE_PORT),
+                                'eventservicedevice': self.emane_network.event_device},
+                            mode='w')
+        suffix = '-' + self.namespace if self.namespace else ''
+        if run_host_command(['emaneeventservice', '-d',
+                             '%s/eventservice.xml' % self.event_service_directory, '-l', '3',
+                             '-f', '/var/log/emaneeventservice%s.log' % suffix,
+                             '--pidfile', self.event_service_pidfile,
+                             '--uuidfile', '/var/run/emaneeventservice%s.uuid' % suffix]) != 0:
+            return -1
         LOG.debug('EMANE Event Service is started.')
+        return 0
+
+    def stop_emane_eventservice(self):
+        try:
+            with open(self.event_service_pidfile, 'r') as f:
+                os.kill(int(f.read().strip()), SIGTERM)
+            LOG.debug('EMANE Event Service is stopped.')
+        except (OSError, ValueError) as exc:
+            LOG.debug('EMANE Event Service is not running: %s', exc)
 
     def create_emane_interface(self):
         LOG.debug('Creating docker interface (%s) for EMANE', self.emane_interface)
-        os.system('docker network create --driver=bridge --subnet=10.99.0.100/24 '
-                  '--opt com.docker.network.bridge.name=%s %s' % (
-                      self.emane_interface, self.emane_interface))
+        return self.emane_network.create()
 
     def remove_emane_interface(self):
-        LOG.debug('Creating docker interface (%s) for EMANE', self.emane_interface)
-        os.system('docker network rm %s' % self.emane_interface)
-
-    def start_event_generator(self):
-        self.event_generator = EventGenerator(nodes=self.nodes,
-                                              link_update=self.config['experiment']['link_update'],
-                                              duration=self.config['experiment']['duration'])
-        self.event_generator.start()
-
-    def start_traffic_generator(self):
-        # Start MGEN traffic generator
-        experiment = self.config['experiment']
-        self.traffic_generator = TrafficGenerator(nodes=self.nodes,
-                                                  containers=self.containers,
-                                                  traffic_config=experiment['traffic'],
-                                                  duration=experiment['duration'],
-                                                  generate_configurations=False)
-        # opts.generate_configurations)
-        self.traffic_generator.start()
-
-    def run_experiment(self, wait=False):
-        if 'experiment' in self.config and self.config['experiment'].get('enabled', False):
-            if wait:
-                sleep_time = 1.0 * len(self.nodes)
-                LOG.info('Waiting for %.1f seconds before running the experiment', sleep_time)
-                sleep(sleep_time)
-            LOG.info('Experiment is started.')
-            self.start_traffic_generator()
-            self.start_event_generator()
-        else:
-            LOG.debug('No experiments will be run, check the configuration file. '
-                      'Either experiment is not configured or disabled.')
+        LOG.debug('Removing docker interface (%s) for EMANE', self.emane_interface)
+        self.emane_network.remove()
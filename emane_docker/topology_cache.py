@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+from array import array
+import hashlib
+from operator import attrgetter
+import os
+import pickle
+
+from emane_docker.constant import Constant
+from emane_docker.log import LOG
+from emane_docker.topology_model import Link, Node
+from emane_docker.util import mkdir_p
+
+
+def topology_cache_file(config, topology_file):
+    """
+    Returns the cache file of a topology file. There is one cache file per topology path, it is
+    overwritten when the content of the topology file changes.
+
+    :param config: EMANE-Docker configuration.
+    :param topology_file: Path to the topology file.
+    :return: Path to the cache file, or None if caching is disabled.
+    """
+    if not config.get('topology_cache', True):
+        return None
+    path_hash = hashlib.sha256(os.path.abspath(topology_file).encode()).hexdigest()
+    return '%s/%s.pickle' % (Constant.TOPOLOGY_CACHE_DIRECTORY, path_hash)
+
+
+def load_topology_cache(cache_file, data):
+    """
+    Creates the nodes and the links from a cache file. Links are created in the order they were
+    created from the topology file, so that the links of each node keep their order.
+
+    :param cache_file: Path to the cache file.
+    :param data: Content of the topology file.
+    :return: Tuple of the nodes by name and the list of links, or None if the cache is missing or
+        outdated.
+    """
+    try:
+        with open(cache_file, 'rb') as f:
+            cache = pickle.load(f)
+        if cache['version'] != Constant.TOPOLOGY_CACHE_VERSION or \
+                cache['hash'] != hashlib.sha256(data).hexdigest():
+            return None
+        nodes = [Node(domain=domain, node=node, index=index, as_id=as_id)
+                 for index, (domain, node, as_id) in enumerate(cache['nodes'])]
+        link_indices = cache['links']
+        links = [Link(nodes[link_indices[i]], nodes[link_indices[i + 1]])
+                 for i in range(0, len(link_indices), 2)]
+    except FileNotFoundError:
+        return None
+    except Exception as exc:
+        LOG.debug('Topology cache %s cannot be loaded: %s', cache_file, exc)
+        return None
+    return {node.name: node for node in nodes}, links
+
+
+def save_topology_cache(cache_file, data, nodes, links):
+    """
+    Saves the nodes and the links to a cache file, with the hash of the topology file content.
+    Nodes are kept as their topology file entries and links as a flat array of node indices.
+
+    :param cache_file: Path to the cache file.
+    :param data: Content of the topology file.
+    :param nodes: The nodes by name.
+    :param links: The links.
+    """
+    link_indices = array('L')
+    for link in links:
+        link_indices.extend(link.key)
+    cache = {'version': Constant.TOPOLOGY_CACHE_VERSION, 'hash': hashlib.sha256(data).hexdigest(),
+             'nodes': [(node.domain, {'name': node.name, 'neighbors': node.neighbors,
+                                      'is_border': node.is_border,
+                                      'bootstrapfile': node.bootstrapfile}, node.as_id)
+                       for node in sorted(nodes.values(), key=attrgetter('index'))],
+             'links': link_indices}
+    try:
+        mkdir_p(Constant.TOPOLOGY_CACHE_DIRECTORY)
+        # Parallel sweep points may write the same cache file.
+        temp_file = '%s.%d' % (cache_file, os.getpid())
+        with open(temp_file, 'wb') as f:
+            pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, cache_file)
+    except OSError as exc:
+        LOG.debug('Topology cache %s cannot be saved: %s', cache_file, exc)
@@ -1,41 +1,200 @@
 #!/usr/bin/env python3
 
+import hashlib
+import os
+
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
 import networkx as nx
 from networkx.drawing.nx_agraph import graphviz_layout
+import numpy as np
 
+from emane_docker.constant import Constant
 from emane_docker.log import LOG
+from emane_docker.util import mkdir_p
+
+LAYOUTS = ('auto', 'spring', 'sfdp', 'dot', 'neato')
+# Number of node pairs whose repulsion is computed at once by the spring layout.
+REPULSION_BLOCK_SIZE = 2 ** 22
 
 
-def draw(nodes, out_file=None):
+def topology_edges(nodes):
     """
-    Draws the given topology.
+    Returns the edges of the topology, each edge once with the lower node index first.
 
-    :param nodes: List of nodes in the topology.
-    :param out_file: If specified, the topology figure is saved to that file.
-    :return:
+    :param nodes: Dictionary of nodes in the topology.
+    :return: Sorted list of (node index, node index) tuples.
     """
-    graph = nx.Graph()
+    edges = set()
     for node in nodes.values():
-        graph.add_node(node.name, time=node.id)
         for neighbor_name in node.neighbors:
-            graph.add_edge(node.id, neighbor_name)
-
-    # pos = nx.spring_layout(G, scale=20)
-    # nx.spring_layout(G, k=0.05, iterations=20)
-    options = {
-        'node_size': 10,
-        'font_size': 12,
-        'with_labels': True,
-        'pos': graphviz_layout(graph)
-    }
-    nx.draw(graph, **options)
+            neighbor = nodes[neighbor_name]
+            edges.add((min(node.index, neighbor.index), max(node.index, neighbor.index)))
+    return sorted(edges)
+
+
+def topology_hash(names, edges):
+    """
+    Returns the hash of the topology graph, which keys the layout cache.
+
+    :param names: Node names in the order of their indices.
+    :param edges: List of (node index, node index) tuples.
+    :return: Hex digest of the graph.
+    """
+    digest = hashlib.sha256()
+    digest.update('\n'.join(names).encode())
+    digest.update(np.asarray(edges, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def spring_layout(num_nodes, edges, iterations=50, seed=0):
+    """
+    Fruchterman-Reingold force-directed layout. Forces of all nodes are computed at once with
+    numpy, the repulsion is computed in blocks of node pairs to bound the memory.
+
+    :param num_nodes: Number of nodes.
+    :param edges: List of (node index, node index) tuples.
+    :param iterations: Number of iterations.
+    :param seed: Seed of the initial positions.
+    :return: Array of node positions with shape (num_nodes, 2).
+    """
+    positions = np.random.default_rng(seed).random((num_nodes, 2))
+    if num_nodes < 2:
+        return positions
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    sources, targets = edges[:, 0], edges[:, 1]
+    k2 = 1.0 / num_nodes
+    k = np.sqrt(k2)
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+    block = max(1, REPULSION_BLOCK_SIZE // num_nodes)
+    displacement = np.empty((num_nodes, 2))
+    for _ in range(iterations):
+        x, y = positions[:, 0], positions[:, 1]
+        for start in range(0, num_nodes, block):
+            dx = x[start:start + block, np.newaxis] - x
+            dy = y[start:start + block, np.newaxis] - y
+            # Repulsion k^2 / d along the unit vector, i.e. delta * k^2 / d^2.
+            weight = dx * dx
+            weight += dy * dy
+            np.maximum(weight, 1e-6, out=weight)
+            np.divide(k2, weight, out=weight)
+            displacement[start:start + block, 0] = np.einsum('ij,ij->i', dx, weight)
+            displacement[start:start + block, 1] = np.einsum('ij,ij->i', dy, weight)
+        delta = positions[sources] - positions[targets]
+        force = delta * (np.linalg.norm(delta, axis=1) / k)[:, np.newaxis]
+        np.subtract.at(displacement, sources, force)
+        np.add.at(displacement, targets, force)
+        length = np.maximum(np.linalg.norm(displacement, axis=1), 1e-6)
+        positions += displacement * (np.minimum(length, temperature) / length)[:, np.newaxis]
+        temperature -= cooling
+    return positions
+
+
+def graphviz_positions(names, edges, prog):
+    """
+    Computes the layout with a Graphviz program, sfdp scales to large graphs.
+
+    :param names: Node names in the order of their indices.
+    :param edges: List of (node index, node index) tuples.
+    :param prog: The Graphviz program, e.g. sfdp.
+    :return: Array of node positions with shape (len(names), 2).
+    """
+    graph = nx.Graph()
+    graph.add_nodes_from(range(len(names)))
+    graph.add_edges_from(edges)
+    positions = graphviz_layout(graph, prog=prog)
+    return np.array([positions[index] for index in range(len(names))], dtype=float)
+
+
+def compute_layout(names, edges, layout='auto'):
+    """
+    Computes the node positions, or loads them from the layout cache. The auto layout uses sfdp
+    if Graphviz is available and the spring layout otherwise.
+
+    :param names: Node names in the order of their indices.
+    :param edges: List of (node index, node index) tuples.
+    :param layout: One of LAYOUTS.
+    :return: Array of node positions with shape (len(names), 2).
+    """
+    cache_file = '%s/layout-%s-%s.npy' % (Constant.TOPOLOGY_CACHE_DIRECTORY, layout,
+                                          topology_hash(names, edges))
+    if os.path.isfile(cache_file):
+        positions = np.load(cache_file)
+        if positions.shape == (len(names), 2):
+            LOG.debug('Topology layout is loaded from %s', cache_file)
+            return positions
+
+    positions = None
+    if layout != 'spring':
+        try:
+            positions = graphviz_positions(names, edges, 'sfdp' if layout == 'auto' else layout)
+        except (ImportError, OSError, ValueError) as e:
+            # pygraphviz raises ValueError if the Graphviz program is not installed.
+            if layout != 'auto':
+                LOG.warning('Graphviz layout %s is not available (%s), using the spring layout.',
+                            layout, e)
+    if positions is None:
+        positions = spring_layout(len(names), edges)
+
+    mkdir_p(Constant.TOPOLOGY_CACHE_DIRECTORY)
+    np.save(cache_file, positions)
+    return positions
+
+
+def draw(nodes, out_file=None, layout='auto'):
+    """
+    Draws the given topology. Nodes are colored by their domains, border nodes are drawn larger
+    with a black outline. Edges are drawn as a single collection, which is rasterized for large
+    topologies.
+
+    :param nodes: Dictionary of nodes in the topology.
+    :param out_file: If specified, the topology figure is saved to that file.
+    :param layout: One of LAYOUTS, the layout is cached per topology.
+    :return:
+    """
+    ordered_nodes = sorted(nodes.values(), key=lambda node: node.index)
+    names = [node.name for node in ordered_nodes]
+    edges = topology_edges(nodes)
+    positions = compute_layout(names, edges, layout=layout)
+    large = len(ordered_nodes) > Constant.DRAW_LARGE_TOPOLOGY
+
+    figure, axes = plt.subplots(figsize=(12, 12) if large else (8, 8))
+    if edges:
+        segments = positions[np.asarray(edges, dtype=np.int64)]
+        axes.add_collection(LineCollection(segments, colors='0.6', linewidths=0.3 if large else 1.0,
+                                           rasterized=large, zorder=1))
+
+    domains = sorted({node.domain for node in ordered_nodes}, key=str)
+    colormap = plt.get_cmap('tab20')
+    domain_colors = {domain: colormap(i % colormap.N) for i, domain in enumerate(domains)}
+    colors = [domain_colors[node.domain] for node in ordered_nodes]
+    is_border = np.array([bool(node.is_border) for node in ordered_nodes])
+    node_size = 4 if large else 40
+    axes.scatter(positions[~is_border, 0], positions[~is_border, 1], s=node_size,
+                 c=[color for color, border in zip(colors, is_border) if not border],
+                 linewidths=0, rasterized=large, zorder=2)
+    axes.scatter(positions[is_border, 0], positions[is_border, 1], s=node_size * 3,
+                 c=[color for color, border in zip(colors, is_border) if border],
+                 edgecolors='black', linewidths=0.5 if large else 1.0, rasterized=large, zorder=3)
+    if not large:
+        for name, (x, y) in zip(names, positions):
+            axes.annotate(name, (x, y), fontsize=8, xytext=(3, 3), textcoords='offset points')
+
+    handles = [Line2D([], [], marker='o', linestyle='', color=domain_colors[domain],
+                      label='Domain %s' % domain) for domain in domains]
+    handles.append(Line2D([], [], marker='o', linestyle='', color='white',
+                          markeredgecolor='black', label='Border node'))
+    axes.legend(handles=handles, loc='best', fontsize=8)
+    axes.autoscale_view()
+    axes.set_axis_off()
     if out_file is None:
-        plt.plot()
         plt.show()
     else:
-        plt.savefig(out_file)
+        figure.savefig(out_file, dpi=200 if large else 100)
         LOG.info('The topology figure is saved to %s', out_file)
+    plt.close(figure)
 
 
 if __name__ == '__main__':
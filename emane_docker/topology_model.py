@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+from functools import total_ordering
+import ipaddress
+
+from emane_docker.addressing import int_to_ipv4
+
+
+class Node:
+    """
+    It contains information related to each "emulated" node. Each node runs as a separate
+    Docker container. The names node and node are used interchangeably throughout this project.
+
+    :param domain: The domain that node belongs to.
+    :param node: The node dictionary, see the configuration examples for details.
+    """
+    __slots__ = ('domain', 'name', 'index', 'as_id', 'id', 'nem_id', 'nem_ipv4', 'neighbors',
+                 'is_border', 'bootstrapfile', 'port_offset', 'links')
+
+    def __init__(self, domain, node, index, as_id):
+        """
+        Initializes a node instance.
+
+        """
+        self.domain = domain
+        self.name = node['name']
+        # later support auto id assignment
+        self.index = index
+        self.as_id = as_id
+        self.id = node['name']
+        self.nem_id = index + 1
+        self.nem_ipv4 = None
+        self.neighbors = node['neighbors']
+        self.is_border = node['is_border']
+        self.bootstrapfile = node[
+            'bootstrapfile'] if 'bootstrapfile' in node else '/bootstrap/start.sh'
+        self.port_offset = 0
+        self.links = []
+
+    def __str__(self):
+        return 'Name: %s, Neighbors: %s' % (self.name, ', '.join(self.neighbors))
+
+    def __eq__(self, other):
+        return other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+def _parse_ipv4(address):
+    if address is None or isinstance(address, int):
+        return address
+    return int(ipaddress.IPv4Address(address))
+
+
+@total_ordering
+class Link:
+    """
+    Contains the information related to a link between two nodes (nodes). If the addresses are
+    not given, they are assigned later using set_ipv4_addresses. Addresses are kept as integers
+    and formatted on access, and links are ordered by the indices of their nodes.
+
+    :param node1:
+    :param node2:
+    :param mask1:
+    :param mask2:
+    :param lid:
+    :param ip1:
+    :param ip2:
+    """
+    __slots__ = ('node1', 'node2', 'id', 'node1_portid', 'node2_portid', '_node1_ipv4',
+                 '_node2_ipv4', 'mask1', 'mask2', 'status')
+    UP = 1
+    DOWN = 0
+
+    def __init__(self, node1, node2, mask1=30, mask2=30, lid=None, ip1=None, ip2=None):
+        self.node1 = node1
+        self.node2 = node2
+        self.id = lid
+        self.node1_portid = None
+        self.node2_portid = None
+        if ip1 is None or ip2 is None:
+            self._node1_ipv4 = None
+            self._node2_ipv4 = None
+            self.mask1 = mask1
+            self.mask2 = mask2
+        else:
+            if '/' in ip1:
+                self.node1_ipv4, self.mask1 = ip1.split('/')[0], int(ip1.split('/')[1])
+            else:
+                self.node1_ipv4 = ip1
+                self.mask1 = mask1
+            if '/' in ip2:
+                self.node2_ipv4, self.mask2 = ip2.split('/')[0], int(ip2.split('/')[1])
+            else:
+                self.node2_ipv4 = ip2
+                self.mask2 = mask2
+
+        self.node1.links.append(self)
+        self.node2.links.append(self)
+        self.status = Link.UP
+
+    @property
+    def node1_ipv4(self):
+        return None if self._node1_ipv4 is None else int_to_ipv4(self._node1_ipv4)
+
+    @node1_ipv4.setter
+    def node1_ipv4(self, address):
+        self._node1_ipv4 = _parse_ipv4(address)
+
+    @property
+    def node2_ipv4(self):
+        return None if self._node2_ipv4 is None else int_to_ipv4(self._node2_ipv4)
+
+    @node2_ipv4.setter
+    def node2_ipv4(self, address):
+        self._node2_ipv4 = _parse_ipv4(address)
+
+    @property
+    def node1_ipv4_int(self):
+        return self._node1_ipv4
+
+    @property
+    def node2_ipv4_int(self):
+        return self._node2_ipv4
+
+    @property
+    def key(self):
+        return self.node1.index, self.node2.index
+
+    def swap_nodes(self):
+        self.node1, self.node2 = self.node2, self.node1
+        self.node1_portid, self.node2_portid = self.node2_portid, self.node1_portid
+        self.mask1, self.mask2 = self.mask2, self.mask1
+        self._node1_ipv4, self._node2_ipv4 = self._node2_ipv4, self._node1_ipv4
+
+    def set_ipv4_addresses(self, ip1, ip2, mask):
+        self.node1_ipv4 = ip1
+        self.node2_ipv4 = ip2
+        self.mask1 = mask
+        self.mask2 = mask
+
+    def set_port_ids(self, node1_portid, node2_portid):
+        self.node1_portid = node1_portid
+        self.node2_portid = node2_portid
+
+    def contains(self, node1, node2=None):
+        return (node1.index == self.node1.index and node2.index == self.node2.index) or (
+            node2.index == self.node1.index and node1.index == self.node2.index)
+
+    def __eq__(self, other):
+        return self.node1.index == other.node1.index and self.node2.index == other.node2.index
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+    def __hash__(self):
+        return hash(self.key)
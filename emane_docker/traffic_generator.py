@@ -1,78 +1,219 @@
 #!/usr/bin/env python
 
-import numpy as np
+import json
+from math import ceil
+from multiprocessing.pool import ThreadPool
+from time import gmtime, strftime, time
 
+from emane_docker.config_bundle import pack_files
 from emane_docker.constant import Constant
 from emane_docker.log import LOG
 from emane_docker.distribution import DistributionParser
+from emane_docker.metrics import EXEC_SECONDS
+from emane_docker.rng import RandomStreams
+from emane_docker.traffic_matrix import TrafficMatrix
+from emane_docker.util import mkdir_p
 
 
 class TrafficGenerator:
-    def __init__(self, nodes, containers, traffic_config, generate_configurations, duration):
+    """
+    Generates MGEN traffic. Each client samples the times, rates and sizes of its flows from its
+    own random stream, then the destinations and rate scales of all flows are assigned at once by
+    the traffic matrix, see TrafficMatrix for the modes and the client and server roles.
+
+    :param nodes: The nodes of the topology.
+    :param containers: The containers of the nodes.
+    :param traffic_config: Traffic configuration, see config.default.yaml for details.
+    :param generate_configurations: If set, only the MGEN configurations are generated.
+    :param duration: Duration of the experiment.
+    :param random_streams: Random streams of the experiment.
+    :param config_directory: Directory of the node configurations, mgen.in files are written to
+        the directory of each node.
+    :param upload: If set, the mgen.in files are copied into the containers, for containers
+        without bind-mounted configuration directories.
+    :param start_lead_time: The MGEN instances are launched concurrently and begin their flows
+        together at the first whole second after this lead time from the launch, in seconds. The
+        containers share the host clock, so their wall clocks are synchronized.
+    """
+
+    def __init__(self, nodes, containers, traffic_config, generate_configurations, duration,
+                 random_streams=None, config_directory=Constant.CP_CONFIG_DIRECTORY,
+                 upload=False, start_lead_time=Constant.MGEN_START_LEAD_TIME):
         self.nodes = nodes
         self.containers = containers
         self.duration = duration
         self.traffic_config = traffic_config
         self.generate_configurations = generate_configurations
+        self.random_streams = random_streams if random_streams is not None else RandomStreams()
+        self.config_directory = config_directory
+        self.upload = upload
+        self.start_lead_time = start_lead_time
+        self.start_report = None
+        # The schedule of the last start: flow id to (source, destination address, packet rate,
+        # start time, stop time), the times are relative to schedule_start.
+        self.flows = {}
+        self.schedule_start = None
         self.arrival_distribution = DistributionParser(distribution=traffic_config['arrival'])
         self.bandwidth_distribution = DistributionParser(distribution=traffic_config['bandwidth'])
         self.flow_size_distribution = DistributionParser(distribution=traffic_config['flow_size'])
         self.flow_size_distribution.start_next_simulation()
+        self.matrix = TrafficMatrix.from_config(traffic_config, nodes)
+
+    def generate_flows(self, node):
+        """
+        Samples the flows of a client node from its own random stream.
 
-    def _is_server_node(self, node_id):
-        return node_id % 2 == 0  # Even number: server, odd number: client
+        :param node: The client node.
+        :return: List of (start time, packet rate, stop time) tuples, the destinations are assigned
+            by the traffic matrix.
+        """
+        rng = self.random_streams.generator('traffic', node.name)
+        arrival_distribution = self.arrival_distribution.for_simulation(-1, rng)
+        bandwidth_distribution = self.bandwidth_distribution.for_simulation(
+            self.bandwidth_distribution.simulation_id, rng)
+        flow_size_distribution = self.flow_size_distribution.for_simulation(
+            self.flow_size_distribution.simulation_id, rng)
+        flows = []
+        current_time = 0
+        while arrival_distribution.start_next_simulation():
+            simulation_time = 0.0
+            while True:
+                bandwidth = bandwidth_distribution.get_next()
+                next_event_time = arrival_distribution.get_next()
+                current_time += next_event_time
+                simulation_time += next_event_time
+                if simulation_time > self.duration:
+                    break
+                # bw in kbps, 600 bytes packet size
+                rate = int(bandwidth * 1024.0 / 600 / 8)
+                stop_time = 1024 * flow_size_distribution.get_next() / (rate * 600)
+                flows.append((current_time, rate, current_time + stop_time))
+        return flows
 
-    def _pick_destination_ip(self, node_id):
-        dest_node_id = node_id
-        while dest_node_id == node_id or not self._is_server_node(dest_node_id):
-            dest_node_id = np.random.randint(1, len(self.nodes) + 1)
-        return '10.100.0.%d' % dest_node_id
+    def assign_destinations(self, client_flows):
+        """
+        Assigns the destinations and the rates of the flows of all clients at once.
+
+        :param client_flows: Dictionary from a client name to its flows, see generate_flows.
+        :return: Dictionary from a client name to its list of (start time, destination address,
+            packet rate, stop time) tuples.
+        """
+        sources = [self.matrix.positions[name] for name, flows in client_flows.items()
+                   for _ in flows]
+        destinations, scales = self.matrix.assign(
+            sources, self.random_streams.generator('traffic', 'matrix'))
+        addresses = [node.nem_ipv4 for node in self.matrix.nodes]
+        assigned = {}
+        flow_index = 0
+        for name, flows in client_flows.items():
+            assigned[name] = []
+            for start_time, rate, stop_time in flows:
+                scale = scales[flow_index]
+                assigned[name].append((start_time, addresses[destinations[flow_index]],
+                                       max(int(round(rate * scale)), 1), stop_time))
+                flow_index += 1
+        return assigned
 
     def start(self):
+        """
+        Generates the MGEN configurations and, unless only the configurations are generated,
+        starts MGEN on all nodes.
+
+        :raise ValueError: If a client has no server to send to.
+        """
+        clients = [n for n, client in zip(self.matrix.nodes, self.matrix.clients) if client]
+        # Clients are sampled in parallel, flow ids are assigned in node order afterwards.
+        threadpool = ThreadPool()
+        client_flows = dict(zip([n.name for n in clients],
+                                threadpool.map(self.generate_flows, clients)))
+        threadpool.close()
+        threadpool.join()
+        client_flows = self.assign_destinations(client_flows)
+
+        self.flows = {}
         flow_id = 0
         for node, n in self.nodes.items():
-            with open('%s/%s/mgen.in' % (Constant.CP_CONFIG_DIRECTORY, node), 'w') as f:
-                node_id = int(n.index + 1)
-                # If the node is server, listen at TCP port 5001
-                if self._is_server_node(node_id):
+            mkdir_p('%s/%s' % (self.config_directory, node))
+            with open('%s/%s/mgen.in' % (self.config_directory, node), 'w') as f:
+                # If the node is client, write the flows
+                for start_time, destination_ip, rate, stop_time in client_flows.get(node, []):
+                    flow_id += 1
+                    self.flows[flow_id] = (node, destination_ip, rate, start_time, stop_time)
+                    f.write('%.2f ON %d UDP SRC 5001 DST %s/5001 PERIODIC [%d %d]\n' % (
+                        start_time, flow_id, destination_ip, rate, 600))
+                    f.write('%.2f OFF %d\n' % (stop_time, flow_id))
+
+                # If the node is server, listen at TCP port 5001. The listen lines follow the flows,
+                # so that the result report reads the flows of nodes which are both.
+                if self.matrix.servers[self.matrix.positions[node]]:
                     # f.write('0.0 LISTEN TCP 5001\n%.2f IGNORE TCP 5001\n' % self.duration)
                     f.write('0.0 LISTEN UDP 5001\n%.2f IGNORE UDP 5001\n' % (
                         self.duration * (self.arrival_distribution.num_simulations + 1)))
-                    continue
-                # Otherwise, generate flows
-                self.arrival_distribution.rewind()
-                current_time = 0
-                while self.arrival_distribution.start_next_simulation():
-                    simulation_time = 0.0
-                    while True:
-                        bandwidth = self.bandwidth_distribution.get_next()
-                        flow_id += 1
-                        next_event_time = self.arrival_distribution.get_next()
-                        # sleep(next_event_time)
-                        current_time += next_event_time
-                        simulation_time += next_event_time
-                        if simulation_time > self.duration:
-                            break
-                        # bw in kbps, 600 bytes packet size
-                        rate = int(bandwidth * 1024.0 / 600 / 8)
-                        f.write('%.2f ON %d UDP SRC 5001 DST %s/5001 PERIODIC [%d %d]\n' % (
-                            current_time, flow_id,
-                            self._pick_destination_ip(node_id=node_id), rate,
-                            600))
-                        stop_time = 1024 * self.flow_size_distribution.get_next() / (rate * 600)
-                        f.write('%.2f OFF %d\n' % (current_time + stop_time, flow_id))
-
-                        # pkt_size = self.flow_size_distribution.get_next() * 1024
-                        # f.write('%.2f ON %d TCP SRC 5001 DST %s/5001 PERIODIC [1 %d] COUNT 1\n'
-                        # % (
-                        #     current_time, flow_id,
-                        #     self._pick_destination_ip(node_id=node_id), int(pkt_size)))
 
         LOG.debug('Traffic generator configurations are generated.')
 
         if not self.generate_configurations:
-            for node in self.nodes:
-                self.containers[node].exec_run(
-                    'mgen input /etc/quagga/mgen.in output /etc/quagga/mgen.out', detach=True)
+            if self.upload:
+                self.upload_configurations()
+            # All instances begin their schedules at the same wall clock time, the lead time only
+            # covers the launch as the configurations are already in place.
+            schedule_start = ceil(time() + self.start_lead_time)
+            self.schedule_start = schedule_start
+            self.start_report = self.launch(schedule_start)
+            if self.start_report['late_nodes']:
+                LOG.warning('MGEN is launched after the start time at %d nodes, their flows start '
+                            'up to %.3f s late.', len(self.start_report['late_nodes']),
+                            self.start_report['max_delay'])
+            with open('%s/mgen_start.json' % self.config_directory, 'w') as f:
+                json.dump(self.start_report, f, indent=2)
+            LOG.info('Traffic generator is started, flows start at %s (launch spread: %.3f s, '
+                     'margin: %.3f s).', strftime('%H:%M:%S', gmtime(schedule_start)),
+                     self.start_report['launch_spread'], self.start_report['margin'])
+
+    def upload_configurations(self):
+        """
+        Copies the mgen.in file of each node into its container.
+        """
+        def upload(node):
+            with open('%s/%s/mgen.in' % (self.config_directory, node), 'rb') as f:
+                data = pack_files({'mgen.in': f.read()})
+            self.containers[node].put_archive(Constant.CONTAINER_CONFIG_DIRECTORY, data)
+
+        threadpool = ThreadPool()
+        threadpool.map(upload, self.nodes)
+        threadpool.close()
+        threadpool.join()
+
+    def launch(self, start_time):
+        """
+        Launches MGEN on all nodes concurrently. Each node reports the wall clock time MGEN is
+        launched at, so that the start skew can be measured: instances launched before the start
+        time begin their flows together, the others begin late by their launch delay.
+
+        :param start_time: The start time of the flows, in seconds since the epoch.
+        :return: Dictionary of the start time, the launch spread, the margin of the last launch
+            before the start time, and the nodes launched late with the maximum delay.
+        """
+        command = Constant.MGEN_LAUNCH_COMMAND % strftime('%H:%M:%S', gmtime(start_time))
+
+        def launch(node):
+            with EXEC_SECONDS.time(command='mgen'):
+                result = self.containers[node].exec_run(['sh', '-c', command])
+            try:
+                return node, int(result.output.decode(errors='replace').split()[0]) / 1e9
+            except (AttributeError, IndexError, ValueError):
+                LOG.warning('MGEN launch time of %s cannot be read.', node)
+                return node, None
 
-            LOG.info('Traffic generator is started.')
+        threadpool = ThreadPool(min(len(self.nodes), Constant.MGEN_LAUNCH_THREADS) or 1)
+        launch_times = dict(threadpool.map(launch, self.nodes))
+        threadpool.close()
+        threadpool.join()
+        times = [launch_time for launch_time in launch_times.values() if launch_time is not None]
+        late_nodes = sorted(node for node, launch_time in launch_times.items()
+                            if launch_time is not None and launch_time > start_time)
+        return {'start_time': start_time, 'launched': len(times), 'nodes': len(self.nodes),
+                'launch_spread': max(times) - min(times) if times else 0.0,
+                'margin': start_time - max(times) if times else 0.0,
+                'late_nodes': late_nodes,
+                'max_delay': max(max(times) - start_time, 0.0) if times else 0.0}
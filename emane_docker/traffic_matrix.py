@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+from emane_docker.constant import Constant
+from emane_docker.util import load_yaml
+
+
+class TrafficMatrix:
+    """
+    Assigns the destinations and rate scales of traffic flows. Entry (s, d) of the demand matrix
+    is the relative demand from node s to node d, and all flows are assigned at once: the
+    destination of each flow is sampled from the demand row of its source with a single
+    searchsorted on the cumulative demands. The matrix itself is never built. The uniform,
+    gravity and hotspot demands are products of a source and a destination weight, so all rows
+    share the cumulative destination weights, and the demands of a file are kept as sparse rows,
+    flattened into a single cumulative array. Demands are only between clients and servers, the
+    role of each node is given by its domain or, by default, even NEMs are servers and odd NEMs
+    are clients.
+
+    Modes:
+    - uniform: every server has the same demand.
+    - gravity: the demand from s to d is weight(s) * weight(d), the weights default to the node
+      degrees. Flows of heavier pairs get higher rates.
+    - hotspot: hotspot_fraction of the demand goes to the hotspot servers, the rest is uniform.
+    - file: the demand matrix is read from a YAML file of `source: {destination: demand}`, flows
+      of higher demand pairs get higher rates.
+
+    :param nodes: The nodes of the topology.
+    :param mode: One of Constant.TRAFFIC_MATRIX_MODES.
+    :param roles: Dictionary from a domain to the role of its nodes, client, server or both.
+        Nodes of the other domains get a role by the parity of their NEM id.
+    :param weights: Dictionary from a node name to its gravity weight.
+    :param hotspots: Names of the hotspot servers, defaults to the hotspot_count servers with the
+        highest degrees.
+    :param hotspot_count: Number of hotspots if they are not given.
+    :param hotspot_fraction: Fraction of the demand that goes to the hotspots.
+    :param matrix_file: Path to the demand matrix, for the file mode.
+    """
+
+    def __init__(self, nodes, mode=Constant.TRAFFIC_MATRIX_UNIFORM, roles=None, weights=None,
+                 hotspots=None, hotspot_count=1, hotspot_fraction=0.8, matrix_file=None):
+        if mode not in Constant.TRAFFIC_MATRIX_MODES:
+            raise ValueError('Traffic matrix mode %s is not supported, supported modes are %s' % (
+                mode, Constant.TRAFFIC_MATRIX_MODES))
+        self.nodes = sorted(nodes.values(), key=lambda node: node.nem_id)
+        self.positions = {node.name: position for position, node in enumerate(self.nodes)}
+        self.mode = mode
+        self.clients, self.servers = self.assign_roles(roles or {})
+        # Sparse rows of the file mode: row s is entries indptr[s]:indptr[s + 1] of the
+        # destinations and the values, it starts at row_offset[s] of cdf, the cumulative sum of
+        # all values.
+        self.indptr = self.row_offset = self.destinations = self.values = None
+        # Source and destination weights of the other modes, cdf is the cumulative sum of the
+        # destination weights.
+        self.source_weights = self.destination_weights = None
+        if mode == Constant.TRAFFIC_MATRIX_FILE:
+            self.load_demand(matrix_file)
+        else:
+            if mode == Constant.TRAFFIC_MATRIX_GRAVITY:
+                self.source_weights = self.node_weights(weights)
+                self.destination_weights = self.source_weights.copy()
+            elif mode == Constant.TRAFFIC_MATRIX_HOTSPOT:
+                self.source_weights = np.ones(len(self.nodes))
+                self.destination_weights = self.hotspot_weights(hotspots, hotspot_count,
+                                                                hotspot_fraction)
+            else:
+                self.source_weights = np.ones(len(self.nodes))
+                self.destination_weights = np.ones(len(self.nodes))
+            self.source_weights[~self.clients] = 0.0
+            self.destination_weights[~self.servers] = 0.0
+            self.init_weights()
+
+    @classmethod
+    def from_config(cls, traffic_config, nodes):
+        """
+        Creates the traffic matrix using the matrix block of the traffic configuration.
+
+        :param traffic_config: Traffic configuration, see config.default.yaml for details.
+        :param nodes: The nodes of the topology.
+        :return: The traffic matrix.
+        """
+        matrix = traffic_config.get('matrix', None) or {}
+        return cls(nodes=nodes, mode=matrix.get('mode', Constant.TRAFFIC_MATRIX_UNIFORM),
+                   roles=matrix.get('roles', None), weights=matrix.get('weights', None),
+                   hotspots=matrix.get('hotspots', None),
+                   hotspot_count=matrix.get('hotspot_count', 1),
+                   hotspot_fraction=matrix.get('hotspot_fraction', 0.8),
+                   matrix_file=matrix.get('file', None))
+
+    def assign_roles(self, roles):
+        """
+        Assigns the client and server roles of the nodes.
+
+        :param roles: Dictionary from a domain to the role of its nodes.
+        :return: Boolean arrays of the clients and the servers, in NEM id order.
+        """
+        clients = np.zeros(len(self.nodes), dtype=bool)
+        servers = np.zeros(len(self.nodes), dtype=bool)
+        for position, node in enumerate(self.nodes):
+            parity_role = Constant.TRAFFIC_ROLE_CLIENT
+            if node.nem_id % 2 == 0:
+                parity_role = Constant.TRAFFIC_ROLE_SERVER
+            role = roles.get(node.domain, None) or parity_role
+            if role not in Constant.TRAFFIC_ROLES:
+                raise ValueError('Traffic role %s of domain %s is not supported, supported roles '
+                                 'are %s' % (role, node.domain, Constant.TRAFFIC_ROLES))
+            clients[position] = role != Constant.TRAFFIC_ROLE_SERVER
+            servers[position] = role != Constant.TRAFFIC_ROLE_CLIENT
+        return clients, servers
+
+    def node_weights(self, weights):
+        if weights is None:
+            return np.array([max(len(node.neighbors), 1) for node in self.nodes], dtype=float)
+        return np.array([weights.get(node.name, 1.0) for node in self.nodes], dtype=float)
+
+    def hotspot_weights(self, hotspots, hotspot_count, hotspot_fraction):
+        servers = [node for node, server in zip(self.nodes, self.servers) if server]
+        if hotspots is None:
+            servers.sort(key=lambda node: (-len(node.neighbors), node.nem_id))
+            hotspots = [node.name for node in servers[:hotspot_count]]
+        is_hotspot = np.zeros(len(self.nodes), dtype=bool)
+        for name in hotspots:
+            if name not in self.positions:
+                raise ValueError('Hotspot %s is not a node of the topology' % name)
+            is_hotspot[self.positions[name]] = True
+        is_hotspot &= self.servers
+        others = self.servers & ~is_hotspot
+        column = np.zeros(len(self.nodes))
+        if is_hotspot.any():
+            column[is_hotspot] = hotspot_fraction / is_hotspot.sum()
+        if others.any():
+            column[others] = (1.0 - hotspot_fraction if is_hotspot.any() else 1.0) / others.sum()
+        return column
+
+    def init_weights(self):
+        """
+        Computes the row demands and the mean pair demand of the product modes. A node is not its
+        own destination, so its row excludes its own destination weight.
+        """
+        destinations = self.destination_weights > 0
+        sources = self.source_weights > 0
+        self.cdf = np.cumsum(self.destination_weights)
+        total = self.cdf[-1] if len(self.nodes) else 0.0
+        # The count avoids rounding errors when the only destination of a row is its source.
+        other_destinations = np.count_nonzero(destinations) - destinations
+        self.row_demand = np.where(sources & (other_destinations > 0),
+                                   total - self.destination_weights, 0.0)
+        # Rates are scaled relative to the mean demand of the pairs.
+        own_demand = np.dot(self.source_weights, self.destination_weights)
+        pair_demand = self.source_weights.sum() * total - own_demand
+        own_pairs = np.count_nonzero(sources & destinations)
+        num_pairs = np.count_nonzero(sources) * np.count_nonzero(destinations) - own_pairs
+        self.mean_demand = pair_demand / num_pairs if num_pairs else 1.0
+
+    def load_demand(self, matrix_file):
+        """
+        Reads the demands of a matrix file into sparse rows. Demands that are not from a client to
+        another server are dropped.
+
+        :param matrix_file: Path to the demand matrix.
+        """
+        if matrix_file is None:
+            raise ValueError('The file traffic matrix requires a matrix file')
+        with open(matrix_file, 'r') as f:
+            entries = load_yaml(f) or {}
+        sources, destinations, values = [], [], []
+        for source, row in entries.items():
+            for destination, value in (row or {}).items():
+                if source not in self.positions or destination not in self.positions:
+                    raise ValueError('Demand %s -> %s is not between nodes of the topology' % (
+                        source, destination))
+                sources.append(self.positions[source])
+                destinations.append(self.positions[destination])
+                values.append(float(value))
+        sources = np.array(sources, dtype=np.int64)
+        destinations = np.array(destinations, dtype=np.int64)
+        values = np.array(values, dtype=float)
+        if len(values):
+            keep = self.clients[sources] & self.servers[destinations] & (
+                sources != destinations) & (values > 0)
+            sources, destinations, values = sources[keep], destinations[keep], values[keep]
+        order = np.argsort(sources, kind='stable')
+        self.destinations = destinations[order]
+        self.values = values[order]
+        self.indptr = np.searchsorted(sources[order], np.arange(len(self.nodes) + 1))
+        self.cdf = np.cumsum(self.values)
+        row_bounds = np.concatenate(([0.0], self.cdf))[self.indptr]
+        self.row_demand = np.diff(row_bounds)
+        self.row_offset = row_bounds[:-1]
+        self.mean_demand = self.values.mean() if len(self.values) else 1.0
+
+    def has_destinations(self, node):
+        return bool(self.row_demand[self.positions[node.name]] > 0)
+
+    def assign(self, sources, rng):
+        """
+        Samples the destinations of flows and their rate scales at once.
+
+        :param sources: Array of the positions of the flow sources, in NEM id order.
+        :param rng: A numpy random Generator.
+        :return: Arrays of the destination positions and the rate scales of the flows.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        if len(sources) and not (self.row_demand[sources] > 0).all():
+            names = sorted({self.nodes[source].name for source in sources
+                            if self.row_demand[source] <= 0})
+            raise ValueError('There are no destinations for the flows of %s' % ', '.join(names))
+        targets = rng.random(len(sources)) * self.row_demand[sources]
+        if self.mode == Constant.TRAFFIC_MATRIX_FILE:
+            # Rows are consecutive ranges of the flattened cumulative demands.
+            entries = np.searchsorted(self.cdf, self.row_offset[sources] + targets, side='right')
+            entries = np.minimum(entries, self.indptr[sources + 1] - 1)
+            return self.destinations[entries], self.values[entries] / self.mean_demand
+        # The weight of the source itself is skipped over.
+        own_weights = self.destination_weights[sources]
+        targets += np.where(targets >= self.cdf[sources] - own_weights, own_weights, 0.0)
+        destinations = np.searchsorted(self.cdf, targets, side='right')
+        destinations = np.minimum(destinations, len(self.nodes) - 1)
+        scales = np.ones(len(sources))
+        if self.mode == Constant.TRAFFIC_MATRIX_GRAVITY:
+            scales = self.source_weights[sources] * self.destination_weights[
+                destinations] / self.mean_demand
+        return destinations, scales
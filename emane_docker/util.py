@@ -1,6 +1,13 @@
 #!/usr/bin/env python3
 import errno
+import hashlib
 import os
+import shutil
+
+import yaml
+
+# The C loader of libyaml is much faster, the pure Python loader is used if it is not available.
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 
 
 def mkdir_p(path):
@@ -11,3 +18,62 @@ def mkdir_p(path):
             pass
         else:
             raise
+
+
+def file_digest(path):
+    """
+    Returns the SHA-256 digest of a file.
+
+    :param path: Path to the file.
+    :return: The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sync_directory(src, dst):
+    """
+    Makes a directory tree a copy of another one. New and changed files are rewritten in place and
+    the files and directories missing from the source are removed, so the destination can stay
+    mounted in running containers.
+
+    :param src: Source directory.
+    :param dst: Destination directory.
+    :return: List of copied or removed paths, relative to the directories.
+    """
+    changed = []
+    for root, _, files in os.walk(src):
+        relative_root = os.path.relpath(root, src)
+        mkdir_p(os.path.join(dst, relative_root))
+        for name in files:
+            src_file = os.path.join(root, name)
+            dst_file = os.path.join(dst, relative_root, name)
+            if os.path.isfile(dst_file) and file_digest(src_file) == file_digest(dst_file):
+                continue
+            shutil.copyfile(src_file, dst_file)
+            changed.append(os.path.normpath(os.path.join(relative_root, name)))
+    for root, directories, files in os.walk(dst):
+        relative_root = os.path.relpath(root, dst)
+        for name in list(directories):
+            if not os.path.isdir(os.path.join(src, relative_root, name)):
+                shutil.rmtree(os.path.join(root, name))
+                directories.remove(name)
+                changed.append(os.path.normpath(os.path.join(relative_root, name)))
+        for name in files:
+            if not os.path.isfile(os.path.join(src, relative_root, name)):
+                os.remove(os.path.join(root, name))
+                changed.append(os.path.normpath(os.path.join(relative_root, name)))
+    return changed
+
+
+def load_yaml(stream):
+    """
+    Parses a YAML document with the safe loader, using the C implementation if it is available.
+
+    :param stream: A string, bytes or an open file.
+    :return: The parsed document.
+    """
+    return yaml.load(stream, Loader=YAML_LOADER)
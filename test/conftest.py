@@ -0,0 +1,58 @@
+#!/usr/bin/env/ python3
+
+import os
+import shutil
+
+import pytest
+import yaml
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Configuration of the topologies run by the fake Docker client of the benchmark.
+CONFIG = {'control_planes': ['ospf'], 'platform': 'docker', 'docker_image': 'fake',
+          'redis_wait_time': 0,
+          'emane_configuration': {'nem': {'transport': 'transvirtual', 'mac': 'rfpipe',
+                                          'phy': 'precomputed'},
+                                  'rfpipe': {'datarate': '48K'},
+                                  'precomputed': {'bandwidth': '30M'}}}
+
+
+@pytest.fixture
+def templates(tmpdir):
+    """
+    Copies the templates to tmpdir, the tests generating configurations run in tmpdir.
+    """
+    shutil.copytree(os.path.join(REPOSITORY_DIRECTORY, 'templates'), str(tmpdir.join('templates')))
+
+
+@pytest.fixture
+def topology_config(tmpdir):
+    """
+    Returns a function writing a generated topology of num_nodes nodes to tmpdir and returning
+    the test configuration of it, updated with the given options.
+    """
+    pytest.importorskip('emane.events')
+    from emane_docker.benchmark import generate_topology
+
+    def write(num_nodes=4, **config):
+        topology_file = str(tmpdir.join('topology.yaml'))
+        with open(topology_file, 'w') as f:
+            yaml.safe_dump(generate_topology(num_nodes, seed=1), f)
+        return dict(CONFIG, topology_file=topology_file, **config)
+    return write
+
+
+@pytest.fixture
+def create_topology(templates, topology_config):
+    """
+    Returns a function creating a BenchmarkTopology of num_nodes nodes with the test
+    configuration, updated with the given options. The containers are run by docker_client,
+    a new FakeDockerClient by default.
+    """
+    from emane_docker.benchmark import BenchmarkTopology, FakeDockerClient, FakeRedis
+
+    def create(num_nodes=4, docker_client=None, **config):
+        return BenchmarkTopology(config=topology_config(num_nodes, **config),
+                                 docker_client=docker_client or FakeDockerClient(),
+                                 redis_class=FakeRedis)
+    return create
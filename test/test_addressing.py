@@ -0,0 +1,61 @@
+#!/usr/bin/env/ python3
+
+import pytest
+
+from emane_docker.addressing import AddressAllocator
+
+
+@pytest.mark.general
+def test_link_addresses():
+    allocator = AddressAllocator(link_pool='1.0.0.0/8', link_prefix_length=30)
+    assert allocator.link_addresses(0) == ('1.0.0.1', '1.0.0.2')
+    assert allocator.link_addresses(1) == ('1.0.0.5', '1.0.0.6')
+    assert allocator.link_addresses(allocator.max_links - 1) == ('1.255.255.253', '1.255.255.254')
+    with pytest.raises(ValueError):
+        allocator.link_addresses(allocator.max_links)
+
+
+@pytest.mark.general
+def test_link_addresses_31():
+    allocator = AddressAllocator(link_pool='1.0.0.0/8', link_prefix_length=31)
+    assert allocator.link_addresses(0) == ('1.0.0.0', '1.0.0.1')
+    assert allocator.link_addresses(300) == ('1.0.2.88', '1.0.2.89')
+    assert allocator.max_links == 1 << 23
+
+
+@pytest.mark.general
+def test_nem_addresses():
+    allocator = AddressAllocator(nem_pool='10.100.0.0/16')
+    assert allocator.nem_address(1) == '10.100.0.1'
+    assert allocator.nem_address(300) == '10.100.1.44'
+    assert allocator.nem_id('10.100.1.44') == 300
+    assert allocator.nem_id('10.101.0.1') is None
+    assert allocator.nem_netmask == '255.255.0.0'
+    with pytest.raises(ValueError):
+        allocator.nem_address(allocator.max_nems + 1)
+
+
+@pytest.mark.general
+def test_from_config():
+    allocator = AddressAllocator.from_config({'addressing': {'link_prefix_length': 31}})
+    assert allocator.link_prefix_length == 31
+    assert allocator.nem_address(1) == '10.100.0.1'
+    with pytest.raises(ValueError):
+        AddressAllocator.from_config({'addressing': {'link_prefix_length': 24}})
+
+
+@pytest.mark.general
+def test_numeric_names():
+    allocator = AddressAllocator()
+    assert allocator.uses_numeric_names(['1', '7', '255'])
+    assert not allocator.uses_numeric_names(['1', 'node-2'])
+    assert not allocator.uses_numeric_names(['1', '256'])
+    assert not allocator.uses_numeric_names([])
+    # The node with the lower name gets .1, as with the link order of either node.
+    assert allocator.numeric_link_address_ints('3', '7') == (0x01030701, 0x01030702)
+    assert allocator.numeric_link_address_ints('7', '3') == (0x01030702, 0x01030701)
+
+    assert not AddressAllocator(numeric_names=False).uses_numeric_names(['1', '2'])
+    assert not AddressAllocator(link_pool='1.0.0.0/16').uses_numeric_names(['1', '2'])
+    with pytest.raises(ValueError):
+        AddressAllocator(link_pool='1.0.0.0/16', numeric_names=True)
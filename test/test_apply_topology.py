@@ -0,0 +1,97 @@
+#!/usr/bin/env/ python3
+
+import pytest
+import yaml
+
+pytest.importorskip('emane.events')
+
+from emane_docker.benchmark import FakeDockerClient, FakeRedis  # noqa: E402
+from emane_docker.benchmark import BenchmarkTopology, generate_topology  # noqa: E402
+from emane_docker.topology import Link  # noqa: E402
+
+CONFIG = {'control_planes': ['ospf'], 'platform': 'docker', 'docker_image': 'fake',
+          'redis_wait_time': 0, 'topology_cache': False}
+
+
+class RecordingPublisher:
+    def __init__(self):
+        self.updates = []
+
+    def publish_pathloss(self, updates):
+        self.updates.append(updates)
+
+
+def set_neighbors(topology, name, neighbors):
+    for domain_nodes in topology['nodes'].values():
+        for node in domain_nodes:
+            if node['name'] == name:
+                node['neighbors'] = neighbors
+
+
+@pytest.mark.general
+def test_apply_topology(tmpdir):
+    topology = generate_topology(6, degree=2, seed=1)
+    topology_file = str(tmpdir.join('topology.yaml'))
+    with open(topology_file, 'w') as f:
+        yaml.safe_dump(topology, f)
+    emane_topology = BenchmarkTopology(config=dict(CONFIG, topology_file=topology_file),
+                                       docker_client=FakeDockerClient(), redis_class=FakeRedis)
+    nodes = emane_topology.nodes
+    node1 = nodes['node-1']
+    removed = node1.links[0]
+    neighbor = removed.node2 if removed.node1 is node1 else removed.node1
+    num_links = len(emane_topology.links)
+
+    # node-1 loses a neighbor and gains a node it was not connected to.
+    new_neighbor = next(node for node in sorted(nodes.values(), key=lambda node: node.index)
+                        if node is not node1 and node.name not in node1.neighbors)
+    set_neighbors(topology, node1.name, [name for name in node1.neighbors
+                                         if name != neighbor.name] + [new_neighbor.name])
+    set_neighbors(topology, neighbor.name, [name for name in neighbor.neighbors
+                                            if name != node1.name])
+    new_topology_file = str(tmpdir.join('new.yaml'))
+    with open(new_topology_file, 'w') as f:
+        yaml.safe_dump(topology, f)
+
+    publisher = RecordingPublisher()
+    assert emane_topology.apply_topology(new_topology_file, publisher=publisher) == 0
+    assert removed.status == Link.DOWN
+    assert len(emane_topology.links) == num_links + 1
+    added = emane_topology.links[-1]
+    assert added.status == Link.UP and added.contains(node1, new_neighbor)
+    assert added.node1_ipv4 is not None
+    assert publisher.updates == [{
+        node1.nem_id: [(new_neighbor.nem_id, 0), (neighbor.nem_id, 200)],
+        new_neighbor.nem_id: [(node1.nem_id, 0)],
+        neighbor.nem_id: [(node1.nem_id, 200)]}]
+
+    # Applying the original topology brings the removed link up again, without a new link.
+    publisher = RecordingPublisher()
+    assert emane_topology.apply_topology(topology_file, publisher=publisher) == 0
+    assert removed.status == Link.UP and added.status == Link.DOWN
+    assert len(emane_topology.links) == num_links + 1
+    assert neighbor.name in node1.neighbors and new_neighbor.name not in node1.neighbors
+
+    topology['nodes'][next(iter(topology['nodes']))].append(
+        {'name': 'node-7', 'neighbors': [], 'is_border': False})
+    with open(new_topology_file, 'w') as f:
+        yaml.safe_dump(topology, f)
+    assert emane_topology.apply_topology(new_topology_file, publisher=publisher) == -1
+
+
+@pytest.mark.general
+def test_numeric_node_names(tmpdir):
+    topology = {'nodes': {'domain-1': [
+        {'name': '3', 'is_border': True, 'neighbors': ['7', '12']},
+        {'name': '7', 'is_border': False, 'neighbors': ['3']},
+        {'name': '12', 'is_border': False, 'neighbors': ['3']}]}}
+    topology_file = str(tmpdir.join('topology.yaml'))
+    with open(topology_file, 'w') as f:
+        yaml.safe_dump(topology, f)
+    emane_topology = BenchmarkTopology(config=dict(CONFIG, topology_file=topology_file),
+                                       docker_client=FakeDockerClient(), redis_class=FakeRedis)
+    addresses = {(link.node1.name, link.node2.name): (link.node1_ipv4, link.node2_ipv4, link.mask1)
+                 for link in emane_topology.links}
+    assert addresses[('3', '7')] == ('1.3.7.1', '1.3.7.2', 30)
+    # The nodes are indexed by name, so node 12 is the first node of its link but gets .2.
+    assert addresses[('12', '3')] == ('1.3.12.2', '1.3.12.1', 30)
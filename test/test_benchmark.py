@@ -0,0 +1,28 @@
+#!/usr/bin/env/ python3
+
+import pytest
+
+pytest.importorskip('emane.events')
+
+from emane_docker.benchmark import generate_topology, run_benchmark  # noqa: E402
+
+
+@pytest.mark.general
+def test_generate_topology_is_symmetric():
+    topology = generate_topology(50, degree=4, seed=1)
+    neighbors = {node['name']: set(node['neighbors'])
+                 for domain in topology['nodes'].values() for node in domain}
+    assert len(neighbors) == 50
+    for name, node_neighbors in neighbors.items():
+        for neighbor in node_neighbors:
+            assert name in neighbors[neighbor]
+
+
+@pytest.mark.general
+def test_run_benchmark(tmpdir, templates, topology_config):
+    with tmpdir.as_cwd():
+        results = run_benchmark(20, config=topology_config(20), seed=1)
+    assert [result['phase'] for result in results] == [
+        'load_topology', 'generate_configs', 'start', 'connect_redis_clients', 'stop']
+    assert all(result['error'] is None for result in results)
+    assert all(result['nodes'] == 20 for result in results)
@@ -0,0 +1,57 @@
+#!/usr/bin/env/ python3
+
+from types import SimpleNamespace
+
+import pytest
+
+from emane_docker.churn import LinkChurnEngine
+from emane_docker.rng import RandomStreams
+
+
+def make_links(num_links):
+    links = []
+    for index in range(num_links):
+        node1 = SimpleNamespace(name='node-%d' % (2 * index), nem_id=2 * index + 1)
+        node2 = SimpleNamespace(name='node-%d' % (2 * index + 1), nem_id=2 * index + 2)
+        links.append(SimpleNamespace(id=index, node1=node1, node2=node2, UP=1, DOWN=0, status=1))
+    return links
+
+
+@pytest.mark.general
+def test_churn_transitions():
+    links = make_links(500)
+    engine = LinkChurnEngine(links, mean=2.0, variance=0.25, duration=20.0,
+                             random_streams=RandomStreams(seed=3))
+    transitions = [(event_time, link.id, link.status) for event_time, link in engine.transitions()]
+    times = [event_time for event_time, _, _ in transitions]
+    assert times == sorted(times) and times[-1] <= 20.0
+    # About 20 / 2 transitions per link, alternating between down and up.
+    assert 8 * 500 < len(transitions) < 12 * 500
+    statuses = [status for _, link_id, status in transitions if link_id == 7]
+    assert statuses == [0, 1] * (len(statuses) // 2) + [0] * (len(statuses) % 2)
+    assert [link.status for link in links] == [
+        [status for _, link_id, status in transitions if link_id == link.id][-1]
+        for link in links]
+
+    # Each link samples from its own stream, so a subset of links has the same transitions.
+    subset = make_links(10)
+    engine = LinkChurnEngine(subset, mean=2.0, variance=0.25, duration=20.0,
+                             random_streams=RandomStreams(seed=3))
+    assert [(event_time, link.id, link.status) for event_time, link in engine.transitions()] == [
+        transition for transition in transitions if transition[1] < 10]
+
+
+@pytest.mark.general
+def test_churn_export_eel():
+    links = make_links(2)
+    engine = LinkChurnEngine(links, mean=1.0, variance=0.0, duration=2.5,
+                             random_streams=RandomStreams(seed=3))
+    lines = [line for _, line in engine.export_eel(offset=1.0)]
+    assert lines[:4] == ['2.000000 nem:1 pathloss nem:2,200\n',
+                         '2.000000 nem:2 pathloss nem:1,200\n',
+                         '2.000000 nem:3 pathloss nem:4,200\n',
+                         '2.000000 nem:4 pathloss nem:3,200\n']
+    assert len(lines) == 8
+    assert [link.status for link in links] == [1, 1]
+    with pytest.raises(ValueError):
+        LinkChurnEngine(links, mean=0.0, variance=1.0, duration=1.0)
@@ -0,0 +1,62 @@
+#!/usr/bin/env/ python3
+
+import io
+import os
+import tarfile
+
+import pytest
+
+from emane_docker.config_bundle import ConfigBundle, ConfigBundleWriter, index_file
+from emane_docker.config_bundle import pack_directory, pack_files
+
+
+def archive_files(data):
+    with tarfile.open(fileobj=io.BytesIO(data), mode='r') as tar:
+        return {member.name: tar.extractfile(member).read() for member in tar.getmembers()}
+
+
+@pytest.mark.general
+def test_config_bundle(tmpdir):
+    bundle_file = str(tmpdir.join('configs.tar'))
+    with ConfigBundleWriter(bundle_file) as bundle:
+        for index in range(3):
+            node_directory = tmpdir.mkdir('node-%d' % index)
+            node_directory.join('zebra.conf').write('hostname node-%d\n' % index)
+            node_directory.mkdir('emane').join('nem.xml').write('<nem/>')
+            bundle.add('node-%d' % index, pack_directory(str(node_directory)))
+
+    for with_index in (True, False):
+        if not with_index:
+            os.remove(index_file(bundle_file))
+        bundle = ConfigBundle(bundle_file)
+        assert len(bundle) == 3 and 'node-1' in bundle
+        assert archive_files(bundle.read('node-1')) == {'emane/nem.xml': b'<nem/>',
+                                                        'zebra.conf': b'hostname node-1\n'}
+    assert archive_files(pack_files({'mgen.in': b'0.0 LISTEN UDP 5001\n'})) == {
+        'mgen.in': b'0.0 LISTEN UDP 5001\n'}
+
+
+@pytest.mark.general
+def test_bundle_delivery(tmpdir, create_topology):
+    with tmpdir.as_cwd():
+        emane_topology = create_topology(4, no_cli=True, namespace='bundle',
+                                         config_delivery='bundle')
+        docker_client = emane_topology.docker_client
+        assert emane_topology.start() == 0
+        # Only the bundle is written, there are no node configuration directories.
+        assert sorted(os.listdir(emane_topology.config_directory)) == [
+            'configs.tar', 'configs.tar.index']
+        for name, container in emane_topology.containers.items():
+            assert container.status == 'running'
+            path, data = container.archives[0]
+            assert path == '/etc/quagga'
+            files = archive_files(data)
+            assert {'zebra.conf', 'ospfd.conf', 'platform.xml'} <= set(files)
+            assert container.archives[1][0] == '/etc/telegraf'
+            container.put_archive('/etc/quagga', pack_files({'mgen.out': name.encode()}))
+        # The outputs are copied back before the containers are removed.
+        emane_topology.stop()
+        for name in emane_topology.nodes:
+            with open('%s/%s/mgen.out' % (emane_topology.config_directory, name), 'rb') as f:
+                assert f.read() == name.encode()
+    assert not docker_client.containers.containers
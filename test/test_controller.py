@@ -1,9 +1,49 @@
 #!/usr/bin/env/ python3
 
+from types import SimpleNamespace
+
 import pytest
 
+pytest.importorskip('emane.events')
+
+from emane_docker.controller import ExperimentController  # noqa: E402
+
 
 @pytest.mark.general
 def test_init():
     x = 5
     assert x == 5
+
+
+@pytest.mark.general
+def test_run_experiment_event_mode():
+    config = {'experiment': {'enabled': True, 'event_mode': 'eeL'}}
+    controller = ExperimentController(SimpleNamespace(config=config))
+    assert controller.run_experiment() == -1
+    config['experiment']['enabled'] = False
+    assert controller.run_experiment() == 0
+
+
+@pytest.mark.general
+def test_finish_eel_experiment(tmpdir):
+    class FakeCollector:
+        def __init__(self):
+            self.reports = []
+
+        def stop(self):
+            pass
+
+        def write_report(self, path):
+            self.reports.append(path)
+
+    collector = FakeCollector()
+    collected = []
+    emane_topology = SimpleNamespace(config={}, config_directory=str(tmpdir),
+                                     collect_outputs=lambda: collected.append(True))
+    controller = ExperimentController(emane_topology)
+    controller.live_collector = collector
+    controller.finish_eel_experiment(0.0)
+    # The report is written once, release() and stop() stop the collector again.
+    controller.stop_live_collector()
+    assert collector.reports == ['%s/live_results.json' % tmpdir]
+    assert controller.live_collector is None and collected == [True]
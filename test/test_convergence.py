@@ -0,0 +1,73 @@
+#!/usr/bin/env/ python3
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from emane_docker.convergence import ConvergenceProbe, ProbedPublisher
+
+NODES = {'node-%d' % index: SimpleNamespace(name='node-%d' % index, index=index)
+         for index in range(3)}
+
+
+def tables(*routes):
+    return {'node-%d' % index: frozenset(node_routes) for index, node_routes in enumerate(routes)}
+
+
+@pytest.mark.general
+def test_convergence_times():
+    probe = ConvergenceProbe(NODES, exec_run=None, control_plane='ospf', stable_time=2.0,
+                             timeout=10.0)
+    probe.observe(tables(['a'], ['b'], ['c']), 0.0)
+    probe.record_event('first', event_time=1.0)
+    probe.observe(tables(['a'], ['b'], ['c']), 1.5)
+    probe.observe(tables(['a', 'x'], ['b'], ['c']), 2.0)
+    probe.observe(tables(['a', 'x'], ['b', 'x'], ['c']), 2.5)
+    probe.observe(tables(['a', 'x'], ['b', 'x'], ['c']), 4.0)
+    assert probe.pending
+    probe.observe(tables(['a', 'x'], ['b', 'x'], ['c']), 4.5)
+    assert not probe.pending
+    assert probe.results == [{'description': 'first', 'convergence_time': 1.5, 'changed_nodes': 2,
+                              'overlapped': False, 'timed_out': False}]
+
+    # An update without routing changes converges immediately.
+    probe.record_event('second', event_time=5.0)
+    probe.observe(tables(['a', 'x'], ['b', 'x'], ['c']), 7.0)
+    assert probe.results[-1]['convergence_time'] == 0.0
+
+    # Overlapping updates share the later changes, a flapping table times out.
+    probe.record_event('third', event_time=8.0)
+    probe.record_event('fourth', event_time=8.5)
+    for step in range(12):
+        probe.observe(tables(['a'], ['b'], ['c', str(step)]), 9.0 + step)
+    assert [(result['description'], result['overlapped'], result['timed_out'])
+            for result in probe.results[2:]] == [('third', True, True), ('fourth', False, True)]
+    summary = probe.summary()
+    assert summary['updates'] == 4 and summary['converged'] == 2 and summary['timed_out'] == 2
+    assert summary['max'] == 1.5
+
+
+@pytest.mark.general
+def test_convergence_probe(tmpdir):
+    routes = {name: [b'10.0.0.0/30 dev emane0'] for name in NODES}
+
+    def exec_run(node, cmd):
+        return SimpleNamespace(exit_code=0, output=b'\n'.join(routes[node.name]))
+
+    class Publisher:
+        def publish_pathloss(self, updates):
+            routes['node-1'].append(b'10.0.0.4/30 via 10.0.0.2 dev emane0')
+
+    probe = ConvergenceProbe(NODES, exec_run=exec_run, control_plane='ospf', poll_interval=0.01,
+                             stable_time=0.1, timeout=1.0)
+    probe.start()
+    ProbedPublisher(Publisher(), probe).publish_pathloss({1: [(2, 200)], 2: [(1, 200)]})
+    probe.stop()
+    assert len(probe.results) == 1
+    assert probe.results[0]['description'] == '2 pathloss updates'
+    assert probe.results[0]['changed_nodes'] == 1 and not probe.results[0]['timed_out']
+    report_file = str(tmpdir.join('convergence.json'))
+    probe.write_report(report_file)
+    with open(report_file) as f:
+        assert json.load(f)['ospf']['summary']['converged'] == 1
@@ -0,0 +1,33 @@
+#!/usr/bin/env/ python3
+
+import pytest
+
+from emane_docker.eel import convert_record, link_update_lines, pathloss_line, write_eel
+
+
+@pytest.mark.general
+def test_pathloss_line():
+    line = pathloss_line(1.5, 3, [(1, 0), (2, 200)])
+    assert line == '1.500000 nem:3 pathloss nem:1,0 nem:2,200\n'
+
+
+@pytest.mark.general
+def test_write_eel_merges_streams(tmpdir):
+    eel_file = str(tmpdir.join('scenario.eel'))
+    updates = link_update_lines([(0.5, 1, 2, 200), (2.0, 2, 3, 0)], offset=1.0)
+    other = [(0.0, '0.000000 nem:1 pathloss nem:2,0\n'), (2.0, '2.000000 nem:3 pathloss nem:1,0\n')]
+    assert write_eel(eel_file, updates, other) == 6
+    times = [float(line.split()[0]) for line in open(eel_file)]
+    assert times == sorted(times)
+    assert times[0] == 0.0 and times[-1] == 3.0
+
+
+@pytest.mark.general
+def test_convert_record(tmpdir):
+    record_file = tmpdir.join('events.record')
+    record_file.write('0.250000 1 2 200\n0.100000 3 4 0\n')
+    eel_file = str(tmpdir.join('replay.eel'))
+    assert convert_record(str(record_file), eel_file) == 4
+    assert open(eel_file).read().splitlines() == [
+        '0.100000 nem:3 pathloss nem:4,0', '0.100000 nem:4 pathloss nem:3,0',
+        '0.250000 nem:1 pathloss nem:2,200', '0.250000 nem:2 pathloss nem:1,200']
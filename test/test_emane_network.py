@@ -0,0 +1,95 @@
+#!/usr/bin/env/ python3
+
+from types import SimpleNamespace
+
+import docker
+import pytest
+
+from emane_docker.emane_network import EmaneNetwork
+from emane_docker.ota_benchmark import OtaBenchmark
+
+
+class FakeNetworks:
+    def __init__(self, status_code=None, existing=None):
+        self.created = []
+        self.removed = []
+        self.status_code = status_code
+        self.existing = existing
+
+    def get(self, name):
+        if self.existing is None:
+            raise docker.errors.NotFound('No such network: %s' % name)
+        return SimpleNamespace(attrs=self.existing, remove=lambda: self.removed.append(name))
+
+    def create(self, name, **kwargs):
+        if self.status_code is not None:
+            response = SimpleNamespace(status_code=self.status_code, reason='', url='')
+            raise docker.errors.APIError('error', response=response)
+        self.created.append((name, kwargs))
+
+
+@pytest.mark.general
+def test_network_options():
+    config = {'network': {'mtu': 9000, 'event_device': 'shim0'}}
+    client = SimpleNamespace(networks=FakeNetworks())
+    network = EmaneNetwork.from_config(config, client, name='emanenode0', bridge='emane0',
+                                       subnet='10.99.0.100/24')
+    assert network.create() == 0
+    name, kwargs = client.networks.created[0]
+    assert name == 'emanenode0' and kwargs['driver'] == 'bridge'
+    assert kwargs['options'] == {'com.docker.network.bridge.name': 'emane0',
+                                 'com.docker.network.driver.mtu': '9000'}
+    assert kwargs['ipam']['Config'][0]['Subnet'] == '10.99.0.100/24'
+    assert network.event_device == 'shim0'
+
+    macvlan = EmaneNetwork(client, 'emanenode0', 'emane0', '10.99.0.100/24', driver='macvlan',
+                           parent='eth1', event_device='shim0')
+    assert macvlan.options() == {'parent': 'eth1'} and macvlan.event_device == 'shim0'
+    # The host does not reach the macvlan nodes through the parent.
+    with pytest.raises(ValueError):
+        EmaneNetwork(client, 'emanenode0', 'emane0', '10.99.0.100/24', driver='macvlan',
+                     parent='eth1')
+    with pytest.raises(ValueError):
+        EmaneNetwork(client, 'emanenode0', 'emane0', '10.99.0.100/24', driver='ipvlan')
+    with pytest.raises(ValueError):
+        EmaneNetwork(client, 'emanenode0', 'emane0', '10.99.0.100/24', driver='overlay')
+    assert EmaneNetwork(SimpleNamespace(networks=FakeNetworks(500)), 'emanenode0', 'emane0',
+                        '10.99.0.100/24').create() == -1
+
+
+@pytest.mark.general
+def test_existing_network():
+    attrs = {'Driver': 'bridge', 'IPAM': {'Config': [{'Subnet': '10.99.0.0/24'}]},
+             'Options': {'com.docker.network.bridge.name': 'emane0'}, 'Containers': {}}
+    # A network with the same settings is reused.
+    networks = FakeNetworks(existing=attrs)
+    network = EmaneNetwork(SimpleNamespace(networks=networks), 'emanenode0', 'emane0',
+                           '10.99.0.100/24')
+    assert network.create() == 0 and not networks.created and not networks.removed
+
+    # Otherwise it is created again, unless it is in use.
+    network = EmaneNetwork(SimpleNamespace(networks=networks), 'emanenode0', 'emane0',
+                           '10.99.0.100/24', mtu=9000)
+    assert network.create() == 0
+    assert networks.removed == ['emanenode0'] and len(networks.created) == 1
+    networks = FakeNetworks(existing=dict(attrs, Containers={'id': {}}))
+    network = EmaneNetwork(SimpleNamespace(networks=networks), 'emanenode0', 'emane0',
+                           '10.98.0.100/24')
+    assert network.create() == -1 and not networks.removed
+
+
+@pytest.mark.general
+def test_ota_benchmark_summary():
+    nodes = {'node-%d' % index: SimpleNamespace(name='node-%d' % index, index=index)
+             for index in range(4)}
+    benchmark = OtaBenchmark(nodes, exec_run=None, senders=2, duration=2.0, payload_size=1000)
+    assert [node.name for node in benchmark.senders] == ['node-0', 'node-1']
+    summary = benchmark.summarize(
+        sent=[{'packets': 100, 'bytes': 100000}, {'packets': 100, 'bytes': 100000}],
+        received=[{'packets': 200, 'bytes': 200000}, {'packets': 150, 'bytes': 150000}])
+    assert summary['offered_bps'] == 800000
+    assert summary['mean_received_bps'] == 700000 and summary['min_received_bps'] == 600000
+    assert summary['mean_loss'] == 0.125 and summary['max_loss'] == 0.25
+    command = benchmark.command('print(1)', 3.0, '/tmp/out.json', 1000, 0)
+    assert command[:2] == ['sh', '-c']
+    assert command[2].endswith("'print(1)' 224.1.2.9 45704 3.0 1000 0 > /tmp/out.json 2>&1")
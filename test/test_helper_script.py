@@ -0,0 +1,31 @@
+#!/usr/bin/env/ python3
+
+import subprocess
+
+import pytest
+
+from emane_docker.helper_script import HelperStep, helper_script, parse_helper_output
+
+
+@pytest.mark.general
+def test_helper_script(tmpdir):
+    log_file = str(tmpdir.join('helpers.log'))
+    script = helper_script([HelperStep('first', "echo 'first step'"),
+                            HelperStep('failing', 'exit 3'),
+                            HelperStep('daemon', 'sleep 0.1; echo daemon', background=True)],
+                           log_file=log_file)
+    output = subprocess.run(['sh', '-c', script], stdout=subprocess.PIPE, check=True).stdout
+    steps = parse_helper_output(output.decode())
+    assert [(name, status) for name, status, _ in steps] == [
+        ('first', 0), ('failing', 3), ('daemon', 0)]
+    assert all(duration is None or duration >= 0 for _, _, duration in steps)
+    # Step outputs go to the log file, not to the exec response.
+    assert 'first step' not in output.decode()
+    with open(log_file) as f:
+        assert f.read() == 'first step\n'
+
+
+@pytest.mark.general
+def test_parse_helper_output():
+    output = 'noise\n@@helper-step emane 1 100 2000000100\n@@helper-step fpm 0 %sN %sN\n'
+    assert parse_helper_output(output) == [('emane', 1, 2.0), ('fpm', 0, None)]
@@ -0,0 +1,120 @@
+#!/usr/bin/env/ python3
+
+import json
+from collections import namedtuple
+from types import SimpleNamespace
+
+import pytest
+
+from emane_docker.iperf_workload import IperfWorkload, parse_iperf_result
+from emane_docker.traffic_matrix import TrafficMatrix
+
+ExecResult = namedtuple('ExecResult', ['exit_code', 'output'])
+
+
+def iperf_output(command):
+    intervals = [{'sum': {'start': float(i), 'end': float(i + 1), 'bits_per_second': 1e6}}
+                 for i in range(3)]
+    if '--udp' in command:
+        end = {'sum': {'bits_per_second': 1e6, 'lost_percent': 2.5, 'jitter_ms': 0.3}}
+    else:
+        end = {'sum_sent': {'bits_per_second': 1.1e6, 'retransmits': 4},
+               'sum_received': {'bits_per_second': 1e6}}
+    return json.dumps({'intervals': intervals, 'end': end}).encode()
+
+
+class FakeExec:
+    def __init__(self, failing=()):
+        self.commands = []
+        self.files = {}
+        self.failing = failing
+
+    def __call__(self, node, command, detach=False):
+        self.commands.append((node.name, command))
+        if command[0] == 'sh':
+            # Detached clients write their results to a file.
+            assert detach
+            if node.name in self.failing:
+                raise RuntimeError('exec failed')
+            remove, client = command[2].split(' > ')[0].split('; ')
+            result_file = command[2].split()[-2]
+            assert remove == 'rm -f %s' % result_file
+            self.files[(node.name, result_file)] = iperf_output(client.split())
+        elif command[0] == 'cat':
+            return ExecResult(exit_code=0, output=self.files[(node.name, command[1])])
+        return ExecResult(exit_code=None if detach else 0, output=b'')
+
+
+def make_nodes(count, domain=lambda index: 'domain-1'):
+    return {'node-%d' % index: SimpleNamespace(name='node-%d' % index, nem_id=index,
+                                               nem_ipv4='10.100.0.%d' % index,
+                                               domain=domain(index), neighbors=[])
+            for index in range(1, count + 1)}
+
+
+@pytest.mark.general
+@pytest.mark.parametrize('protocol', ['tcp', 'udp'])
+def test_iperf_workload(tmpdir, monkeypatch, protocol):
+    monkeypatch.setattr('emane_docker.constant.Constant.IPERF_SERVER_WAIT_TIME', 0)
+    monkeypatch.setattr('emane_docker.constant.Constant.IPERF_RESULT_WAIT_TIME', 0)
+    nodes = make_nodes(7)
+    exec_run = FakeExec()
+    workload = IperfWorkload(nodes, exec_run, duration=0, protocol=protocol,
+                             config_directory=str(tmpdir))
+    pairs = workload.pairs()
+    assert [client.nem_id for client, _, _ in pairs] == [1, 3, 5, 7]
+    assert all(server.nem_id % 2 == 0 for _, server, _ in pairs)
+    # Clients of the same server use different ports.
+    assert len({(server.name, port) for _, server, port in pairs}) == len(pairs)
+
+    results = workload.start()
+    servers = [command for _, command in exec_run.commands if '--server' in command]
+    assert len(servers) == 4 and len(exec_run.files) == 4
+    assert all(tuple(result['result']['intervals'][0]) == (0.0, 1.0, 1e6) for result in results)
+    with open(str(tmpdir.join('iperf.json'))) as f:
+        assert len(json.load(f)) == 4
+    assert len(tmpdir.join('iperf').listdir()) == 4
+
+    from emane_docker.result_report import IperfReport
+    summary = IperfReport(config_directory=str(tmpdir)).summary()
+    assert summary['completed'] == 4 and summary['total_bits_per_second'] == 4e6
+
+
+@pytest.mark.general
+def test_iperf_failed_client(tmpdir, monkeypatch):
+    monkeypatch.setattr('emane_docker.constant.Constant.IPERF_SERVER_WAIT_TIME', 0)
+    monkeypatch.setattr('emane_docker.constant.Constant.IPERF_RESULT_WAIT_TIME', 0)
+    exec_run = FakeExec(failing=('node-1',))
+    workload = IperfWorkload(make_nodes(4), exec_run, duration=0, config_directory=str(tmpdir))
+    # The result file of a previous run is not read for a client that cannot start.
+    for _, server, port in workload.pairs():
+        exec_run.files[('node-1', '/tmp/iperf-%s-%d.json' % (server.name, port))] = b'{}'
+    results = workload.start()
+    assert [result['result'] is None for result in results] == [True, False]
+    assert not any(command[0] == 'cat' for name, command in exec_run.commands
+                   if name == 'node-1')
+
+
+@pytest.mark.general
+def test_iperf_matrix():
+    nodes = make_nodes(6, domain=lambda index: 'domain-%d' % (1 + (index > 4)))
+    config = {'experiment': {'duration': 3, 'traffic': {
+        'type': 'tcp', 'matrix': {'mode': 'hotspot', 'hotspots': ['node-6'],
+                                  'hotspot_fraction': 1.0,
+                                  'roles': {'domain-1': 'client', 'domain-2': 'server'}}}}}
+    workload = IperfWorkload.from_config(config, nodes, FakeExec())
+    pairs = workload.pairs()
+    assert [client.nem_id for client, _, _ in pairs] == [1, 2, 3, 4]
+    assert [(server.name, port) for _, server, port in pairs] == [
+        ('node-6', 5201), ('node-6', 5202), ('node-6', 5203), ('node-6', 5204)]
+    with pytest.raises(ValueError):
+        IperfWorkload(nodes, FakeExec(), duration=3, matrix=TrafficMatrix(
+            nodes, roles={'domain-1': 'client', 'domain-2': 'client'})).pairs()
+
+
+@pytest.mark.general
+def test_parse_iperf_result():
+    assert parse_iperf_result('not json') is None
+    assert parse_iperf_result(json.dumps({'error': 'unable to connect to server'})) is None
+    result = parse_iperf_result(iperf_output(['--udp']).decode())
+    assert result['lost_percent'] == 2.5 and len(result['intervals']) == 3
@@ -0,0 +1,113 @@
+#!/usr/bin/env/ python3
+
+import json
+import subprocess
+from collections import namedtuple
+from types import SimpleNamespace
+
+import pytest
+
+from emane_docker.live_results import LiveCollector, parse_recv_line
+
+ExecResult = namedtuple('ExecResult', ['exit_code', 'output'])
+
+
+def recv_line(flow_id, seq, size=600):
+    return ('12:00:01.250000 RECV proto>UDP flow>%d seq>%d src>10.100.0.1/5001 '
+            'dst>10.100.0.2/5001 sent>12:00:01.240000 size>%d\n' % (flow_id, seq, size))
+
+
+@pytest.mark.general
+def test_parse_recv_line():
+    assert parse_recv_line(recv_line(3, 41, 512)) == (3, 41, 512)
+    assert parse_recv_line('12:00:00.000000 LISTEN proto>UDP port>5001') is None
+    assert parse_recv_line('12:00:00.000000 RECV proto>UDP flow>x') is None
+    assert parse_recv_line('') is None
+
+
+@pytest.mark.general
+def test_live_results_from_files(tmpdir):
+    node = SimpleNamespace(name='node-2', nem_id=2)
+    output = tmpdir.mkdir('node-2').join('mgen.out')
+    # Flow 1 sends 10 packets per second from 0 to 100 s, flow 2 receives nothing.
+    flows = {1: ('node-1', '10.100.0.2', 10, 0.0, 100.0), 2: ('node-3', '10.100.0.2', 10, 0.0,
+                                                              100.0)}
+    aborted = []
+    collector = LiveCollector([node], flows=flows, schedule_start=1000.0,
+                              config_directory=str(tmpdir), poll_interval=1.0, window=2.0,
+                              abort_loss=0.4, abort_after=1.0,
+                              on_abort=lambda: aborted.append(True))
+    output.write('')
+    assert collector.read_output(node) == []
+    collector.observe([], 1010.0)
+    # A partial line is kept until it is complete.
+    output.write(''.join(recv_line(1, seq) for seq in range(20)) + recv_line(1, 20)[:30], 'a')
+    lines = collector.read_output(node)
+    assert len(lines) == 20
+    output.write(recv_line(1, 20)[30:], 'a')
+    lines += collector.read_output(node)
+    assert len(lines) == 21
+    collector.observe(lines, 1012.0)
+
+    summary = collector.summarize(1012.0)
+    assert summary['active_flows'] == 2 and summary['received_packets'] == 21
+    by_flow = {flow['flow']: flow for flow in summary['flows']}
+    assert by_flow[1]['loss'] == 0.0 and by_flow[2]['loss'] == 1.0
+    assert by_flow[1]['throughput_bps'] == pytest.approx(21 * 600 * 8 / 2.0)
+    assert summary['flows'][0]['flow'] == 2 and summary['loss'] == pytest.approx(0.5)
+    assert not collector.check_abort(summary)
+    summary['time'] += 1.0
+    assert collector.check_abort(summary) and aborted == [True]
+    assert 'loss 50.0%' in collector.format_summary(summary)
+
+    # Flows finished before the window are dropped.
+    collector.observe([], 1200.0)
+    collector.observe([], 1201.0)
+    collector.observe([], 1202.0)
+    assert collector.summarize(1202.0)['active_flows'] == 0 and not collector.stats
+    collector.write_report(str(tmpdir.join('live_results.json')))
+    with open(str(tmpdir.join('live_results.json'))) as f:
+        assert json.load(f)['aborted']['abort_loss'] == 0.4
+
+
+@pytest.mark.general
+def test_live_results_through_exec(tmpdir, monkeypatch):
+    monkeypatch.setattr('emane_docker.constant.Constant.CONTAINER_CONFIG_DIRECTORY', str(tmpdir))
+    node = SimpleNamespace(name='node-2', nem_id=2)
+    output = ''.join(recv_line(5, seq) for seq in (0, 1, 3))
+    tmpdir.join('mgen.out').write(output)
+
+    def exec_run(node, cmd):
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, check=False)
+        return ExecResult(exit_code=result.returncode, output=result.stdout)
+
+    collector = LiveCollector([node], exec_run=exec_run, poll_interval=1.0, window=2.0)
+    collector.observe([], 9.0)
+    collector.observe(collector.read_output(node), 10.0)
+    assert collector.read_output(node) == []
+    assert collector.offsets[node.name] == len(output)
+    collector.observe([], 11.0)
+    summary = collector.summarize(11.0)
+    # Without a schedule, the loss is estimated from the sequence numbers.
+    assert summary['received_packets'] == 3 and summary['flows'][0]['loss'] == 0.25
+    # Flows without a schedule are dropped after a window without packets.
+    collector.observe([], 12.0)
+    collector.observe([], 13.0)
+    assert collector.summarize(13.0)['active_flows'] == 0
+    # A restarted MGEN truncates its output, which is read again from the start.
+    tmpdir.join('mgen.out').write(recv_line(6, 0))
+    assert collector.read_output(node) == [recv_line(6, 0).rstrip('\n')]
+
+
+@pytest.mark.general
+def test_live_results_start_and_stop(tmpdir):
+    nodes = [SimpleNamespace(name='node-%d' % index, nem_id=index) for index in (2, 4)]
+    for node in nodes:
+        tmpdir.mkdir(node.name).join('mgen.out').write(recv_line(node.nem_id, 0))
+    collector = LiveCollector(nodes, config_directory=str(tmpdir), poll_interval=0.05,
+                              window=1.0, log_interval=0)
+    collector.start()
+    tmpdir.join('node-4', 'mgen.out').write(recv_line(4, 1), 'a')
+    collector.stop()
+    assert collector.received_packets == 3 and collector.last_summary['active_flows'] == 2
+    assert collector.thread is None and collector.threadpool is None
@@ -0,0 +1,67 @@
+#!/usr/bin/env/ python3
+
+import json
+import logging
+import queue
+
+import pytest
+
+from emane_docker import log
+from emane_docker.log import LOG, SampledLogger
+
+
+@pytest.mark.general
+def test_json_logger(tmpdir):
+    json_file = str(tmpdir.join('log.jsonl'))
+    log.add_json_logger(json_file)
+    try:
+        LOG.warning('Node %s is started.', 'node-1')
+        log.flush()
+        with open(json_file, 'r') as f:
+            entries = [json.loads(line) for line in f]
+        assert entries[-1]['level'] == 'WARNING'
+        assert entries[-1]['message'] == 'Node node-1 is started.'
+        try:
+            raise ValueError('bad link')
+        except ValueError:
+            LOG.exception('Link %s cannot be updated.', 'link-1')
+        log.flush()
+        with open(json_file, 'r') as f:
+            entries = [json.loads(line) for line in f]
+        assert entries[-1]['message'] == 'Link link-1 cannot be updated.'
+        assert entries[-1]['exception'].endswith('ValueError: bad link')
+    finally:
+        log.WRITER.handlers.pop().close()
+        log.WRITER.restart()
+
+
+@pytest.mark.general
+def test_dropping_queue_handler():
+    handler = log.DroppingQueueHandler(queue.Queue(1))
+    records = [logging.makeLogRecord({'msg': 'Event %d', 'args': (i,), 'levelno': logging.DEBUG})
+               for i in range(3)]
+    for record in records:
+        handler.handle(record)
+    assert handler.dropped == 2
+    assert handler.queue.get_nowait().msg == 'Event 0'
+
+
+@pytest.mark.general
+def test_sampled_logger():
+    records = []
+
+    class ListHandler(logging.Handler):
+        def emit(self, record):
+            records.append(record.getMessage())
+
+    logger = logging.getLogger('test_sampled_logger')
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(ListHandler())
+    sampled = SampledLogger(logger, max_per_second=1e-3)
+    for i in range(100):
+        sampled.debug('Event %d', i)
+    assert records == ['Event 0']
+    assert sampled.suppressed == 99
+    sampled.next_time = 0.0
+    sampled.debug('Event %d', 100)
+    assert records[-1] == 'Event 100 (99 similar messages suppressed)'
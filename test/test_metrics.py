@@ -0,0 +1,76 @@
+#!/usr/bin/env/ python3
+
+import json
+from urllib.request import urlopen
+
+import pytest
+
+from emane_docker.metrics import Registry
+
+
+@pytest.mark.general
+def test_counter_and_histogram():
+    registry = Registry()
+    events = registry.counter('events_total', 'Number of events')
+    events.inc(type='pathloss')
+    events.inc(2, type='pathloss')
+    events.inc(type='location')
+    assert registry.counter('events_total', 'Number of events') is events
+    assert events.value(type='pathloss') == 3
+
+    latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    @latency.time()
+    def timed():
+        return 1
+    assert timed() == 1
+    with latency.time():
+        pass
+    assert latency.count() == 5
+
+    text = registry.to_prometheus()
+    assert '# TYPE events_total counter' in text
+    assert 'events_total{type="pathloss"} 3.0' in text
+    assert 'latency_seconds_bucket{le="1.0"} 4' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 5' in text
+    assert 'latency_seconds_count 5' in text
+    with pytest.raises(ValueError):
+        registry.counter('latency_seconds', 'Latency')
+
+    registry.reset()
+    assert latency.count() == 0
+    assert events.value(type='pathloss') == 0
+
+
+@pytest.mark.general
+def test_gauge():
+    registry = Registry()
+    loss = registry.gauge('loss', 'Loss')
+    loss.set(0.5, flow=1)
+    loss.set(0.25, flow=1)
+    loss.set(1.0, flow=2)
+    assert loss.value(flow=1) == 0.25
+    loss.remove(flow=2)
+    assert loss.value(flow=2) is None
+    text = registry.to_prometheus()
+    assert '# TYPE loss gauge' in text and 'loss{flow="1"} 0.25' in text
+    assert 'flow="2"' not in text
+
+
+@pytest.mark.general
+def test_server_and_dump(tmpdir):
+    registry = Registry()
+    registry.counter('starts_total', 'Number of starts').inc()
+    port = registry.start_server(port=0)
+    try:
+        with urlopen('http://127.0.0.1:%d/metrics' % port) as response:
+            assert 'starts_total 1.0' in response.read().decode()
+    finally:
+        registry.stop_server()
+    dump_file = str(tmpdir.join('metrics.json'))
+    registry.dump(dump_file)
+    with open(dump_file, 'r') as f:
+        metrics = json.load(f)
+    assert metrics['starts_total']['samples'] == [{'labels': {}, 'value': 1}]
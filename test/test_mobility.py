@@ -0,0 +1,59 @@
+#!/usr/bin/env/ python3
+
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+from emane_docker.mobility import MAX_PATHLOSS, MobilityEngine, free_space_pathloss
+
+FakeNode = namedtuple('FakeNode', ['nem_id'])
+
+
+def make_nodes(count):
+    return {'node-%d' % i: FakeNode(nem_id=i) for i in range(1, count + 1)}
+
+
+@pytest.mark.general
+def test_free_space_pathloss():
+    # 100 m at 2.4 GHz is about 80 dB
+    assert abs(free_space_pathloss(np.array([100.0]), 2.4e9)[0] - 80.05) < 0.1
+
+
+@pytest.mark.general
+def test_trace_playback(tmpdir):
+    trace = tmpdir.join('trace.eel')
+    trace.write('0.0 nem:1 location gps 40.0,-74.0,0.0\n'
+                '0.0 nem:2 location gps 40.0,-74.0,0.0\n'
+                '10.0 nem:2 location gps 40.001,-74.0,0.0\n')
+    engine = MobilityEngine(make_nodes(2), str(trace), {'rate': 1, 'reference': [40, -74, 0]},
+                            duration=100)
+    assert list(engine.ticks())[-1] == 10.0
+
+    locations, updates = engine.step(0.0)
+    assert len(locations) == 2
+    assert set(updates) == {1, 2}
+
+    # Nothing moved, nothing is published
+    locations, updates = engine.step(0.0)
+    assert not locations and not updates
+
+    locations, updates = engine.step(5.0)
+    assert [location[0] for location in locations] == [2]
+    assert updates[1][0][0] == 2
+    assert updates[1][0][1] < MAX_PATHLOSS
+
+
+@pytest.mark.general
+def test_random_waypoint_stays_in_area():
+    engine = MobilityEngine(make_nodes(50), 'random_waypoint',
+                            {'random_waypoint': {'area': [100, 200], 'speed': [5, 50],
+                                                 'pause': 0.5}},
+                            duration=10, rng=np.random.default_rng(1))
+    for current_time in engine.ticks():
+        positions = engine.model.positions(current_time)
+        assert (positions[:, 0] >= 0).all() and (positions[:, 0] <= 100).all()
+        assert (positions[:, 1] >= 0).all() and (positions[:, 1] <= 200).all()
+    pathloss = engine.compute_pathloss(positions)
+    assert pathloss.shape == (50, 50)
+    assert np.allclose(pathloss, pathloss.T)
@@ -0,0 +1,52 @@
+#!/usr/bin/env/ python3
+
+import json
+import os
+
+import pytest
+import yaml
+
+pytest.importorskip('emane.events')
+
+
+@pytest.mark.general
+def test_node_targets(tmpdir, create_topology):
+    with tmpdir.as_cwd():
+        emane_topology = create_topology(200)
+        assert emane_topology.generate_monitoring_configs() == 0
+        with open('container_helpers/monitoring/targets/default.json', 'r') as f:
+            targets = json.load(f)
+        assert len(targets) == 200
+        assert targets[0]['targets'] == ['localhost:20000']
+        assert targets[199]['targets'] == ['localhost:20199']
+        assert targets[199]['labels']['nem_id'] == '200'
+        with open('container_helpers/monitoring/prometheus.yml', 'r') as f:
+            prometheus = yaml.safe_load(f)
+        assert prometheus['scrape_configs'][1]['file_sd_configs'][0]['files'] == [
+            'targets/*.json']
+
+
+@pytest.mark.general
+def test_aggregator_targets(tmpdir, create_topology):
+    with tmpdir.as_cwd():
+        emane_topology = create_topology(4, namespace='sw2', telegraf_port_base=22000,
+                                         monitoring={'mode': 'aggregator'})
+        assert emane_topology.generate_monitoring_configs() == 0
+        with open('container_helpers/monitoring/targets/sw2.json', 'r') as f:
+            assert json.load(f) == [{'targets': ['localhost:22000'],
+                                     'labels': {'namespace': 'sw2'}}]
+        assert emane_topology.start_telegraf_aggregator() == 0
+        assert 'sw2-telegraf-aggregator' in emane_topology.docker_client.containers.containers
+        emane_topology.generate_configs()
+        node = emane_topology.nodes['node-1']
+        telegraf_conf = str(tmpdir.join('telegraf.conf'))
+        emane_topology.jinja_renderer(telegraf_conf, 'telegraf.conf', {
+            'node': node.name, 'domain': node.domain, 'namespace': 'sw2', 'port': 22000,
+            'aggregator': 'sw2-telegraf-aggregator:8094'}, mode='w')
+        with open(telegraf_conf, 'r') as f:
+            conf = f.read()
+        assert 'address = "udp://sw2-telegraf-aggregator:8094"' in conf
+        assert '[[outputs.prometheus_client]]' not in conf
+        emane_topology.stop()
+        assert not os.path.exists('container_helpers/monitoring/targets/sw2.json')
+        assert not emane_topology.docker_client.containers.containers
@@ -0,0 +1,29 @@
+#!/usr/bin/env/ python3
+
+import pytest
+
+from emane_docker.distribution import DistributionParser
+from emane_docker.rng import RandomStreams
+
+
+@pytest.mark.general
+def test_streams_are_reproducible():
+    first = RandomStreams(seed=42)
+    second = RandomStreams(seed=42)
+    # Streams do not depend on the order they are created in
+    node2 = second.generator('traffic', 'node-2').random(5)
+    node1 = second.generator('traffic', 'node-1').random(5)
+    assert (first.generator('traffic', 'node-1').random(5) == node1).all()
+    assert (first.generator('traffic', 'node-2').random(5) == node2).all()
+    assert (node1 != node2).all()
+    assert (RandomStreams(seed=43).generator('traffic', 'node-1').random(5) != node1).all()
+
+
+@pytest.mark.general
+def test_distribution_for_simulation():
+    streams = RandomStreams(seed=7)
+    parser = DistributionParser({'exponential': {'beta': {'interval': [1, 10]}}})
+    samples = [parser.for_simulation(1, streams.generator('events', 1)).get_next()
+               for _ in range(2)]
+    assert samples[0] == samples[1]
+    assert parser.simulation_id == -1
@@ -0,0 +1,75 @@
+#!/usr/bin/env/ python3
+
+from types import SimpleNamespace
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from emane_docker.route_oracle import UNREACHABLE, RouteOracle, parse_routes
+
+
+def make_topology(num_nodes, num_links, seed):
+    rng = np.random.default_rng(seed)
+    nodes = {'node-%d' % index: SimpleNamespace(name='node-%d' % index, index=index)
+             for index in range(num_nodes)}
+    keys = set()
+    while len(keys) < num_links:
+        node1, node2 = sorted(rng.choice(num_nodes, 2, replace=False))
+        keys.add((int(node1), int(node2)))
+    links = [SimpleNamespace(key=key, UP=1, DOWN=0, status=1) for key in sorted(keys)]
+    return nodes, links
+
+
+def expected_distances(num_nodes, links):
+    graph = nx.Graph()
+    graph.add_nodes_from(range(num_nodes))
+    graph.add_edges_from(link.key for link in links if link.status == link.UP)
+    distances = np.full((num_nodes, num_nodes), UNREACHABLE, dtype=np.uint16)
+    for source, lengths in nx.all_pairs_shortest_path_length(graph):
+        for target, length in lengths.items():
+            distances[source, target] = length
+    return distances
+
+
+@pytest.mark.general
+def test_route_oracle_updates():
+    nodes, links = make_topology(200, 260, seed=1)
+    oracle = RouteOracle(nodes, links)
+    assert np.array_equal(oracle.distances, expected_distances(200, links))
+    rng = np.random.default_rng(2)
+    for _ in range(10):
+        for index in rng.choice(len(links), 5, replace=False):
+            links[index].status = 1 - links[index].status
+        assert oracle.update(links) < 200
+        assert np.array_equal(oracle.distances, expected_distances(200, links))
+    assert oracle.update(links) == 0
+
+
+@pytest.mark.general
+def test_route_oracle_compare():
+    # 0 - 1 - 3 and 0 - 2 - 3 are equal-cost paths, 4 is isolated.
+    nodes, _ = make_topology(5, 0, seed=1)
+    links = [SimpleNamespace(key=key, UP=1, DOWN=0, status=1)
+             for key in [(0, 1), (0, 2), (1, 3), (2, 3)]]
+    oracle = RouteOracle(nodes, links)
+    assert oracle.expected_routes(0) == {1: {1}, 2: {2}, 3: {1, 2}}
+    assert oracle.compare(0, {1: {1}, 2: {2}, 3: {1, 2}}) == {
+        'correct': 3, 'missing': 0, 'wrong': 0, 'unexpected': 0}
+    assert oracle.compare(0, {1: {1}, 3: {3}, 4: {1}}) == {
+        'correct': 1, 'missing': 1, 'wrong': 1, 'unexpected': 1}
+    total = oracle.compare_all({0: {1: {1}, 2: {2}, 3: {2}}, 1: {0: {0}}})
+    assert total['correct'] == 4 and total['missing'] == 2
+    assert total['incorrect_nodes'] == ['node-1']
+
+
+@pytest.mark.general
+def test_parse_routes():
+    addresses = {0x0a640001: 0, 0x0a640002: 1, 0x0a640003: 2, 0x01000002: 1}
+    output = '\n'.join(['default via 172.17.0.1 dev eth0',
+                        '10.100.0.0/16 dev emane0 proto kernel scope link src 10.100.0.1',
+                        '10.100.0.2 dev emane0 proto zebra metric 20',
+                        '10.100.0.3 via 10.100.0.2 dev emane0 proto zebra metric 30',
+                        '10.100.0.3/32 via 1.0.0.2 dev i0 proto zebra',
+                        '10.100.0.9 via 10.100.0.2 dev emane0 proto zebra'])
+    assert parse_routes(output, addresses) == {1: {1}, 2: {1}}
@@ -0,0 +1,59 @@
+#!/usr/bin/env/ python3
+
+import io
+import ipaddress
+
+import numpy as np
+import pytest
+
+from emane_docker.route_scale import RouteScale, parse_route_status
+
+
+@pytest.mark.general
+def test_prefixes_do_not_overlap():
+    route_scale = RouteScale(routes=1000, prefix_length=30, pool='16.0.0.0/8')
+    networks = [ipaddress.IPv4Network((int(address), 30)) for index in range(4)
+                for address in route_scale.prefixes(index)]
+    assert len(set(networks)) == 4000
+    for index in range(4):
+        block = route_scale.node_block(index)
+        assert all(network.subnet_of(block) for network in networks[index * 1000:][:1000])
+    # The prefixes are neither adjacent nor siblings, so they cannot be aggregated.
+    assert np.all(np.diff(route_scale.prefixes(0)) == 8)
+    assert len(list(ipaddress.collapse_addresses(networks[:1000]))) == 1000
+
+
+@pytest.mark.general
+def test_aggregatable_prefixes():
+    route_scale = RouteScale(routes=1024, aggregatable=True, pool='16.0.0.0/8')
+    networks = [ipaddress.IPv4Network(int(address)) for address in route_scale.prefixes(3)]
+    assert list(ipaddress.collapse_addresses(networks)) == [route_scale.node_block(3)]
+
+
+@pytest.mark.general
+def test_pool_exhaustion():
+    route_scale = RouteScale(routes=300, pool='16.0.0.0/16')
+    route_scale.check(63)
+    with pytest.raises(ValueError):
+        route_scale.check(64)
+    with pytest.raises(ValueError):
+        RouteScale(routes=1, prefix_length=8, pool='16.0.0.0/16')
+
+
+@pytest.mark.general
+def test_write_static_routes(monkeypatch):
+    monkeypatch.setattr('emane_docker.route_scale.WRITE_CHUNK_SIZE', 7)
+    route_scale = RouteScale.from_config({'number_of_route_announcements': 20})
+    f = io.StringIO()
+    route_scale.write_static_routes(f, 1)
+    lines = f.getvalue().splitlines()
+    assert len(lines) == 20
+    assert lines[0] == 'ip route 16.0.0.64/32 eth0'
+    assert lines[-1] == 'ip route 16.0.0.102/32 eth0'
+
+
+@pytest.mark.general
+def test_parse_route_status():
+    output = '1500\n 2048 zebra\n 4096 ospfd\n  512 zebra\n'
+    assert parse_route_status(output) == (1500, {'zebra': 2560, 'ospfd': 4096})
+    assert parse_route_status('sh: ip: not found\n') == (None, {})
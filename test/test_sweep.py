@@ -0,0 +1,89 @@
+#!/usr/bin/env/ python3
+
+import os
+
+import pytest
+
+pytest.importorskip('emane.events')
+
+from emane_docker.benchmark import FakeDockerClient  # noqa: E402
+from emane_docker.sweep import SweepRunner  # noqa: E402
+
+
+@pytest.mark.general
+def test_sweep_expand(topology_config):
+    config = topology_config(10, experiment={'duration': 5},
+                             sweep={'parameters': {'experiment.duration': [5, 10],
+                                                   'mobility.rate': [1, 2, 4]},
+                                    'max_parallel_runs': 4, 'max_containers': 25})
+    runner = SweepRunner(config)
+    points = runner.expand()
+    assert len(points) == 6
+    parameters, point_config = points[5]
+    assert parameters == {'experiment.duration': 10, 'mobility.rate': 4}
+    assert point_config['experiment'] == {'duration': 10}
+    assert point_config['mobility'] == {'rate': 4}
+    assert point_config['namespace'] == 'sw5'
+    assert point_config['telegraf_port_base'] == 25000
+    assert point_config['docker_subnet'] == '10.128.5.0/24'
+    assert 'sweep' not in point_config
+    assert config['experiment'] == {'duration': 5}
+    assert runner.parallel_runs(points) == 2
+    # Only the parallel runs have namespaces, points share them round-robin.
+    points = runner.expand(slots=2)
+    assert [config['namespace'] for _, config in points] == ['sw0', 'sw1'] * 3
+    assert points[5][1]['telegraf_port_base'] == 21000
+
+    runner = SweepRunner(dict(config, telegraf_port_base=65000))
+    with pytest.raises(ValueError):
+        runner.parallel_runs(points)
+
+
+@pytest.mark.general
+def test_namespaced_topology(tmpdir, create_topology):
+    docker_client = FakeDockerClient()
+    with tmpdir.as_cwd():
+        emane_topology = create_topology(4, docker_client=docker_client, namespace='sw1',
+                                         telegraf_port_base=21000)
+        emane_topology.generate_configs()
+        emane_topology.run_threadpool(method=emane_topology.start_docker_container,
+                                      params=emane_topology.nodes.values())
+        assert sorted(docker_client.containers.containers) == [
+            'sw1-node-1', 'sw1-node-2', 'sw1-node-3', 'sw1-node-4']
+        assert os.path.isfile('container_helpers/namespaces/sw1/configs/node-1/platform.xml')
+        assert os.path.isfile('container_helpers/namespaces/sw1/eventservice/scenario.eel')
+        assert emane_topology.emane_bridge == 'sw1-emane0'
+        emane_topology.stop()
+    assert not docker_client.containers.containers
+
+
+@pytest.mark.general
+def test_warm_pool(tmpdir, create_topology):
+    docker_client = FakeDockerClient()
+    config = {'namespace': 'warm', 'warm_pool': True, 'no_cli': True}
+    with tmpdir.as_cwd():
+        first = create_topology(4, docker_client=docker_client, **config)
+        assert first.start() == 0
+        assert first.release() == 0
+        containers = dict(docker_client.containers.containers)
+        assert len(containers) == 4
+        config_directory = 'container_helpers/namespaces/warm/configs/node-1'
+        inode = os.stat(config_directory + '/platform.xml').st_ino
+        assert os.path.isfile(config_directory + '/ospfd.conf')
+
+        second = create_topology(4, docker_client=docker_client, control_planes=['bgp'],
+                                 **config)
+        assert second.start() == 0
+        for name, container in second.containers.items():
+            assert containers['warm-' + name] is container
+        # Unchanged files are kept, the configurations of the previous CP are removed.
+        assert os.stat(config_directory + '/platform.xml').st_ino == inode
+        assert os.path.isfile(config_directory + '/bgpd.conf')
+        assert not os.path.exists(config_directory + '/ospfd.conf')
+
+        third = create_topology(4, docker_client=docker_client, docker_image='other', **config)
+        assert third.start() == 0
+        for name, container in third.containers.items():
+            assert containers['warm-' + name] is not container
+        third.stop()
+    assert not docker_client.containers.containers
@@ -0,0 +1,44 @@
+#!/usr/bin/env/ python3
+
+import numpy as np
+import pytest
+
+from emane_docker.timing_wheel import TimingWheel
+
+
+@pytest.mark.general
+def test_timing_wheel_order():
+    rng = np.random.default_rng(1)
+    # Delays cover the first three levels of a wheel with 16 slots per level.
+    times = rng.random(2000) * 3000 * 0.01
+    wheel = TimingWheel(resolution=0.01, slot_bits=4, levels=4)
+    for index, event_time in enumerate(times):
+        wheel.schedule(event_time, index)
+    assert len(wheel) == 2000
+    ticks = (times / 0.01).astype(int)
+    order = np.argsort(times, kind='stable')
+    assert [index for _, index in wheel.expire(15.0)] == [index for index in order
+                                                          if ticks[index] <= 1500]
+    assert [index for _, index in wheel.expire(1000.0)] == [index for index in order
+                                                            if ticks[index] > 1500]
+    assert not len(wheel)
+
+
+@pytest.mark.general
+def test_timing_wheel_reschedule():
+    wheel = TimingWheel(resolution=1.0, slot_bits=2, levels=3)
+    wheel.schedule(0.5, 'a')
+    wheel.schedule(2.0, 'b')
+    expired = []
+    for event_time, item in wheel.expire(40.0):
+        expired.append((event_time, item))
+        if item == 'a' and event_time < 30:
+            wheel.schedule(event_time + 7.0, item)
+        elif item == 'b' and event_time == 2.0:
+            # Rescheduled in the past, so it expires at the next tick.
+            wheel.schedule(1.0, item)
+    assert expired[:3] == [(0.5, 'a'), (2.0, 'b'), (1.0, 'b')]
+    assert [event_time for event_time, item in expired if item == 'a'] == [0.5, 7.5, 14.5, 21.5,
+                                                                           28.5, 35.5]
+    with pytest.raises(ValueError):
+        wheel.schedule(1000.0, 'c')
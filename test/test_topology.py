@@ -0,0 +1,90 @@
+#!/usr/bin/env/ python3
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('emane.events')
+
+from emane_docker.topology import EmaneTopology, Link, Node  # noqa: E402
+
+
+def make_node(name, index, neighbors=()):
+    return Node(domain='domain-1', node={'name': name, 'neighbors': list(neighbors),
+                                         'is_border': False}, index=index, as_id=1000 + index)
+
+
+@pytest.mark.general
+def test_node():
+    node = make_node('node-1', 0, ['node-2'])
+    assert node.nem_id == 1 and node.bootstrapfile == '/bootstrap/start.sh'
+    assert node == make_node('node-1', 5) and node != make_node('node-2', 0)
+    assert len({node, make_node('node-1', 0), make_node('node-2', 1)}) == 2
+    with pytest.raises(AttributeError):
+        node.unknown = 1
+
+
+@pytest.mark.general
+def test_link_addresses():
+    node1, node2 = make_node('node-1', 0), make_node('node-2', 1)
+    link = Link(node1, node2, ip1='1.0.0.1/31', ip2='1.0.0.2')
+    assert node1.links == [link] and node2.links == [link]
+    assert (link.node1_ipv4, link.mask1) == ('1.0.0.1', 31)
+    assert (link.node2_ipv4, link.mask2) == ('1.0.0.2', 30)
+
+    link = Link(node1, node2)
+    assert link.node1_ipv4 is None and link.node2_ipv4 is None
+    # Addresses are given as integers by the allocator, or as strings.
+    link.set_ipv4_addresses(0x01000005, '1.0.0.6', 30)
+    assert (link.node1_ipv4, link.node2_ipv4) == ('1.0.0.5', '1.0.0.6')
+    assert (link.node1_ipv4_int, link.node2_ipv4_int) == (0x01000005, 0x01000006)
+    link.node2_ipv4 = '1.0.0.9'
+    assert link.node2_ipv4 == '1.0.0.9'
+    with pytest.raises(ValueError):
+        link.node1_ipv4 = '1.0.0.256'
+    with pytest.raises(AttributeError):
+        link.unknown = 1
+
+
+@pytest.mark.general
+def test_link_swap_nodes():
+    node1, node2 = make_node('node-1', 0), make_node('node-2', 1)
+    link = Link(node1, node2, ip1='1.0.0.1/30', ip2='1.0.0.2/31')
+    link.set_port_ids(3, 4)
+    link.swap_nodes()
+    assert (link.node1, link.node2) == (node2, node1)
+    assert (link.node1_ipv4, link.mask1, link.node1_portid) == ('1.0.0.2', 31, 4)
+    assert (link.node2_ipv4, link.mask2, link.node2_portid) == ('1.0.0.1', 30, 3)
+    assert link.key == (1, 0)
+
+
+@pytest.mark.general
+def test_link_ordering_and_hashing():
+    nodes = [make_node('node-%d' % (index + 1), index) for index in range(3)]
+    link12 = Link(nodes[0], nodes[1])
+    link13 = Link(nodes[0], nodes[2])
+    link23 = Link(nodes[1], nodes[2])
+    assert sorted([link23, link13, link12]) == [link12, link13, link23]
+    assert link12 < link13 <= link13 < link23 and link23 > link12
+    same = Link(nodes[0], nodes[1])
+    assert same == link12 and not same != link12 and link12 != link13
+    assert hash(same) == hash(link12) and len({link12, link13, same}) == 2
+    assert link12.contains(nodes[1], nodes[0]) and not link12.contains(nodes[0], nodes[2])
+
+
+@pytest.mark.general
+def test_parse_topology_deduplicates_links():
+    topology = {'nodes': {
+        'domain-1': [{'name': 'b', 'neighbors': ['a', 'c'], 'is_border': True},
+                     {'name': 'a', 'neighbors': ['b', 'c'], 'is_border': False}],
+        'domain-2': [{'name': 'c', 'neighbors': ['a', 'b'], 'is_border': True,
+                      'as_number': 65001}]}}
+    emane_topology = SimpleNamespace(nodes={}, links=[])
+    EmaneTopology.parse_topology(emane_topology, topology)
+    nodes = emane_topology.nodes
+    assert [nodes[name].index for name in 'abc'] == [0, 1, 2]
+    assert nodes['c'].domain == 'domain-2' and nodes['c'].as_id == 65001
+    assert nodes['b'].as_id == 1001
+    # Each link is listed by both of its nodes but kept once, with the lower index first.
+    assert sorted(link.key for link in emane_topology.links) == [(0, 1), (0, 2), (1, 2)]
+    assert all(len(node.links) == 2 for node in nodes.values())
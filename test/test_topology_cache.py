@@ -0,0 +1,41 @@
+#!/usr/bin/env/ python3
+
+import os
+
+import pytest
+
+from emane_docker.topology_cache import load_topology_cache, save_topology_cache
+from emane_docker.topology_cache import topology_cache_file
+from emane_docker.topology_model import Link, Node
+
+
+def make_topology(num_nodes):
+    nodes = [Node(domain='domain-%d' % (index % 2), index=index, as_id=1000 + index,
+                  node={'name': 'node-%d' % index, 'neighbors': [], 'is_border': index == 0})
+             for index in range(num_nodes)]
+    links = [Link(nodes[index], nodes[(index + step) % num_nodes])
+             for index in range(num_nodes) for step in (1, 3)]
+    return {node.name: node for node in nodes}, links
+
+
+@pytest.mark.general
+def test_topology_cache(tmpdir):
+    nodes, links = make_topology(20)
+    with tmpdir.as_cwd():
+        cache_file = topology_cache_file({}, 'topology.yaml')
+        assert topology_cache_file({'topology_cache': False}, 'topology.yaml') is None
+        assert load_topology_cache(cache_file, b'nodes: {}') is None
+        save_topology_cache(cache_file, b'nodes: {}', nodes, links)
+        # A changed topology file replaces its cache entry.
+        assert load_topology_cache(cache_file, b'nodes: []') is None
+        save_topology_cache(cache_file, b'nodes: []', nodes, links)
+        assert load_topology_cache(cache_file, b'nodes: {}') is None
+        assert len(os.listdir('container_helpers/cache')) == 1
+        cached_nodes, cached_links = load_topology_cache(cache_file, b'nodes: []')
+    assert sorted(cached_nodes) == sorted(nodes)
+    for name, node in nodes.items():
+        cached = cached_nodes[name]
+        assert (cached.domain, cached.index, cached.as_id, cached.is_border) == (
+            node.domain, node.index, node.as_id, node.is_border)
+        assert [link.key for link in cached.links] == [link.key for link in node.links]
+    assert [link.key for link in cached_links] == [link.key for link in links]
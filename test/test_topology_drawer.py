@@ -0,0 +1,41 @@
+#!/usr/bin/env/ python3
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from emane_docker.topology_drawer import compute_layout, spring_layout, topology_edges
+
+
+@pytest.mark.general
+def test_topology_edges():
+    nodes = {name: SimpleNamespace(name=name, index=index, neighbors=neighbors)
+             for index, (name, neighbors) in enumerate([('a', ['b', 'c']), ('b', ['a']),
+                                                        ('c', ['a', 'b'])])}
+    assert topology_edges(nodes) == [(0, 1), (0, 2), (1, 2)]
+
+
+@pytest.mark.general
+def test_spring_layout():
+    edges = [(i, i + 1) for i in range(99)]
+    positions = spring_layout(100, edges)
+    assert positions.shape == (100, 2)
+    assert np.all(np.isfinite(positions))
+    # Neighbors are placed closer than the average pair of nodes.
+    neighbor_distance = np.linalg.norm(positions[1:] - positions[:-1], axis=1).mean()
+    pair_distance = np.linalg.norm(positions[:, np.newaxis] - positions, axis=2).mean()
+    assert neighbor_distance < pair_distance
+    assert np.array_equal(positions, spring_layout(100, edges))
+
+
+@pytest.mark.general
+def test_layout_cache(tmpdir):
+    names = ['node-%d' % i for i in range(10)]
+    edges = [(i, i + 1) for i in range(9)]
+    with tmpdir.as_cwd():
+        positions = compute_layout(names, edges, layout='spring')
+        assert len(tmpdir.join('container_helpers/cache').listdir()) == 1
+        assert np.array_equal(compute_layout(names, edges, layout='spring'), positions)
+        compute_layout(names, edges[:-1], layout='spring')
+        assert len(tmpdir.join('container_helpers/cache').listdir()) == 2
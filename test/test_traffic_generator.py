@@ -0,0 +1,48 @@
+#!/usr/bin/env/ python3
+
+from collections import namedtuple
+from time import gmtime, strftime, time
+from types import SimpleNamespace
+
+import pytest
+
+from emane_docker.traffic_generator import TrafficGenerator
+
+ExecResult = namedtuple('ExecResult', ['exit_code', 'output'])
+TRAFFIC = {'arrival': {'single': {'interval': [2]}},
+           'bandwidth': {'single': {'interval': [48]}},
+           'flow_size': {'single': {'interval': [144]}, 'is_limited': False}}
+
+
+class LaunchContainer:
+    def __init__(self, delay):
+        self.delay = delay
+        self.commands = []
+
+    def exec_run(self, cmd, **kwargs):
+        self.commands.append(cmd)
+        return ExecResult(exit_code=0, output=b'%d\n' % int((time() + self.delay) * 1e9))
+
+
+@pytest.mark.general
+def test_synchronized_start(tmpdir):
+    nodes = {'node-%d' % index: SimpleNamespace(name='node-%d' % index, index=index - 1, domain='d',
+                                                nem_id=index, nem_ipv4='10.100.0.%d' % index)
+             for index in range(1, 5)}
+    # node-4 is launched after the start time.
+    containers = {name: LaunchContainer(delay=10.0 if name == 'node-4' else 0.0)
+                  for name in nodes}
+    traffic_generator = TrafficGenerator(nodes, containers, TRAFFIC, generate_configurations=False,
+                                         duration=5, config_directory=str(tmpdir),
+                                         start_lead_time=1.0)
+    traffic_generator.start()
+    report = traffic_generator.start_report
+    assert report['launched'] == 4 and report['late_nodes'] == ['node-4']
+    assert 8.0 < report['max_delay'] < 10.0 and report['launch_spread'] >= 10.0
+    # The start time is given when MGEN is launched, not in the generated configurations.
+    start = strftime('start %H:%M:%SGMT ', gmtime(report['start_time']))
+    for name, container in containers.items():
+        assert len(container.commands) == 1 and start in container.commands[0][2]
+        with open(str(tmpdir.join(name, 'mgen.in'))) as f:
+            assert not f.read().startswith('START')
+    assert tmpdir.join('mgen_start.json').check()
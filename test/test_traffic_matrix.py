@@ -0,0 +1,95 @@
+#!/usr/bin/env/ python3
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from emane_docker.traffic_matrix import TrafficMatrix
+
+
+def make_nodes(count, domain=lambda index: 'domain-1'):
+    nodes = {}
+    for index in range(1, count + 1):
+        neighbors = ['node-%d' % n for n in range(1, count + 1) if n != index]
+        # node-2 has the most neighbors.
+        nodes['node-%d' % index] = SimpleNamespace(
+            name='node-%d' % index, nem_id=index, domain=domain(index),
+            neighbors=neighbors[:3 if index == 2 else 1])
+    return nodes
+
+
+@pytest.mark.general
+def test_uniform_matrix():
+    matrix = TrafficMatrix(make_nodes(8))
+    sources = np.repeat(np.arange(0, 8, 2), 1000)  # node-1, node-3, ...
+    destinations, scales = matrix.assign(sources, np.random.default_rng(1))
+    nem_ids = destinations + 1
+    assert (nem_ids % 2 == 0).all() and (scales == 1.0).all()
+    counts = np.bincount(nem_ids, minlength=9)[2::2]
+    assert (np.abs(counts / len(sources) - 0.25) < 0.03).all()
+
+
+@pytest.mark.general
+def test_hotspot_matrix():
+    matrix = TrafficMatrix(make_nodes(10), mode='hotspot', hotspot_fraction=0.7)
+    destinations, _ = matrix.assign(np.zeros(5000, dtype=int), np.random.default_rng(2))
+    # node-2 is the server with the highest degree.
+    assert abs(np.mean(destinations == 1) - 0.7) < 0.03
+    matrix = TrafficMatrix(make_nodes(10), mode='hotspot', hotspots=['node-4', 'node-6'],
+                           hotspot_fraction=1.0)
+    destinations, _ = matrix.assign(np.zeros(100, dtype=int), np.random.default_rng(2))
+    assert set(destinations + 1) == {4, 6}
+
+
+@pytest.mark.general
+def test_gravity_and_file_matrix(tmpdir):
+    matrix = TrafficMatrix(make_nodes(4), mode='gravity',
+                           weights={'node-2': 3.0, 'node-4': 1.0})
+    destinations, scales = matrix.assign(np.zeros(4000, dtype=int), np.random.default_rng(3))
+    assert abs(np.mean(destinations == 1) - 0.75) < 0.03
+    assert np.allclose(scales[destinations == 1], 1.5) and np.allclose(scales[destinations == 3],
+                                                                       0.5)
+    matrix_file = tmpdir.join('demand.yaml')
+    matrix_file.write('node-1: {node-4: 2.0}\nnode-3: {node-2: 1.0, node-4: 1.0}\n')
+    matrix = TrafficMatrix(make_nodes(4), mode='file', matrix_file=str(matrix_file))
+    destinations, scales = matrix.assign([0, 0, 2], np.random.default_rng(4))
+    assert list(destinations[:2]) == [3, 3] and np.allclose(scales[:2], 1.5)
+
+
+@pytest.mark.general
+def test_roles():
+    nodes = make_nodes(6, domain=lambda index: 'domain-%d' % (1 + (index > 3)))
+    matrix = TrafficMatrix(nodes, roles={'domain-1': 'client', 'domain-2': 'both'})
+    assert list(matrix.clients) == [True] * 6
+    assert list(matrix.servers) == [False] * 3 + [True] * 3
+    destinations, _ = matrix.assign(np.repeat(np.arange(6), 50), np.random.default_rng(5))
+    sources = np.repeat(np.arange(6), 50)
+    assert (destinations >= 3).all() and (destinations != sources).all()
+    with pytest.raises(ValueError):
+        TrafficMatrix(nodes, roles={'domain-1': 'router'})
+
+
+@pytest.mark.general
+def test_no_servers():
+    matrix = TrafficMatrix(make_nodes(3), roles={'domain-1': 'client'})
+    assert not matrix.has_destinations(make_nodes(3)['node-1'])
+    # Rejection sampling used to loop forever here.
+    with pytest.raises(ValueError, match='no destinations'):
+        matrix.assign([0, 1], np.random.default_rng(6))
+    with pytest.raises(ValueError):
+        TrafficMatrix(make_nodes(3), mode='pareto')
+
+
+@pytest.mark.general
+def test_large_matrix():
+    # The demand matrix of 10k nodes is not built, each mode keeps arrays over the nodes.
+    nodes = {'node-%d' % index: SimpleNamespace(name='node-%d' % index, nem_id=index,
+                                                domain='domain-1', neighbors=['node-1'])
+             for index in range(1, 10001)}
+    for mode in ('uniform', 'gravity', 'hotspot'):
+        matrix = TrafficMatrix(nodes, mode=mode, roles={'domain-1': 'both'})
+        assert matrix.cdf.shape == (10000,)
+        sources = np.arange(10000)
+        destinations, _ = matrix.assign(sources, np.random.default_rng(7))
+        assert (destinations != sources).all()